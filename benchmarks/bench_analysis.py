@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized score analytics on large generated scores.
+
+Builds a score of N notes spread over several tracks and channels, then
+compares analyze() with a straightforward pure-Python sweep that computes
+only the per-channel maximum polyphony.
+
+Usage:
+    python benchmarks/bench_analysis.py [--notes N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import ScoreBuilder, analyze
+from simplemusic.transforms import ScoreColumns
+
+TRACKS = 8
+
+def generate_score(total_notes: int, seed: int = 1) -> dict:
+    """两条轨道共用一个通道，时值随机，因此同一通道内有重叠"""
+    rng = np.random.default_rng(seed)
+    builder = ScoreBuilder(tempo=132)
+    per_track = total_notes // TRACKS
+    for idx in range(TRACKS):
+        builder.track(f'Part{idx}', instrument=idx * 8, channel=idx // 2 + 1)
+        # 每 64 个音符一个音量控制事件
+        for chunk in range(0, per_track, 64):
+            size = min(64, per_track - chunk)
+            builder.cc(7, int(rng.integers(80, 127)))
+            builder.notes(rng.integers(36, 96, size),
+                          rng.choice([0.25, 0.5, 1.0], size),
+                          rng.integers(60, 110, size))
+    return builder.build()
+
+def python_polyphony(parsed: dict) -> dict:
+    """逐音符的纯 Python 排序扫描"""
+    points = []
+    for track_data in parsed['tracks'].values():
+        for note in track_data['notes']:
+            length = note.actual_length if note.actual_length is not None else note.duration
+            points.append((note.channel, note.start_time, 1))
+            points.append((note.channel, note.start_time + length, -1))
+    points.sort()
+    result = {}
+    active = 0
+    for channel, _, delta in points:
+        active += delta
+        if active > result.get(channel, 0):
+            result[channel] = active
+    return result
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--notes', type=int, default=1_000_000, help='Total number of notes')
+    args = arg_parser.parse_args()
+
+    parsed = generate_score(args.notes)
+
+    start = time.perf_counter()
+    ScoreColumns.from_parsed(parsed)
+    columns_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = analyze(parsed)
+    analyze_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = python_polyphony(parsed)
+    python_time = time.perf_counter() - start
+
+    assert stats.max_polyphony == expected, f"Mismatch: {stats.max_polyphony} != {expected}"
+
+    print(f"notes: {stats.notes}  events: {stats.events}  length: {stats.length_seconds:.0f}s")
+    print(f"max polyphony: {stats.max_polyphony}  peak: {stats.peak_notes_per_second:g} notes/s")
+    print(f"{'column extraction':<24}{columns_time:>8.2f}s")
+    print(f"{'analyze (all stats)':<24}{analyze_time:>8.2f}s")
+    print(f"{'python polyphony only':<24}{python_time:>8.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ScoreBuilder versus generating DSL text and re-parsing it.
+
+Builds the same random melody three ways and times how long it takes to get
+to the parsed structure that create_midi_file consumes:
+
+  string   - format DSL tokens in Python, then DSLParser(...).parse()
+  builder  - ScoreBuilder.note() per note
+  bulk     - ScoreBuilder.notes() with NumPy arrays
+
+Usage:
+    python benchmarks/bench_builder.py [--notes N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import DSLParser, ScoreBuilder
+
+NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+DURATION_CHARS = {0.25: 's', 0.5: 'e', 1.0: 'q', 2.0: 'h'}
+
+def via_string(pitches, durations, velocities):
+    tokens = []
+    for pitch, duration, velocity in zip(pitches, durations, velocities):
+        tokens.append(f"{NAMES[pitch % 12]}{pitch // 12 - 1}{DURATION_CHARS[duration]}:v{velocity}")
+    dsl = "Tempo=120\nTrack Melody: Instrument=piano Channel=1\n" + ' '.join(tokens)
+    return DSLParser(dsl).parse()
+
+def via_builder(pitches, durations, velocities):
+    builder = ScoreBuilder(tempo=120).track('Melody', instrument='piano', channel=1)
+    for pitch, duration, velocity in zip(pitches, durations, velocities):
+        builder.note(pitch, duration, velocity=velocity)
+    return builder.build()
+
+def via_bulk(pitches, durations, velocities):
+    builder = ScoreBuilder(tempo=120).track('Melody', instrument='piano', channel=1)
+    return builder.notes(pitches, durations, velocities).build()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--notes', type=int, default=200_000, help='Number of notes to build')
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pitch_array = rng.integers(36, 96, args.notes)
+    duration_array = rng.choice(list(DURATION_CHARS), args.notes)
+    velocity_array = rng.integers(40, 120, args.notes)
+    as_lists = (pitch_array.tolist(), duration_array.tolist(), velocity_array.tolist())
+
+    results = {}
+    print(f"{args.notes} notes")
+    for name, func, inputs in [('string', via_string, as_lists),
+                               ('builder', via_builder, as_lists),
+                               ('bulk', via_bulk, (pitch_array, duration_array, velocity_array))]:
+        start = time.perf_counter()
+        results[name] = func(*inputs)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<8}{elapsed:8.3f} s  {args.notes / elapsed / 1e6:6.2f} M notes/s")
+
+    assert results['string'] == results['builder'] == results['bulk'], "Outputs differ"
+    print("  outputs identical")
+
+if __name__ == '__main__':
+    main()
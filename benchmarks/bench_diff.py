@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: semantic diff of large scores.
+
+Builds scores of increasing size, writes each one as a format-1 MIDI file,
+applies a few scattered edits to a copy, and times indexing the original
+score, indexing the MIDI file and aligning the two indexes. Per-note time
+should stay flat as the score grows.
+
+Usage:
+    python benchmarks/bench_diff.py [--notes N] [--edits N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic.diff import diff_indexes, index_midi, index_parsed
+from simplemusic.smf import smf_bytes
+
+from bench_analysis import generate_score
+
+def edit_score(parsed: dict, edits: int, seed: int = 3) -> dict:
+    """复制乐谱并随机修改若干音符的力度"""
+    rng = random.Random(seed)
+    tracks = {name: dict(track_data, notes=list(track_data['notes']))
+              for name, track_data in parsed['tracks'].items()}
+    names = list(tracks)
+    for _ in range(edits):
+        notes = tracks[rng.choice(names)]['notes']
+        idx = rng.randrange(len(notes))
+        notes[idx] = replace(notes[idx], velocity=notes[idx].velocity % 127 + 1)
+    return dict(parsed, tracks=tracks)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--notes', type=int, default=1_000_000, help='Notes in the largest score')
+    arg_parser.add_argument('--edits', type=int, default=100, help='Edited notes per score')
+    args = arg_parser.parse_args()
+
+    print(f"{'notes':>10}{'index dsl':>11}{'index mid':>11}{'align':>9}{'total':>9}{'us/note':>9}{'diffs':>7}")
+    for notes in (args.notes // 4, args.notes // 2, args.notes):
+        parsed = generate_score(notes)
+        data = smf_bytes(edit_score(parsed, args.edits), midi_format=1)
+
+        a, index_time = timed(index_parsed, parsed)
+        b, midi_time = timed(index_midi, data)
+        result, align_time = timed(diff_indexes, a, b)
+        assert result.counts()['notes_changed'] <= args.edits, "Unexpected differences"
+
+        total = index_time + midi_time + align_time
+        print(f"{a.note_count:>10}{index_time:>11.2f}{midi_time:>11.2f}{align_time:>9.2f}"
+              f"{total:>9.2f}{total / a.note_count * 1e6:>9.2f}{len(result.differences):>7}")
+
+if __name__ == '__main__':
+    main()
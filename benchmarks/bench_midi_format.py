@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Size and parse-time benchmark for format-0 versus format-1 MIDI files.
+
+Writes every score in the optimizer benchmark corpus as a MIDIUtil format-1
+file (the default writer) and as a format-0 file (one merged track with
+running status), checks that both hold the same events, and reports file
+size and the time to read each file back into one time-ordered event stream,
+which is what a player has to do before it can start.
+
+Usage:
+    python benchmarks/bench_midi_format.py [--bars N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import DSLParser, EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED
+from simplemusic.midi_converter import _midi_bytes
+from simplemusic.smf import ordered_events, read_smf
+
+from bench_optimizer import generate_exported_score
+
+def timed_read(data: bytes, repeat: int):
+    """读取并归并为一个时间有序的事件流，返回事件列表和最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        events = list(ordered_events(read_smf(data)))
+        best = min(best, time.perf_counter() - start)
+    return events, best
+
+def comparable(events):
+    """去掉轨道名和不改变速度的速度事件，音符关统一为力度 0 的音符开，按时间和内容排序"""
+    result = []
+    tempo = None
+    for tick, message in events:
+        if message[:2] == b'\xff\x03':
+            continue
+        if message[:2] == b'\xff\x51':
+            if message == tempo:
+                continue
+            tempo = message
+        if message[0] & 0xF0 == 0x80:
+            message = bytes([0x90 | message[0] & 0x0F, message[1], 0])
+        result.append((tick, bytes(message)))
+    return sorted(result)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--bars', type=int, default=500, help='Bars per generated track')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = arg_parser.parse_args()
+
+    corpus = {
+        'example-basic': EXAMPLE_BASIC,
+        'example-complex': EXAMPLE_COMPLEX,
+        'example-advanced': EXAMPLE_ADVANCED,
+        f'exported-{args.bars // 10}bars': generate_exported_score(args.bars // 10),
+        f'exported-{args.bars}bars': generate_exported_score(args.bars),
+    }
+
+    print(f"{'score':<22}{'events':>8}{'fmt1 B':>10}{'fmt0 B':>10}{'saved':>8}"
+          f"{'fmt1 ms':>9}{'fmt0 ms':>9}{'speedup':>9}")
+    totals = [0, 0, 0.0, 0.0]
+    for name, dsl_text in corpus.items():
+        parsed = DSLParser(dsl_text).parse()
+        format1 = _midi_bytes(parsed, midi_format=1)
+        format0 = _midi_bytes(parsed, midi_format=0)
+
+        events1, time1 = timed_read(format1, args.repeat)
+        events0, time0 = timed_read(format0, args.repeat)
+        assert comparable(events1) == comparable(events0), f"{name}: format 0 events differ"
+
+        saved = 100.0 * (len(format1) - len(format0)) / len(format1)
+        print(f"{name:<22}{len(events0):>8}{len(format1):>10}{len(format0):>10}{saved:>7.1f}%"
+              f"{time1 * 1000:>9.2f}{time0 * 1000:>9.2f}{time1 / time0:>8.2f}x")
+        for i, value in enumerate([len(format1), len(format0), time1, time0]):
+            totals[i] += value
+
+    saved = 100.0 * (totals[0] - totals[1]) / totals[0]
+    print(f"{'total':<22}{'':>8}{totals[0]:>10}{totals[1]:>10}{saved:>7.1f}%"
+          f"{totals[2] * 1000:>9.2f}{totals[3] * 1000:>9.2f}{totals[2] / totals[3]:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Size benchmark for the redundant MIDI event elimination pass.
+
+Compares MIDI file size and event counts with and without optimize_score()
+on the built-in examples and on generated scores that mimic real-world
+exports (per-note instrument tags, per-bar volume CCs, pitch-bend resets).
+
+Usage:
+    python benchmarks/bench_optimizer.py [--bars N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import DSLParser, create_midi_file, optimize_score
+from simplemusic import EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED
+
+def generate_exported_score(bars: int, seed: int = 1) -> str:
+    """生成类似 DAW 导出的乐谱：每个音符都带乐器标记，每小节重复音量和弯音复位"""
+    rng = random.Random(seed)
+    scale = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+    lines = ['Tempo=110', 'TimeSig=4/4']
+
+    for name, channel, program, octave in [('Piano', 1, 0, 4), ('Strings', 2, 48, 3),
+                                           ('Bass', 3, 33, 2), ('Lead', 4, 81, 5)]:
+        lines.append(f'Track {name}: Instrument={program} Channel={channel}')
+        bars_text = []
+        for bar in range(bars):
+            tokens = ['CC:7:100', 'CC:10:64', 'PB:0']
+            if bar % 8 == 0:
+                tokens.append('Tempo=110')
+            for _ in range(8):
+                pitch = rng.choice(scale)
+                tokens.append(f'{pitch}{octave}e:v{rng.randint(70, 100)}:i{program}')
+            bars_text.append(' '.join(tokens))
+        lines.append(' | '.join(bars_text))
+
+    return '\n'.join(lines)
+
+def count_events(parsed_data: dict) -> int:
+    """统计写入器将要生成的非音符事件数"""
+    total = 0
+    tracks = parsed_data['tracks']
+    conductor = parsed_data.get('conductor')
+    for idx, track_data in enumerate(tracks.values()):
+        total += 1  # 轨道名称
+        if conductor is None or idx == 0:
+            total += 2  # 拍号和初始速度
+        if track_data['config']['channel'] != 9:
+            total += 1  # 默认乐器
+        total += sum(1 for note in track_data['notes'] if note.instrument is not None)
+        total += len(track_data['events'])
+    if conductor is not None:
+        total += len(conductor['events'])
+    return total
+
+def write_size(parsed_data: dict, output_file: str) -> int:
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_midi_file(parsed_data, output_file)
+    return os.path.getsize(output_file)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--bars', type=int, default=500, help='Bars per generated track')
+    args = arg_parser.parse_args()
+
+    corpus = {
+        'example-basic': EXAMPLE_BASIC,
+        'example-complex': EXAMPLE_COMPLEX,
+        'example-advanced': EXAMPLE_ADVANCED,
+        f'exported-{args.bars // 10}bars': generate_exported_score(args.bars // 10),
+        f'exported-{args.bars}bars': generate_exported_score(args.bars),
+    }
+
+    print(f"{'score':<22}{'events':>10}{'optimized':>11}{'bytes':>11}{'optimized':>11}"
+          f"{'saved':>8}{'pass ms':>9}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'bench.mid')
+        for name, dsl_text in corpus.items():
+            parsed = DSLParser(dsl_text).parse()
+            start = time.perf_counter()
+            optimized, report = optimize_score(parsed)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            before = write_size(parsed, output_file)
+            after = write_size(optimized, output_file)
+            saved = 100.0 * (before - after) / before if before else 0.0
+            print(f"{name:<22}{count_events(parsed):>10}{count_events(optimized):>11}"
+                  f"{before:>11}{after:>11}{saved:>7.1f}%{elapsed_ms:>9.1f}")
+            print(f"  {report.summary()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for intra-track parallel parsing.
+
+Parses one large solo-piano track sequentially and with parallel=True for
+increasing worker counts, checks that every result is identical to the
+sequential parse, and reports the speedup.
+
+Usage:
+    python benchmarks/bench_parallel_parse.py [--bars N] [--max-workers N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import DSLParser
+
+def generate_solo_piano(bars: int, seed: int = 7) -> str:
+    """生成一个很长的单轨钢琴谱：旋律、和弦、三连音和踏板"""
+    rng = random.Random(seed)
+    names = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+    bar_texts = []
+    for bar in range(bars):
+        tokens = ['CC:64:127'] if bar % 4 == 0 else []
+        for _ in range(3):
+            tokens.append(f"{rng.choice(names)}5e/3:v{rng.randint(60, 110)}")
+        tokens.append(f"[{rng.choice(names)}3q, {rng.choice(names)}4q, {rng.choice(names)}4q]")
+        tokens.append(f"{rng.choice(names)}4e. {rng.choice(names)}4s:p0.05")
+        tokens.append(f"{rng.choice(names)}5q:len{rng.choice('eqs')}")
+        bar_texts.append(' '.join(tokens))
+    return "Tempo=90\nTrack Piano: Instrument=piano Channel=1\n" + ' | '.join(bar_texts)
+
+def timed_parse(dsl_text: str, **options):
+    start = time.perf_counter()
+    result = DSLParser(dsl_text, **options).parse()
+    return result, time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--bars', type=int, default=40_000, help='Bars in the generated track')
+    arg_parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1,
+                            help='Largest worker count to measure')
+    args = arg_parser.parse_args()
+
+    dsl_text = generate_solo_piano(args.bars)
+    baseline, sequential_time = timed_parse(dsl_text)
+    note_count = len(baseline['tracks']['Piano']['notes'])
+    print(f"{args.bars} bars, {note_count} notes, {os.cpu_count()} CPUs")
+    print(f"{'mode':<14}{'seconds':>9}{'speedup':>9}")
+    print(f"{'sequential':<14}{sequential_time:>9.3f}{1.0:>8.2f}x")
+
+    workers = 1
+    while workers <= args.max_workers:
+        result, elapsed = timed_parse(dsl_text, parallel=True, parallel_threshold=0, workers=workers)
+        assert result == baseline, f"Parallel output with {workers} workers differs"
+        print(f"{f'{workers} workers':<14}{elapsed:>9.3f}{sequential_time / elapsed:>8.2f}x")
+        workers *= 2
+
+if __name__ == '__main__':
+    main()
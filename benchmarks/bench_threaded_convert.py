@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of concurrent convert() calls across thread counts.
+
+Runs the same batch of conversions with 1, 2, 4 and 8 threads and reports
+conversions per second and the speedup over one thread. On a standard
+CPython build the GIL serializes the pure-Python parser, so expect little
+scaling; on a free-threaded build (python3.13t or later, with the GIL
+disabled) conversions run in parallel on separate cores.
+
+Usage:
+    python benchmarks/bench_threaded_convert.py [--jobs N] [--bars N]
+"""
+
+import argparse
+import os
+import sys
+import sysconfig
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import ConvertOptions, convert
+
+def generate_score(index: int, bars: int) -> str:
+    tokens = ' | '.join(f"C4e:v{60 + (index + b) % 40} [E4q, G4q] D4e CC:7:{b % 128} F4s:p0.25 Rq"
+                        for b in range(bars))
+    return f"Tempo={90 + index % 40}\nTrack Lead: Instrument=piano Channel=1\n{tokens}"
+
+def gil_description() -> str:
+    if not sysconfig.get_config_var('Py_GIL_DISABLED'):
+        return "standard build (GIL enabled)"
+    enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    return f"free-threaded build (GIL {'enabled' if enabled else 'disabled'})"
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--jobs', type=int, default=64, help='Conversions per run')
+    arg_parser.add_argument('--bars', type=int, default=200, help='Bars per score')
+    args = arg_parser.parse_args()
+
+    scores = [generate_score(i, args.bars) for i in range(args.jobs)]
+    options = ConvertOptions(optimize=True)
+    expected = [convert(text, options) for text in scores[:4]]  # 预热
+
+    print(f"Python {sys.version.split()[0]}, {gil_description()}, {os.cpu_count()} CPUs")
+    print(f"{'threads':>8}{'seconds':>10}{'conv/s':>10}{'speedup':>9}")
+    baseline = None
+    for threads in [1, 2, 4, 8]:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda text: convert(text, options), scores))
+        elapsed = time.perf_counter() - start
+        assert results[:4] == expected, "Concurrent conversion changed the output"
+
+        rate = args.jobs / elapsed
+        baseline = baseline or rate
+        print(f"{threads:>8}{elapsed:>10.2f}{rate:>10.1f}{rate / baseline:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
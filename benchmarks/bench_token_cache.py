@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: token-decode cache on repetitive scores.
+
+Real scores reuse a small vocabulary of tokens. This parses generated scores
+drawn from vocabularies of different sizes with the cache disabled and
+enabled, checks that both give identical results, and reports the speedup
+and cache hit rate.
+
+Usage:
+    python benchmarks/bench_token_cache.py [--tokens N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from simplemusic import DSLParser
+
+NAMES = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+
+def vocabulary(size: int, rng: random.Random) -> list:
+    """生成 size 个不同的 token：音符、带参数的音符、和弦、休止符和控制事件"""
+    tokens = set()
+    while len(tokens) < size:
+        kind = rng.random()
+        pitch = f"{rng.choice(NAMES)}{rng.randint(3, 5)}"
+        if kind < 0.5:
+            tokens.add(f"{pitch}{rng.choice('qes')}:v{rng.randint(60, 110)}")
+        elif kind < 0.8:
+            root = rng.randint(0, 4)
+            tokens.add('[' + ', '.join(f"{NAMES[(root + i) % 7]}4q" for i in (0, 2, 4)) + ']')
+        elif kind < 0.9:
+            tokens.add(f"R{rng.choice('qe')}")
+        else:
+            tokens.add(f"CC:{rng.choice([1, 7, 11])}:{rng.randint(0, 127)}")
+    return sorted(tokens)
+
+def generate_score(total_tokens: int, vocab_size: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    vocab = vocabulary(vocab_size, rng)
+    bars = [' '.join(rng.choice(vocab) for _ in range(8)) for _ in range(total_tokens // 8)]
+    return "Tempo=120\nTrack Piano: Instrument=piano Channel=1\n" + ' | '.join(bars)
+
+def timed_parse(dsl: str, cache_size: int):
+    parser = DSLParser(dsl, cache_size=cache_size)
+    start = time.perf_counter()
+    result = parser.parse()
+    return result, time.perf_counter() - start, parser.cache_info()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--tokens', type=int, default=200_000, help='Tokens per generated score')
+    args = arg_parser.parse_args()
+
+    print(f"{'vocabulary':>10}{'uncached s':>12}{'cached s':>10}{'speedup':>9}{'hit rate':>10}")
+    for vocab_size in [20, 200, 2000]:
+        dsl = generate_score(args.tokens, vocab_size)
+        uncached, uncached_time, _ = timed_parse(dsl, 0)
+        cached, cached_time, info = timed_parse(dsl, 4096)
+        assert cached == uncached, "Cached parse differs from uncached parse"
+        print(f"{vocab_size:>10}{uncached_time:>12.2f}{cached_time:>10.2f}"
+              f"{uncached_time / cached_time:>8.1f}x{info.hit_rate:>9.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -5,20 +5,57 @@ A Python library that converts custom music DSL notation to MIDI files.
 Supports multi-track compositions, chords, control events, and advanced features.
 """
 
+import logging
+
 from .parser import DSLParser
-from .midi_converter import create_midi_file, dsl_to_midi
+from .midi_converter import ConvertOptions, convert, convert_async, create_midi_file, dsl_to_midi
 from .data_structures import Note, Event, Track
+from .transforms import ScoreColumns, transform_score, velocity_curve
+from .optimizer import OptimizationReport, optimize_score
+from .builder import ScoreBuilder
+from .build import BuildResult, build_project
+from .export import export_score, iter_rows
+from .analysis import ScoreStats, analyze
+from .medley import MedleySegment, concat_scores, write_medley
+from .diff import ScoreDiff, diff_scores
+from .spool import run_worker, spool_status, submit_job
 from .constants import NOTE_MAP, DURATION_MAP, INSTRUMENT_NAMES
 from .examples import EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED
 
+# 库只记录日志，由应用程序（如命令行）决定是否输出
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
 __version__ = "0.1.0"
 __all__ = [
     "DSLParser",
     "create_midi_file", 
     "dsl_to_midi",
+    "ConvertOptions",
+    "convert",
+    "convert_async",
     "Note",
     "Event", 
     "Track",
+    "ScoreColumns",
+    "transform_score",
+    "velocity_curve",
+    "OptimizationReport",
+    "optimize_score",
+    "ScoreBuilder",
+    "BuildResult",
+    "build_project",
+    "export_score",
+    "iter_rows",
+    "ScoreStats",
+    "analyze",
+    "MedleySegment",
+    "concat_scores",
+    "write_medley",
+    "ScoreDiff",
+    "diff_scores",
+    "submit_job",
+    "run_worker",
+    "spool_status",
     "NOTE_MAP",
     "DURATION_MAP",
     "INSTRUMENT_NAMES",
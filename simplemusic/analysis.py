@@ -0,0 +1,167 @@
+"""
+Vectorized score analytics: polyphony, note density, pitch range and event histograms.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .transforms import ScoreColumns
+
+DEFAULT_WINDOW = 1.0  # 音符密度滑动窗口（秒）
+DEFAULT_BIN = 1.0  # 直方图分箱宽度（秒）
+
+@dataclass
+class ScoreStats:
+    """乐谱统计结果（通道为 0-15 的 MIDI 通道索引）"""
+    notes: int
+    events: int
+    length_beats: float
+    length_seconds: float
+    pitch_range: Optional[Tuple[int, int]]
+    channel_pitch_range: Dict[int, Tuple[int, int]]
+    max_polyphony: Dict[int, int]
+    max_polyphony_time: Dict[int, float]  # 首次达到最大复音数的时间（拍）
+    peak_notes_per_second: float
+    peak_window_start: float  # 密度最高窗口的开始时间（秒）
+    window: float
+    bin_seconds: float
+    note_density: np.ndarray  # 每个分箱内开始的音符数
+    event_density: Dict[str, np.ndarray] = field(default_factory=dict)  # 事件类型 -> 每个分箱的事件数
+
+    @property
+    def peak_polyphony(self) -> int:
+        return max(self.max_polyphony.values(), default=0)
+
+    def to_dict(self) -> Dict:
+        """转换为可以 JSON 序列化的字典"""
+        return {
+            'notes': self.notes,
+            'events': self.events,
+            'length_beats': self.length_beats,
+            'length_seconds': self.length_seconds,
+            'pitch_range': list(self.pitch_range) if self.pitch_range else None,
+            'channel_pitch_range': {str(ch): list(r) for ch, r in self.channel_pitch_range.items()},
+            'max_polyphony': {str(ch): n for ch, n in self.max_polyphony.items()},
+            'max_polyphony_time': {str(ch): t for ch, t in self.max_polyphony_time.items()},
+            'peak_notes_per_second': self.peak_notes_per_second,
+            'peak_window_start': self.peak_window_start,
+            'window': self.window,
+            'bin_seconds': self.bin_seconds,
+            'note_density': self.note_density.tolist(),
+            'event_density': {kind: counts.tolist() for kind, counts in self.event_density.items()}
+        }
+
+def analyze(parsed_data: Dict, window: float = DEFAULT_WINDOW, bin_seconds: float = DEFAULT_BIN) -> ScoreStats:
+    """统计整个乐谱的复音数、音符密度、音域和事件密度"""
+    if window <= 0 or bin_seconds <= 0:
+        raise ValueError(f"Window and bin width must be positive, got {window} and {bin_seconds}")
+
+    columns = ScoreColumns.from_parsed(parsed_data)
+    events = columns.events + (columns.conductor or [])
+    event_time = np.concatenate([columns.event_time, columns.conductor_time])
+    event_type = np.array([e.type for e in events], dtype=object)
+
+    # 实际发声结束时间：有 actual_length 时用它，否则用时值
+    length = np.where(np.isnan(columns.actual_length), columns.duration, columns.actual_length)
+    end = columns.start + length
+
+    to_seconds = tempo_map(parsed_data.get('metadata', {}).get('tempo', 120),
+                           event_time[event_type == 'Tempo'],
+                           [e.data['tempo'] for e in events if e.type == 'Tempo'])
+
+    length_beats = float(max(end.max(initial=0.0), event_time.max(initial=0.0)))
+    start_seconds = to_seconds(columns.start)
+    event_seconds = to_seconds(event_time)
+    length_seconds = float(to_seconds(np.array([length_beats]))[0])
+    n_bins = int(length_seconds // bin_seconds) + 1
+
+    polyphony, polyphony_time = max_polyphony(columns.channel, columns.start, end)
+    peak_count, peak_start = peak_density(start_seconds, window)
+
+    return ScoreStats(
+        notes=len(columns),
+        events=len(events),
+        length_beats=length_beats,
+        length_seconds=length_seconds,
+        pitch_range=(int(columns.pitch.min()), int(columns.pitch.max())) if len(columns) else None,
+        channel_pitch_range=channel_pitch_range(columns.channel, columns.pitch),
+        max_polyphony=polyphony,
+        max_polyphony_time=polyphony_time,
+        peak_notes_per_second=peak_count / window,
+        peak_window_start=peak_start,
+        window=window,
+        bin_seconds=bin_seconds,
+        note_density=histogram(start_seconds, bin_seconds, n_bins),
+        event_density={kind: histogram(event_seconds[event_type == kind], bin_seconds, n_bins)
+                       for kind in sorted(set(event_type.tolist()))}
+    )
+
+def tempo_map(initial_tempo: float, times: np.ndarray, tempos) -> Callable[[np.ndarray], np.ndarray]:
+    """返回把拍数转换为秒数的函数（分段线性，速度变化是全局的）"""
+    order = np.argsort(times, kind='stable')
+    change_beats = np.concatenate([[0.0], np.asarray(times, dtype=np.float64)[order]])
+    bpm = np.concatenate([[initial_tempo], np.asarray(tempos, dtype=np.float64)[order]])
+    seconds_per_beat = 60.0 / bpm
+    # 每个速度段开始时已经过去的秒数
+    change_seconds = np.concatenate([[0.0], np.cumsum(np.diff(change_beats) * seconds_per_beat[:-1])])
+
+    def to_seconds(beats: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(change_beats, beats, side='right') - 1
+        idx = np.clip(idx, 0, None)
+        return change_seconds[idx] + (beats - change_beats[idx]) * seconds_per_beat[idx]
+
+    return to_seconds
+
+def max_polyphony(channel: np.ndarray, start: np.ndarray, end: np.ndarray) -> Tuple[Dict[int, int], Dict[int, float]]:
+    """排序扫描计算每个通道的最大同时发声数
+
+    开始记 +1、结束记 -1，按 (通道, 时间, 增量) 排序后累加；
+    同一时刻先处理结束，所以首尾相接的音符不算重叠。
+    每个通道的增量总和为 0，所以全局累加在通道边界自动归零。
+    """
+    if not len(channel):
+        return {}, {}
+
+    channels = np.concatenate([channel, channel])
+    times = np.concatenate([start, end])
+    deltas = np.concatenate([np.ones(len(start), dtype=np.int64), -np.ones(len(end), dtype=np.int64)])
+    order = np.lexsort((deltas, times, channels))
+    channels, times = channels[order], times[order]
+    active = np.cumsum(deltas[order])
+
+    boundaries = np.flatnonzero(np.diff(channels)) + 1
+    segment_starts = np.concatenate([[0], boundaries])
+    segment_ends = np.concatenate([boundaries, [len(channels)]])
+
+    polyphony, polyphony_time = {}, {}
+    for lo, hi in zip(segment_starts.tolist(), segment_ends.tolist()):
+        peak = lo + int(np.argmax(active[lo:hi]))
+        polyphony[int(channels[lo])] = int(active[peak])
+        polyphony_time[int(channels[lo])] = float(times[peak])
+    return polyphony, polyphony_time
+
+def peak_density(onsets: np.ndarray, window: float) -> Tuple[int, float]:
+    """滑动窗口内的最大音符数，以及该窗口的开始时间（窗口从某个音符开始）"""
+    if not len(onsets):
+        return 0, 0.0
+    onsets = np.sort(onsets)
+    counts = np.searchsorted(onsets, onsets + window, side='left') - np.arange(len(onsets))
+    peak = int(np.argmax(counts))
+    return int(counts[peak]), float(onsets[peak])
+
+def channel_pitch_range(channel: np.ndarray, pitch: np.ndarray) -> Dict[int, Tuple[int, int]]:
+    """每个通道的最低和最高音"""
+    if not len(channel):
+        return {}
+    order = np.lexsort((pitch, channel))
+    channel, pitch = channel[order], pitch[order]
+    first = np.concatenate([[0], np.flatnonzero(np.diff(channel)) + 1])
+    last = np.concatenate([first[1:] - 1, [len(channel) - 1]])
+    return {int(channel[lo]): (int(pitch[lo]), int(pitch[hi])) for lo, hi in zip(first, last)}
+
+def histogram(seconds: np.ndarray, bin_seconds: float, n_bins: int) -> np.ndarray:
+    """按固定宽度分箱计数"""
+    bins = np.clip((seconds // bin_seconds).astype(np.int64), 0, n_bins - 1)
+    return np.bincount(bins, minlength=n_bins)
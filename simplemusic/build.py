@@ -0,0 +1,178 @@
+"""
+Incremental, parallel project builds for multi-file SimpleMusic projects.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from glob import glob
+from typing import Dict, List, Optional
+
+from .parser import DSLParser, INCLUDE_PATTERN
+from .midi_converter import create_midi_file
+
+PROJECT_FILE = 'simplemusic.json'
+MANIFEST_FILE = '.simplemusic-build.json'
+DEFAULT_OUTPUT_DIR = 'build'
+
+@dataclass
+class BuildTarget:
+    """构建目标：一个 DSL 源文件生成一个 MIDI 文件"""
+    source: str  # 绝对路径
+    output: str  # 绝对路径
+
+@dataclass
+class BuildResult:
+    """构建结果"""
+    built: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+def load_project(project_dir: str) -> List[BuildTarget]:
+    """读取项目目标
+
+    如果有 simplemusic.json，使用其中的 targets 列表
+    （[{"source": "songs/a.dsl", "output": "build/a.mid"}, ...]）；
+    否则项目目录下每个顶层 .dsl 文件都生成 build/<名称>.mid。
+    """
+    project_dir = os.path.abspath(project_dir)
+    project_file = os.path.join(project_dir, PROJECT_FILE)
+
+    if os.path.exists(project_file):
+        with open(project_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return [BuildTarget(os.path.join(project_dir, t['source']), os.path.join(project_dir, t['output']))
+                for t in config.get('targets', [])]
+
+    return [BuildTarget(source, os.path.join(project_dir, DEFAULT_OUTPUT_DIR,
+                                             os.path.splitext(os.path.basename(source))[0] + '.mid'))
+            for source in sorted(glob(os.path.join(project_dir, '*.dsl')))]
+
+def scan_includes(path: str) -> List[str]:
+    """返回文件直接包含的文件（绝对路径）"""
+    base_dir = os.path.dirname(path)
+    includes = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = INCLUDE_PATTERN.match(line.strip())
+            if match:
+                includes.append(os.path.abspath(os.path.join(base_dir, match.group(1))))
+    return includes
+
+def include_graph(sources: List[str]) -> Dict[str, List[str]]:
+    """从源文件出发构建包含关系图：文件 -> 直接包含的文件"""
+    graph = {}
+    pending = list(sources)
+    while pending:
+        path = pending.pop()
+        if path in graph:
+            continue
+        graph[path] = scan_includes(path) if os.path.exists(path) else []
+        pending.extend(graph[path])
+    return graph
+
+def transitive_inputs(source: str, graph: Dict[str, List[str]]) -> List[str]:
+    """源文件及其直接、间接包含的所有文件"""
+    seen = []
+    pending = [source]
+    while pending:
+        path = pending.pop()
+        if path not in seen:
+            seen.append(path)
+            pending.extend(graph.get(path, []))
+    return sorted(seen)
+
+def file_hash(path: str) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_project(project_dir: str = '.', jobs: Optional[int] = None, force: bool = False) -> BuildResult:
+    """增量构建项目：只重新编译传递输入内容有变化的目标，独立目标并行编译"""
+    project_dir = os.path.abspath(project_dir)
+    manifest_path = os.path.join(project_dir, MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    targets = load_project(project_dir)
+    graph = include_graph([target.source for target in targets])
+
+    def rel(path: str) -> str:
+        return os.path.relpath(path, project_dir)
+
+    result = BuildResult()
+    hashes = {}
+    pending = {}  # 输出 -> (目标, 输入哈希)
+
+    for target in targets:
+        key = rel(target.output)
+        try:
+            inputs = {}
+            for path in transitive_inputs(target.source, graph):
+                if path not in hashes:
+                    hashes[path] = file_hash(path)
+                inputs[rel(path)] = hashes[path]
+        except OSError as e:
+            result.failed[key] = str(e)
+            continue
+
+        previous = manifest['targets'].get(key, {})
+        if (not force and os.path.exists(target.output)
+                and previous.get('source') == rel(target.source)
+                and previous.get('inputs') == inputs):
+            result.skipped.append(key)
+        else:
+            pending[key] = (target, inputs)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {key: executor.submit(_compile_target, target.source, target.output)
+                       for key, (target, _) in pending.items()}
+            for key, future in futures.items():
+                error = future.result()
+                if error:
+                    result.failed[key] = error
+                    manifest['targets'].pop(key, None)
+                else:
+                    target, inputs = pending[key]
+                    result.built.append(key)
+                    manifest['targets'][key] = {'source': rel(target.source), 'inputs': inputs}
+
+    manifest['graph'] = {rel(path): [rel(p) for p in includes] for path, includes in sorted(graph.items())}
+    _save_manifest(manifest_path, manifest)
+    return result
+
+def _compile_target(source: str, output: str) -> Optional[str]:
+    """工作进程：编译一个目标，失败时返回错误信息"""
+    try:
+        with open(source, 'r', encoding='utf-8') as f:
+            dsl_text = f.read()
+        parsed = DSLParser(dsl_text, base_dir=os.path.dirname(source)).parse()
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        create_midi_file(parsed, output)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+def _load_manifest(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('targets', {})
+    return manifest
+
+def _save_manifest(path: str, manifest: Dict):
+    """原子写入构建清单"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
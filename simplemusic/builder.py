@@ -0,0 +1,201 @@
+"""
+Programmatic score construction without DSL text generation.
+"""
+
+import re
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from .constants import INSTRUMENT_NAMES
+from .data_structures import Note, Event, Track
+from .parser import note_to_midi, parse_duration
+
+Pitch = Union[int, str]
+Duration = Union[float, str]
+
+_NOTE_PARAMS = frozenset({'velocity', 'channel', 'instrument', 'position', 'length'})
+
+class ScoreBuilder:
+    """直接构建 DSLParser.parse() 的结果结构，跳过文本生成和重新解析
+
+    时间和参数的语义与 DSL 一致：通道从 1 开始编号，音符和休止符推进当前
+    轨道的时间，控制事件不推进时间。所有方法都返回 self 以便链式调用。
+    """
+
+    def __init__(self, tempo: int = 120, key: str = 'C Major',
+                 time_sig: tuple = (4, 4), ticks_per_beat: int = 480):
+        self.metadata = {
+            'tempo': tempo,
+            'key': key,
+            'time_sig': time_sig,
+            'ticks_per_beat': ticks_per_beat
+        }
+        self.tracks: Dict[str, Track] = {}
+        self.current_track: Optional[Track] = None
+
+    def track(self, name: str, instrument: Optional[Union[int, str]] = None,
+              channel: Optional[int] = None) -> 'ScoreBuilder':
+        """创建或切换到轨道，可同时设置乐器和通道（1-16）"""
+        if name not in self.tracks:
+            self.tracks[name] = Track(name=name)
+        track = self.tracks[name]
+
+        if instrument is not None:
+            track.instrument = _to_program(instrument)
+        if channel is not None:
+            track.channel = channel - 1
+
+        self.current_track = track
+        return self
+
+    def note(self, pitch: Pitch, dur: Duration = 'q', **params) -> 'ScoreBuilder':
+        """添加单个音符并推进时间
+
+        支持的参数：velocity、channel（1-16）、instrument、position（拍数偏移）、
+        length（实际延音长度）。
+        """
+        track = self._active_track()
+        note = self._make_note(track, _to_pitch(pitch), _to_beats(dur), params)
+        track.notes.append(note)
+        track.current_time += note.duration
+        return self
+
+    def rest(self, dur: Duration = 'q') -> 'ScoreBuilder':
+        """添加休止符"""
+        self._active_track().current_time += _to_beats(dur)
+        return self
+
+    def chord(self, pitches: Sequence[Pitch], dur: Duration = 'q', **params) -> 'ScoreBuilder':
+        """添加和弦：所有音符同时开始，时间只推进一次"""
+        track = self._active_track()
+        duration = _to_beats(dur)
+        for pitch in pitches:
+            track.notes.append(self._make_note(track, _to_pitch(pitch), duration, params))
+        if pitches:
+            track.current_time += duration
+        return self
+
+    def notes(self, pitches: Sequence[Pitch], durations: Union[Duration, Sequence[float]],
+              velocities: Union[int, Sequence[int]] = 80,
+              channels: Optional[Union[int, Sequence[int]]] = None) -> 'ScoreBuilder':
+        """批量添加顺序音符，参数可以是数组（包括 NumPy 数组）或标量"""
+        track = self._active_track()
+        if len(pitches) and isinstance(pitches[0], str):
+            pitch_array = np.array([_to_pitch(p) for p in pitches], dtype=np.int64)
+        else:
+            pitch_array = np.clip(np.asarray(pitches, dtype=np.int64), 0, 127)
+        count = len(pitch_array)
+
+        if isinstance(durations, str):
+            durations = _to_beats(durations)
+        duration_array = np.broadcast_to(np.asarray(durations, dtype=np.float64), (count,))
+        velocity_array = np.broadcast_to(np.asarray(velocities, dtype=np.int64), (count,))
+        if channels is None:
+            channel_array = np.full(count, track.channel, dtype=np.int64)
+        else:
+            channel_array = np.broadcast_to(np.asarray(channels, dtype=np.int64) - 1, (count,))
+
+        # 累加顺序与逐个添加一致，因此开始时间完全相同
+        times = np.cumsum(np.concatenate(([track.current_time], duration_array)))
+
+        track.notes.extend(
+            Note(pitch=pitch, duration=duration, start_time=start, velocity=velocity, channel=channel)
+            for pitch, duration, start, velocity, channel in zip(
+                pitch_array.tolist(), duration_array.tolist(), times[:-1].tolist(),
+                velocity_array.tolist(), channel_array.tolist()))
+        if count:
+            track.current_time = float(times[-1])
+        return self
+
+    def cc(self, controller: int, value: int) -> 'ScoreBuilder':
+        """添加控制变化事件"""
+        return self._add_event('CC', {'controller': controller, 'value': value})
+
+    def pc(self, program: Union[int, str]) -> 'ScoreBuilder':
+        """添加音色变化事件"""
+        return self._add_event('PC', {'program': _to_program(program)})
+
+    def pitch_bend(self, value: int) -> 'ScoreBuilder':
+        """添加弯音事件（-8192 到 8191）"""
+        return self._add_event('PB', {'value': value})
+
+    def tempo(self, bpm: int) -> 'ScoreBuilder':
+        """设置速度：在轨道外设置全局速度，在轨道内添加速度变化事件"""
+        if self.current_track is None:
+            self.metadata['tempo'] = bpm
+            return self
+        return self._add_event('Tempo', {'tempo': bpm})
+
+    def build(self) -> Dict:
+        """返回与 DSLParser.parse() 相同格式的结果"""
+        result = {'metadata': dict(self.metadata), 'tracks': {}}
+
+        for track_name, track in self.tracks.items():
+            result['tracks'][track_name] = {
+                'config': {
+                    'channel': track.channel,
+                    'instrument': track.instrument
+                },
+                'notes': track.notes,
+                'events': track.events,
+                'end_time': track.current_time
+            }
+
+        return result
+
+    def _active_track(self) -> Track:
+        """返回当前轨道；与 DSL 一样，没有轨道时创建默认轨道"""
+        if self.current_track is None:
+            self.track('Default', instrument=0, channel=1)
+        return self.current_track
+
+    def _add_event(self, event_type: str, data: Dict) -> 'ScoreBuilder':
+        track = self._active_track()
+        track.events.append(Event(event_type, track.current_time, track.channel, data))
+        return self
+
+    def _make_note(self, track: Track, pitch: int, duration: float, params: Dict) -> Note:
+        if not params.keys() <= _NOTE_PARAMS:
+            unknown = ', '.join(sorted(set(params) - _NOTE_PARAMS))
+            raise TypeError(f"Unknown note parameters: {unknown}")
+
+        channel = params.get('channel')
+        instrument = params.get('instrument')
+        length = params.get('length')
+        return Note(
+            pitch=pitch,
+            duration=duration,
+            start_time=track.current_time + params.get('position', 0),
+            velocity=params.get('velocity', 80),
+            channel=track.channel if channel is None else channel - 1,
+            instrument=None if instrument is None else _to_program(instrument),
+            actual_length=None if length is None else _to_beats(length)
+        )
+
+_PITCH_PATTERN = re.compile(r'([A-G])([#b]?)(\d+)?$')
+
+def _to_pitch(pitch: Pitch) -> int:
+    """音高：MIDI 编号或音名（如 'C4'、'F#5'、'Bb3'），限制在 0-127"""
+    if isinstance(pitch, str):
+        match = _PITCH_PATTERN.match(pitch)
+        if not match:
+            raise ValueError(f"Invalid pitch name: {pitch!r}")
+        octave = int(match.group(3)) if match.group(3) else 4
+        return note_to_midi(match.group(1) + match.group(2), octave)
+    return max(0, min(127, int(pitch)))
+
+def _to_beats(duration: Duration) -> float:
+    """时值：拍数或 DSL 时值字符（如 'q'、'e.'、'e/3'）"""
+    if not isinstance(duration, str):
+        return float(duration)
+    value = parse_duration(duration)
+    if value is None:
+        raise ValueError(f"Invalid duration: {duration!r}")
+    return value
+
+def _to_program(instrument: Union[int, str]) -> int:
+    """乐器：MIDI 音色编号或乐器名称"""
+    if isinstance(instrument, str):
+        return int(instrument) if instrument.isdigit() else INSTRUMENT_NAMES.get(instrument.lower(), 0)
+    return int(instrument)
@@ -4,16 +4,332 @@ Command-line interface for SimpleMusic DSL converter.
 """
 
 import argparse
+import json
+import logging
+import os
 import sys
 from pathlib import Path
 
-from .midi_converter import dsl_to_midi
+from .midi_converter import MIDI_FORMATS, dsl_to_midi
+from .build import build_project
+from .export import EXPORT_FORMATS, export_score
+from .analysis import DEFAULT_BIN, DEFAULT_WINDOW, analyze
+from .medley import MERGE_MODES, write_medley
+from .diff import DIFF_MODES, diff_scores
+from .spool import (JOB_STATES, LEASE_TIMEOUT, MAX_ATTEMPTS, POLL_INTERVAL,
+                    read_status, run_worker, spool_status, submit_job)
+from .parser import DSLParser
 from .examples import EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED
 
-def main():
+def build_command(argv):
+    """simplemusic build: incremental project build"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic build',
+        description="Build every target of a SimpleMusic project, skipping "
+                    "targets whose inputs (including Include files) are unchanged"
+    )
+    parser.add_argument('project', nargs='?', default='.',
+                       help='Project directory (default: current directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='Number of parallel compile processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                       help='Rebuild all targets even if they are up to date')
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.project):
+        print(f"Error: Project directory '{args.project}' not found")
+        sys.exit(1)
+    
+    result = build_project(args.project, jobs=args.jobs, force=args.force)
+    
+    for output in result.built:
+        print(f"  built    {output}")
+    for output in result.skipped:
+        print(f"  skipped  {output} (up to date)")
+    for output, error in result.failed.items():
+        print(f"  FAILED   {output}: {error}")
+    
+    print(f"\n✨ Build finished: {len(result.built)} built, {len(result.skipped)} up to date, "
+          f"{len(result.failed)} failed")
+    if not result.ok:
+        sys.exit(1)
+
+def export_command(argv):
+    """simplemusic export: stream parsed notes and events as rows"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic export',
+        description="Export parsed notes and events as NDJSON, CSV, Arrow or Parquet rows"
+    )
+    parser.add_argument('input', help='Input DSL file')
+    parser.add_argument('-f', '--format', choices=EXPORT_FORMATS, default='ndjson',
+                       help='Output format (default: ndjson; arrow/parquet need pyarrow)')
+    parser.add_argument('-o', '--output',
+                       help="Output file (default: input name with the format's extension; "
+                            "'-' writes ndjson/csv to stdout)")
+    args = parser.parse_args(argv)
+    
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            dsl_text = f.read()
+    except OSError as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
+    
+    output = args.output or str(Path(args.input).with_suffix('.' + args.format))
+    if output == '-':
+        if args.format in ('arrow', 'parquet'):
+            print(f"Error: {args.format} output cannot be written to stdout")
+            sys.exit(1)
+        output = sys.stdout
+    
+    try:
+        source = DSLParser(dsl_text, base_dir=os.path.dirname(os.path.abspath(args.input)))
+        count = export_score(source, output, args.format)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    if output is not sys.stdout:
+        print(f"✨ Exported {count} rows to {output}")
+
+def stats_command(argv):
+    """simplemusic stats: polyphony, density and range statistics"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic stats',
+        description="Report per-channel polyphony and pitch range, note density peaks "
+                    "and event density histograms of a DSL score"
+    )
+    parser.add_argument('input', help='Input DSL file')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW, metavar='SECONDS',
+                       help='Sliding window for the notes-per-second peak (default: 1.0)')
+    parser.add_argument('--bin', type=float, default=DEFAULT_BIN, metavar='SECONDS',
+                       help='Histogram bin width (default: 1.0)')
+    parser.add_argument('--histogram', action='store_true',
+                       help='Print the per-bin note and event density histogram')
+    parser.add_argument('--json', action='store_true',
+                       help='Print all statistics as JSON')
+    args = parser.parse_args(argv)
+    
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            dsl_text = f.read()
+        parsed = DSLParser(dsl_text, base_dir=os.path.dirname(os.path.abspath(args.input))).parse()
+        stats = analyze(parsed, window=args.window, bin_seconds=args.bin)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    if args.json:
+        print(json.dumps(stats.to_dict(), indent=2))
+        return
+    
+    print(f"Notes: {stats.notes}  Events: {stats.events}  "
+          f"Length: {stats.length_beats:g} beats ({stats.length_seconds:.2f}s)")
+    if stats.pitch_range:
+        print(f"Pitch range: {stats.pitch_range[0]}-{stats.pitch_range[1]}")
+    print(f"Peak density: {stats.peak_notes_per_second:g} notes/s "
+          f"({stats.window:g}s window at {stats.peak_window_start:.2f}s)")
+    print(f"Peak polyphony: {stats.peak_polyphony}")
+    
+    print(f"\n{'channel':>8}{'polyphony':>11}{'at beat':>10}{'range':>10}")
+    for channel in sorted(stats.max_polyphony):
+        low, high = stats.channel_pitch_range[channel]
+        print(f"{channel + 1:>8}{stats.max_polyphony[channel]:>11}"
+              f"{stats.max_polyphony_time[channel]:>10g}{f'{low}-{high}':>10}")
+    
+    if args.histogram:
+        kinds = list(stats.event_density)
+        print(f"\n{'second':>8}{'notes':>8}" + ''.join(f"{kind:>8}" for kind in kinds))
+        for idx, count in enumerate(stats.note_density.tolist()):
+            print(f"{idx * stats.bin_seconds:>8g}{count:>8}" +
+                  ''.join(f"{stats.event_density[kind][idx]:>8}" for kind in kinds))
+
+def worker_command(argv):
+    """simplemusic worker: render jobs from a shared spool directory"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic worker',
+        description="Claim DSL jobs from a spool directory, convert them to MIDI and "
+                    "requeue jobs of crashed workers after their lease expires"
+    )
+    parser.add_argument('--spool', required=True, help='Shared spool directory')
+    parser.add_argument('--worker-id', help='Name recorded in job status (default: host-pid)')
+    parser.add_argument('--lease-timeout', type=float, default=LEASE_TIMEOUT, metavar='SECONDS',
+                       help='Requeue running jobs without a heartbeat for this long (default: 300)')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, metavar='SECONDS',
+                       help='Wait between polls of an empty queue (default: 1)')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                       help='Fail a job after its lease expired this many times (default: 3)')
+    parser.add_argument('--exit-when-idle', action='store_true',
+                       help='Exit once no jobs are queued or running instead of polling forever')
+    args = parser.parse_args(argv)
+    
+    try:
+        processed = run_worker(args.spool, worker_id=args.worker_id, lease_timeout=args.lease_timeout,
+                               poll_interval=args.poll_interval, max_attempts=args.max_attempts,
+                               exit_when_idle=args.exit_when_idle)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    
+    print(f"✨ Worker finished: {processed} jobs processed")
+
+def submit_command(argv):
+    """simplemusic submit: queue DSL files for spool workers"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic submit',
+        description="Queue DSL files for conversion by 'simplemusic worker' processes"
+    )
+    parser.add_argument('inputs', nargs='+', help='Input DSL files')
+    parser.add_argument('--spool', required=True, help='Shared spool directory')
+    parser.add_argument('--transpose', type=int, default=0, metavar='SEMITONES',
+                       help='Transpose all non-drum notes by SEMITONES')
+    parser.add_argument('--stretch', type=float, default=1.0, metavar='FACTOR',
+                       help='Scale all note and event timings by FACTOR')
+    parser.add_argument('--quantize', metavar='GRID',
+                       help='Snap note and event starts to GRID')
+    parser.add_argument('--optimize', action='store_true',
+                       help='Drop redundant program/control changes and pitch bends')
+    parser.add_argument('--midi-format', type=int, choices=MIDI_FORMATS, default=1,
+                       help='Standard MIDI File format of the rendered files (default: 1)')
+    args = parser.parse_args(argv)
+    
+    options = {'transpose': args.transpose, 'stretch': args.stretch,
+               'quantize': args.quantize, 'optimize': args.optimize,
+               'midi_format': args.midi_format}
+    for path in args.inputs:
+        if not os.path.isfile(path):
+            print(f"Error: File '{path}' not found")
+            sys.exit(1)
+        try:
+            print(submit_job(args.spool, path, options=options))
+        except (OSError, ValueError) as e:
+            # Includes are expanded at submit time, so a missing or cyclic include fails here
+            print(f"Error: Cannot submit '{path}': {e}")
+            sys.exit(1)
+
+def status_command(argv):
+    """simplemusic status: show spool job states"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic status',
+        description="Show the state of jobs in a spool directory"
+    )
+    parser.add_argument('jobs', nargs='*', help='Job IDs to show (default: all jobs)')
+    parser.add_argument('--spool', required=True, help='Shared spool directory')
+    parser.add_argument('--json', action='store_true', help='Print job status as JSON')
+    args = parser.parse_args(argv)
+    
+    if args.jobs:
+        statuses = [read_status(args.spool, job_id) or {'id': job_id, 'state': 'unknown'}
+                    for job_id in args.jobs]
+    else:
+        statuses = spool_status(args.spool)
+    
+    if args.json:
+        print(json.dumps(statuses, indent=2))
+        return
+    
+    for status in statuses:
+        detail = status.get('output') or status.get('error') or status.get('worker') or ''
+        print(f"{status['id']:<30}{status.get('name', ''):<16}{status['state']:<9}"
+              f"{status.get('attempts', 0):>3}  {detail}")
+    
+    counts = {state: sum(1 for s in statuses if s['state'] == state) for state in JOB_STATES}
+    print(', '.join(f"{count} {state}" for state, count in counts.items()))
+
+def medley_command(argv):
+    """simplemusic medley: concatenate scores into one MIDI file"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic medley',
+        description="Concatenate DSL files end to end into one MIDI file, merging "
+                    "tracks and inserting tempo and program changes at score boundaries"
+    )
+    parser.add_argument('inputs', nargs='+', help='Input DSL files, in playback order')
+    parser.add_argument('-o', '--output', default='medley.mid',
+                       help='Output MIDI file (default: medley.mid)')
+    parser.add_argument('--merge-by', choices=MERGE_MODES, default='name',
+                       help='Merge tracks with the same name or the same channel (default: name)')
+    parser.add_argument('--gap', type=float, default=0.0, metavar='BEATS',
+                       help='Silence between scores in beats (default: 0)')
+    args = parser.parse_args(argv)
+    
+    for path in args.inputs:
+        if not os.path.isfile(path):
+            print(f"Error: File '{path}' not found")
+            sys.exit(1)
+    
+    try:
+        segments = write_medley(args.inputs, args.output, merge_by=args.merge_by, gap=args.gap)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    for segment in segments:
+        print(f"  {segment.start:>10g} - {segment.end:<10g} {segment.name}")
+    print(f"\n✨ Medley of {len(segments)} scores written to {args.output}")
+
+def diff_command(argv):
+    """simplemusic diff: semantic comparison of two scores"""
+    parser = argparse.ArgumentParser(
+        prog='simplemusic diff',
+        description="Compare two scores (DSL or MIDI files) note by note and report added, "
+                    "removed and changed notes and events with bar:beat positions. "
+                    "Exits with 0 if the scores are equivalent, 1 if they differ and 2 on errors"
+    )
+    parser.add_argument('a', help='Original DSL or MIDI file')
+    parser.add_argument('b', help='New DSL or MIDI file')
+    parser.add_argument('--by', choices=DIFF_MODES, default='track',
+                       help='Pair tracks by name, or group by MIDI channel to compare files '
+                            'with different track layouts such as format 0 and 1 (default: track)')
+    parser.add_argument('--limit', type=int, default=100, metavar='N',
+                       help='Print at most N differences, 0 for all (default: 100)')
+    parser.add_argument('--json', action='store_true',
+                       help='Print the full diff as JSON')
+    args = parser.parse_args(argv)
+    
+    for path in (args.a, args.b):
+        if not os.path.isfile(path):
+            print(f"Error: File '{path}' not found", file=sys.stderr)
+            sys.exit(2)
+    
+    try:
+        result = diff_scores(args.a, args.b, by=args.by)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+    else:
+        shown = result.differences if args.limit <= 0 else result.differences[:args.limit]
+        for difference in shown:
+            print(difference.describe())
+        if len(shown) < len(result.differences):
+            print(f"... {len(result.differences) - len(shown)} more (use --limit 0 to show all)")
+        print(result.summary())
+    
+    sys.exit(0 if result.identical else 1)
+
+COMMANDS = {
+    'build': build_command,
+    'export': export_command,
+    'stats': stats_command,
+    'medley': medley_command,
+    'diff': diff_command,
+    'worker': worker_command,
+    'submit': submit_command,
+    'status': status_command,
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Library progress and warnings are logged; show them like plain output
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    
     parser = argparse.ArgumentParser(
         description="Convert SimpleMusic DSL notation to MIDI files",
-        formatter_class=argparse.RawDescriptionHelpFormatter
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Other commands: " + ", ".join(COMMANDS) + " (run 'simplemusic <command> -h')"
     )
     
     parser.add_argument('input', nargs='?', help='Input DSL file (or use --example)')
@@ -23,8 +339,19 @@ def main():
                        help='Show detailed parsing information')
     parser.add_argument('--example', choices=['basic', 'complex', 'advanced'],
                        help='Use a built-in example instead of input file')
+    parser.add_argument('--transpose', type=int, default=0, metavar='SEMITONES',
+                       help='Transpose all non-drum notes by SEMITONES (clamped to 0-127)')
+    parser.add_argument('--stretch', type=float, default=1.0, metavar='FACTOR',
+                       help='Scale all note and event timings by FACTOR')
+    parser.add_argument('--quantize', metavar='GRID',
+                       help="Snap note and event starts to GRID (duration like 's', 'e', 'q/3' or beats)")
+    parser.add_argument('--optimize', action='store_true',
+                       help='Drop redundant program/control changes and pitch bends before writing')
+    parser.add_argument('--midi-format', type=int, choices=MIDI_FORMATS, default=1,
+                       help='Standard MIDI File format: 1 writes one track per DSL track, '
+                            '0 merges everything into a single track (default: 1)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Get DSL text
     if args.example:
@@ -34,11 +361,13 @@ def main():
             'advanced': EXAMPLE_ADVANCED
         }
         dsl_text = examples[args.example]
+        base_dir = None
         print(f"Using built-in example: {args.example}")
     elif args.input:
         try:
             with open(args.input, 'r', encoding='utf-8') as f:
                 dsl_text = f.read()
+            base_dir = os.path.dirname(os.path.abspath(args.input))
         except FileNotFoundError:
             print(f"Error: File '{args.input}' not found")
             sys.exit(1)
@@ -51,7 +380,14 @@ def main():
         sys.exit(1)
     
     # Convert to MIDI
-    result = dsl_to_midi(dsl_text, args.output, verbose=args.verbose)
+    if args.stretch <= 0:
+        print(f"Error: --stretch must be positive, got {args.stretch}")
+        sys.exit(1)
+    
+    result = dsl_to_midi(dsl_text, args.output, verbose=args.verbose,
+                         transpose=args.transpose, stretch=args.stretch,
+                         quantize=args.quantize, optimize=args.optimize,
+                         base_dir=base_dir, midi_format=args.midi_format)
     
     if result is None:
         sys.exit(1)
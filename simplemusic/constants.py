@@ -2,6 +2,9 @@
 Constants for the SimpleMusic DSL parser.
 """
 
+DRUM_CHANNEL = 9  # 通道 10（索引 9）是鼓
+CONDUCTOR_TRACK = '(conductor)'  # 速度和拍号不属于任何轨道，导出和比较时用这个轨道名
+
 NOTE_MAP = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
 
 DURATION_MAP = {
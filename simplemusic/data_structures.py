@@ -19,7 +19,7 @@ class Note:
 @dataclass  
 class Event:
     """MIDI 事件"""
-    type: str  # 'PC', 'CC', 'PB', 'Tempo'
+    type: str  # 'PC', 'CC', 'PB', 'Tempo', 'TimeSig'
     time: float  # 事件时间（拍数）
     channel: int  # 通道
     data: Dict[str, Any]  # 事件数据
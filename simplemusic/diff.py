@@ -0,0 +1,353 @@
+"""
+Semantic diff between two scores (DSL or MIDI) using an aligned note index.
+
+Both scores are reduced to per-track lists of notes keyed by
+(start tick, pitch, channel) and events keyed by (tick, type, channel,
+controller). The lists are sorted, which is close to linear because scores
+are already almost in time order, and aligned with a single merge pass.
+"""
+
+import bisect
+import os
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from math import gcd
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .constants import CONDUCTOR_TRACK
+from .parser import DSLParser
+from .smf import (META_TEMPO, META_TIME_SIGNATURE, META_TRACK_NAME, TICKS_PER_BEAT,
+                  read_smf, read_var_length, score_events)
+
+DIFF_MODES = ['track', 'channel']
+PITCH_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# DSL 文件路径、MIDI 文件路径、DSL 文本、MIDI 数据或 DSLParser.parse() 的结果
+DiffSource = Union[str, bytes, Dict]
+
+# 音符：(开始 tick, 音高, 通道, 时长 tick, 力度)，前三项是对齐键
+NoteEntry = Tuple[int, int, int, int, int]
+# 事件：(tick, 类型, 通道, 控制器号（其他事件为 -1）, 值)，前四项是对齐键
+EventEntry = Tuple[int, str, int, int, object]
+
+@dataclass
+class ScoreIndex:
+    """按轨道分组并排序的音符和事件"""
+    ticks_per_beat: int
+    notes: Dict[str, List[NoteEntry]] = field(default_factory=dict)
+    events: Dict[str, List[EventEntry]] = field(default_factory=dict)
+    time_sigs: List[Tuple[int, int, int]] = field(default_factory=list)  # (tick, 分子, 分母)
+
+    @property
+    def note_count(self) -> int:
+        return sum(len(notes) for notes in self.notes.values())
+
+    @property
+    def event_count(self) -> int:
+        return sum(len(events) for events in self.events.values())
+
+    def rescaled(self, factor: int) -> 'ScoreIndex':
+        """把所有 tick 乘以整数倍，用于对齐不同分辨率的文件"""
+        if factor == 1:
+            return self
+        return ScoreIndex(
+            self.ticks_per_beat * factor,
+            {name: [(t * factor, p, c, d * factor, v) for t, p, c, d, v in notes]
+             for name, notes in self.notes.items()},
+            {name: [(t * factor, k, c, n, v) for t, k, c, n, v in events]
+             for name, events in self.events.items()},
+            [(t * factor, num, den) for t, num, den in self.time_sigs]
+        )
+
+@dataclass
+class Difference:
+    """一处差异；before/after 是音符的 {'duration', 'velocity'} 或事件的 {'value'}"""
+    change: str  # added / removed / changed
+    track: str
+    tick: int
+    bar: int
+    beat: float
+    kind: str  # note 或事件类型（PC/CC/PB/Tempo/TimeSig）
+    channel: int
+    number: int  # 音符的音高或 CC 的控制器号，其他事件为 -1
+    before: Optional[Dict] = None
+    after: Optional[Dict] = None
+
+    def describe(self) -> str:
+        """一行可读的描述"""
+        if self.kind == 'note':
+            what = f"note {pitch_name(self.number)} ch{self.channel + 1}"
+        elif self.kind == 'CC':
+            what = f"CC{self.number} ch{self.channel + 1}"
+        elif self.kind in ('Tempo', 'TimeSig'):
+            what = self.kind
+        else:
+            what = f"{self.kind} ch{self.channel + 1}"
+
+        values = self.after if self.before is None else self.before
+        if self.change == 'changed':
+            detail = ', '.join(f"{key} {self._format(self.before[key])} -> {self._format(self.after[key])}"
+                               for key in self.before if self.before[key] != self.after[key])
+        else:
+            detail = ', '.join(f"{key} {self._format(value)}" for key, value in values.items())
+        sign = {'added': '+', 'removed': '-', 'changed': '~'}[self.change]
+        return f"{self.bar:>5}:{self.beat:<6g} {self.track:<14} {sign} {what}  {detail}"
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+    def _format(self, value) -> str:
+        if self.kind == 'Tempo':
+            return f"{60000000 / value:.6g} bpm"  # 速度按每拍微秒数保存
+        return f"{value:g}" if isinstance(value, float) else str(value)
+
+@dataclass
+class ScoreDiff:
+    """两个乐谱的差异"""
+    ticks_per_beat: int
+    differences: List[Difference]
+    notes: Tuple[int, int]  # 两边的音符数
+    events: Tuple[int, int]  # 两边的事件数
+
+    @property
+    def identical(self) -> bool:
+        return not self.differences
+
+    def counts(self) -> Dict[str, int]:
+        """按 (音符/事件, 变化类型) 统计差异数"""
+        counts = {f"{what}_{change}": 0 for what in ('notes', 'events')
+                  for change in ('added', 'removed', 'changed')}
+        for difference in self.differences:
+            what = 'notes' if difference.kind == 'note' else 'events'
+            counts[f"{what}_{difference.change}"] += 1
+        return counts
+
+    def summary(self) -> str:
+        if self.identical:
+            return f"Scores are equivalent ({self.notes[0]} notes, {self.events[0]} events)"
+        counts = self.counts()
+        return (f"notes: {counts['notes_added']} added, {counts['notes_removed']} removed, "
+                f"{counts['notes_changed']} changed ({self.notes[0]} -> {self.notes[1]}); "
+                f"events: {counts['events_added']} added, {counts['events_removed']} removed, "
+                f"{counts['events_changed']} changed ({self.events[0]} -> {self.events[1]})")
+
+    def to_dict(self) -> Dict:
+        return {'identical': self.identical, 'ticks_per_beat': self.ticks_per_beat,
+                'notes': list(self.notes), 'events': list(self.events), 'counts': self.counts(),
+                'differences': [difference.to_dict() for difference in self.differences]}
+
+def diff_scores(a: DiffSource, b: DiffSource, by: str = 'track') -> ScoreDiff:
+    """比较两个乐谱，按 (tick, 音高, 通道) 对齐音符，报告增加、删除和修改的音符与事件
+
+    by='track' 按轨道名配对轨道；by='channel' 按 MIDI 通道分组，
+    可以比较轨道结构不同的文件（例如格式 0 和格式 1）。小节位置按 a 的拍号计算。
+    """
+    return diff_indexes(load_index(a, by), load_index(b, by))
+
+def diff_indexes(a: ScoreIndex, b: ScoreIndex) -> ScoreDiff:
+    """对齐两个索引；分辨率不同时先换算到公共分辨率"""
+    resolution = a.ticks_per_beat * b.ticks_per_beat // gcd(a.ticks_per_beat, b.ticks_per_beat)
+    a = a.rescaled(resolution // a.ticks_per_beat)
+    b = b.rescaled(resolution // b.ticks_per_beat)
+    bars = _BarMap(resolution, a.time_sigs or b.time_sigs)
+
+    differences = []
+    for track in _union(a.notes, b.notes):
+        for before, after in align(a.notes.get(track, []), b.notes.get(track, []), 3):
+            entry = before or after
+            differences.append(Difference(
+                _change(before, after), track, entry[0], *bars.position(entry[0]), 'note', entry[2], entry[1],
+                _note_values(before, resolution), _note_values(after, resolution)))
+    for track in _union(a.events, b.events):
+        for before, after in align(a.events.get(track, []), b.events.get(track, []), 4):
+            entry = before or after
+            differences.append(Difference(
+                _change(before, after), track, entry[0], *bars.position(entry[0]), entry[1], entry[2], entry[3],
+                None if before is None else {'value': before[4]},
+                None if after is None else {'value': after[4]}))
+
+    differences.sort(key=lambda d: (d.tick, d.track, d.kind != 'note', d.channel, d.number))
+    return ScoreDiff(resolution, differences, (a.note_count, b.note_count), (a.event_count, b.event_count))
+
+def align(a: Sequence[tuple], b: Sequence[tuple], key_length: int) -> Iterator[Tuple[Optional[tuple], Optional[tuple]]]:
+    """有序归并两个排序好的列表，产出不同的 (a 项, b 项)；只在一边的项另一边为 None
+
+    键相同但其余字段不同的两项作为一对修改产出。两个列表相同时直接返回。
+    """
+    if a == b:
+        return
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        item_a, item_b = a[i], b[j]
+        key_a, key_b = item_a[:key_length], item_b[:key_length]
+        if key_a == key_b:
+            if item_a != item_b:
+                yield item_a, item_b
+            i += 1
+            j += 1
+        elif key_a < key_b:
+            yield item_a, None
+            i += 1
+        else:
+            yield None, item_b
+            j += 1
+    for item in a[i:]:
+        yield item, None
+    for item in b[j:]:
+        yield None, item
+
+def load_index(source: DiffSource, by: str = 'track') -> ScoreIndex:
+    """读取 DSL 或 MIDI 并建立索引（MIDI 按 MThd 文件头识别）"""
+    if by not in DIFF_MODES:
+        raise ValueError(f"Unknown diff mode {by!r}, expected one of {', '.join(DIFF_MODES)}")
+    if isinstance(source, dict):
+        return index_parsed(source, by)
+    if isinstance(source, (bytes, bytearray)):
+        return index_midi(bytes(source), by)
+
+    if os.path.isfile(source):
+        with open(source, 'rb') as f:
+            data = f.read()
+        if data[:4] == b'MThd':
+            return index_midi(data, by)
+        parser = DSLParser(data.decode('utf-8'), base_dir=os.path.dirname(os.path.abspath(source)))
+        return index_parsed(parser.parse(), by)
+    return index_parsed(DSLParser(source).parse(), by)
+
+def index_parsed(parsed_data: Dict, by: str = 'track') -> ScoreIndex:
+    """从解析结构建立索引（960 tick/拍）
+
+    使用 MIDI 写入器生成的事件（smf.score_events），tick 取整和重复事件的规则
+    与写出的文件完全一致。
+    """
+    notes = defaultdict(list)
+    events = defaultdict(list)
+    conductor, tracks = score_events(parsed_data)
+
+    _index_track(((tick, message) for tick, _, _, message in conductor), CONDUCTOR_TRACK, by, notes, events)
+    for track_name, track_events in tracks:
+        _index_track(((tick, message) for tick, _, _, message in track_events), track_name, by, notes, events)
+
+    return _finish(TICKS_PER_BEAT, notes, events)
+
+def index_midi(data: bytes, by: str = 'track') -> ScoreIndex:
+    """从 MIDI 文件建立索引：音符开和音符关按 (通道, 音高) 先进先出配对"""
+    smf = read_smf(data)
+    notes = defaultdict(list)
+    events = defaultdict(list)
+
+    for track_idx, track in enumerate(smf.tracks):
+        key = f"Track {track_idx}"
+        for _, message in track:
+            if message[:2] == bytes([0xFF, META_TRACK_NAME]):
+                length, start = read_var_length(message, 2)
+                key = message[start:start + length].decode('utf-8', errors='replace')
+                break
+        _index_track(track, key, by, notes, events)
+
+    return _finish(smf.ticks_per_beat, notes, events)
+
+def pitch_name(pitch: int) -> str:
+    """MIDI 音高转换为音名（60 -> C4）"""
+    return f"{PITCH_NAMES[pitch % 12]}{pitch // 12 - 1}"
+
+class _BarMap:
+    """tick 转换为 (小节, 拍)，支持拍号变化；拍按拍号分母计"""
+
+    def __init__(self, ticks_per_beat: int, time_sigs: List[Tuple[int, int, int]]):
+        self.starts = []  # 每段拍号的开始 tick
+        self.segments = []  # (开始小节, 每拍 tick 数, 每小节 tick 数)
+        bar = 1
+        for tick, numerator, denominator in time_sigs or [(0, 4, 4)]:
+            if self.starts:
+                previous = self.segments[-1]
+                bar = previous[0] + -(-(tick - self.starts[-1]) // previous[2])
+            beat_ticks = ticks_per_beat * 4 / denominator
+            self.starts.append(tick)
+            self.segments.append((bar, beat_ticks, beat_ticks * numerator))
+
+    def position(self, tick: int) -> Tuple[int, float]:
+        idx = max(bisect.bisect_right(self.starts, tick) - 1, 0)
+        bar, beat_ticks, bar_ticks = self.segments[idx]
+        offset = tick - self.starts[idx]
+        bars, within = divmod(offset, bar_ticks)
+        return bar + int(bars), round(1 + within / beat_ticks, 6)
+
+def _index_track(track: Iterable[Tuple[int, bytes]], key: str, by: str, notes: Dict, events: Dict):
+    """把一个轨道的 (tick, 消息字节) 加入索引；速度和拍号进入指挥轨"""
+    conductor = events[CONDUCTOR_TRACK]
+    # 每个通道对应的轨道键；按轨道比较时都是轨道名
+    keys = [key] * 16 if by == 'track' else [_channel_key(channel) for channel in range(16)]
+    sounding = {}  # 通道 * 128 + 音高 -> 正在发声的 (开始 tick, 力度, 音符列表)
+    last_tick = 0
+    for tick, message in track:
+        last_tick = tick
+        status = message[0]
+        if status < 0xF0:
+            kind, channel = status & 0xF0, status & 0x0F
+            if kind == 0x90 and message[2] > 0:
+                started = sounding.get(channel << 7 | message[1])
+                if started is None:
+                    started = sounding[channel << 7 | message[1]] = deque()
+                started.append((tick, message[2], notes[keys[channel]]))
+            elif kind == 0x80 or kind == 0x90:
+                started = sounding.get(channel << 7 | message[1])
+                if started:
+                    start_tick, velocity, note_list = started.popleft()
+                    note_list.append((start_tick, message[1], channel, tick - start_tick, velocity))
+            elif kind == 0xC0:
+                events[keys[channel]].append((tick, 'PC', channel, -1, message[1]))
+            elif kind == 0xB0:
+                events[keys[channel]].append((tick, 'CC', channel, message[1], message[2]))
+            elif kind == 0xE0:
+                events[keys[channel]].append((tick, 'PB', channel, -1, (message[1] | message[2] << 7) - 8192))
+        elif status == 0xFF:
+            length, start = read_var_length(message, 2)
+            payload = message[start:start + length]
+            if message[1] == META_TEMPO:
+                conductor.append((tick, 'Tempo', 0, -1, int.from_bytes(payload, 'big')))
+            elif message[1] == META_TIME_SIGNATURE:
+                conductor.append((tick, 'TimeSig', 0, -1, f"{payload[0]}/{2 ** payload[1]}"))
+        # 系统码不参与比较
+
+    # 没有音符关的音符持续到轨道结束
+    for pitch_key, started in sounding.items():
+        for start_tick, velocity, note_list in started:
+            note_list.append((start_tick, pitch_key & 0x7F, pitch_key >> 7, last_tick - start_tick, velocity))
+
+def _finish(ticks_per_beat: int, notes: Dict, events: Dict) -> ScoreIndex:
+    for entries in notes.values():
+        entries.sort()
+    for entries in events.values():
+        entries.sort(key=lambda event: event[:4])  # 稳定排序：同一键的事件保持原顺序
+
+    # 不改变速度或拍号的事件没有作用（格式 0 写入器会删掉它们），不参与比较
+    conductor = []
+    current = {}
+    for event in events.pop(CONDUCTOR_TRACK, []):
+        if current.get(event[1]) != event[4]:
+            current[event[1]] = event[4]
+            conductor.append(event)
+    time_sigs = [(tick, *map(int, value.split('/'))) for tick, kind, _, _, value in conductor
+                 if kind == 'TimeSig']
+    if conductor:
+        events[CONDUCTOR_TRACK] = conductor
+    return ScoreIndex(ticks_per_beat, dict(notes), dict(events), time_sigs)
+
+def _union(a: Dict, b: Dict) -> List[str]:
+    return list(a) + [key for key in b if key not in a]
+
+def _change(before, after) -> str:
+    if before is None:
+        return 'added'
+    return 'removed' if after is None else 'changed'
+
+def _note_values(entry: Optional[NoteEntry], ticks_per_beat: int) -> Optional[Dict]:
+    if entry is None:
+        return None
+    return {'duration': entry[3] / ticks_per_beat, 'velocity': entry[4]}
+
+def _channel_key(channel: int) -> str:
+    return f"Channel {channel + 1}"
+
@@ -0,0 +1,183 @@
+"""
+Streaming row exporters (NDJSON, CSV, Arrow, Parquet) for parsed notes and events.
+"""
+
+import csv
+import json
+from itertools import chain
+from typing import Dict, IO, Iterator, Union
+
+try:
+    import pyarrow as pa
+except ImportError:  # 可选依赖：没有 pyarrow 时只支持 NDJSON/CSV
+    pa = None
+
+from .constants import CONDUCTOR_TRACK
+from .parser import DSLParser
+from .data_structures import Note, Event
+
+# 每一行的列（音符和事件共用一个扁平结构，不适用的列为空）
+ROW_FIELDS = ['track', 'kind', 'time', 'duration', 'pitch', 'velocity', 'channel',
+              'instrument', 'actual_length', 'event_type', 'controller', 'value']
+
+EXPORT_FORMATS = ['ndjson', 'csv', 'arrow', 'parquet']
+DEFAULT_BATCH_SIZE = 65536
+
+Source = Union[DSLParser, Dict]
+
+def iter_rows(source: Source) -> Iterator[Dict]:
+    """逐行产出音符和事件
+
+    source 可以是 DSLParser（流式解析，不保留整个乐谱）或 parse() 的结果。
+    优化过的乐谱的指挥轨事件放在最后，轨道名为 (conductor)。
+    """
+    if isinstance(source, DSLParser):
+        items = source.iter_parse()
+    else:
+        items = chain(
+            ((track_name, item)
+             for track_name, track_data in source.get('tracks', {}).items()
+             for item in track_data.get('notes', []) + track_data.get('events', [])),
+            ((CONDUCTOR_TRACK, event) for event in source.get('conductor', {}).get('events', []))
+        )
+
+    for track_name, item in items:
+        yield _to_row(track_name, item)
+
+def score_metadata(source: Source) -> Dict:
+    """乐谱元数据"""
+    if isinstance(source, DSLParser):
+        return source.metadata()
+    return dict(source.get('metadata', {}))
+
+def write_ndjson(source: Source, stream: IO[str]) -> int:
+    """写入 NDJSON：第一行是元数据，之后每行一个音符或事件"""
+    metadata = score_metadata(source)
+    stream.write(json.dumps({'kind': 'metadata', **metadata}, ensure_ascii=False) + '\n')
+    count = 0
+    for row in iter_rows(source):
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def write_csv(source: Source, stream: IO[str]) -> int:
+    """写入 CSV（带表头），空值写为空字段"""
+    writer = csv.DictWriter(stream, fieldnames=ROW_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in iter_rows(source):
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_arrow(source: Source, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """写入 Arrow IPC 文件，按批次流式写入"""
+    _require_pyarrow('arrow')
+    schema = _arrow_schema(score_metadata(source))
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        return _write_batches(source, schema, writer.write_batch, batch_size)
+
+def write_parquet(source: Source, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """写入 Parquet 文件，按批次流式写入"""
+    _require_pyarrow('parquet')
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(score_metadata(source))
+    with pq.ParquetWriter(path, schema) as writer:
+        return _write_batches(source, schema, writer.write_batch, batch_size)
+
+def export_score(source: Source, output: Union[str, IO[str]], format: str = 'ndjson',
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """导出乐谱为指定格式，返回写入的行数（不含元数据行）"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+
+    if format in ('arrow', 'parquet'):
+        if not isinstance(output, str):
+            raise ValueError(f"{format} export needs a file path")
+        writer = write_arrow if format == 'arrow' else write_parquet
+        return writer(source, output, batch_size)
+
+    text_writer = write_ndjson if format == 'ndjson' else write_csv
+    if isinstance(output, str):
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            return text_writer(source, f)
+    return text_writer(source, output)
+
+def _to_row(track_name: str, item: Union[Note, Event]) -> Dict:
+    if isinstance(item, Note):
+        return {
+            'track': track_name,
+            'kind': 'note',
+            'time': item.start_time,
+            'duration': item.duration,
+            'pitch': item.pitch,
+            'velocity': item.velocity,
+            'channel': item.channel,
+            'instrument': item.instrument,
+            'actual_length': item.actual_length,
+            'event_type': None,
+            'controller': None,
+            'value': None
+        }
+
+    data = item.data
+    controller = data.get('controller')
+    if item.type == 'PC':
+        value = data.get('program')
+    elif item.type == 'Tempo':
+        value = data.get('tempo')
+    elif item.type == 'TimeSig':
+        # 拍号：value 是分子，controller 列是分母
+        value, controller = data.get('numerator'), data.get('denominator')
+    else:
+        value = data.get('value')
+    return {
+        'track': track_name,
+        'kind': 'event',
+        'time': item.time,
+        'duration': None,
+        'pitch': None,
+        'velocity': None,
+        'channel': item.channel,
+        'instrument': None,
+        'actual_length': None,
+        'event_type': item.type,
+        'controller': controller,
+        'value': value
+    }
+
+def _require_pyarrow(format: str):
+    if pa is None:
+        raise ImportError(f"{format} export requires pyarrow (pip install 'simplemusic[arrow]'); "
+                          f"use the ndjson or csv format without it")
+
+def _arrow_schema(metadata: Dict) -> 'pa.Schema':
+    fields = [
+        ('track', pa.string()), ('kind', pa.string()), ('time', pa.float64()),
+        ('duration', pa.float64()), ('pitch', pa.int16()), ('velocity', pa.int16()),
+        ('channel', pa.int8()), ('instrument', pa.int16()), ('actual_length', pa.float64()),
+        ('event_type', pa.string()), ('controller', pa.int16()), ('value', pa.int32())
+    ]
+    encoded = {key: json.dumps(value) for key, value in metadata.items()}
+    return pa.schema(fields, metadata=encoded)
+
+def _write_batches(source: Source, schema: 'pa.Schema', write_batch, batch_size: int) -> int:
+    """按列缓冲 batch_size 行后写出一个批次"""
+    columns: Dict[str, list] = {name: [] for name in ROW_FIELDS}
+    count = 0
+
+    def flush():
+        if columns['kind']:
+            write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+
+    for row in iter_rows(source):
+        for name in ROW_FIELDS:
+            columns[name].append(row[name])
+        count += 1
+        if len(columns['kind']) >= batch_size:
+            flush()
+    flush()
+    return count
@@ -0,0 +1,219 @@
+"""
+Concatenate several scores into one continuous medley.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+from midiutil import MIDIFile
+
+from .constants import DRUM_CHANNEL
+from .parser import DSLParser
+from .data_structures import Event
+from .midi_converter import _add_track_contents
+from .smf import time_signature_exponent
+
+logger = logging.getLogger(__name__)
+
+MERGE_MODES = ['name', 'channel']
+
+# DSL 文件路径、DSL 文本或 DSLParser.parse() 的结果
+ScoreSource = Union[str, Dict]
+
+@dataclass
+class MedleySegment:
+    """一首乐谱在串烧中的位置（拍）"""
+    name: str
+    start: float
+    end: float
+
+def concat_scores(sources: Sequence[ScoreSource], merge_by: str = 'name', gap: float = 0.0) -> Dict:
+    """把多首乐谱首尾相接成一个解析结构（所有乐谱都会保留在内存中）"""
+    layout = _plan_layout(sources, merge_by)
+    result = {'metadata': {}, 'tracks': {}}
+    for key, config in layout.items():
+        result['tracks'][config['name']] = {
+            'config': {'channel': config['channel'], 'instrument': config['instrument']},
+            'notes': [],
+            'events': []
+        }
+
+    end = 0.0
+    for index, (segment_info, segment) in enumerate(_iter_segments(sources, layout, merge_by, gap)):
+        if index == 0:
+            result['metadata'] = dict(segment_info['metadata'])
+        for key, (notes, events) in segment.items():
+            track_data = result['tracks'][layout[key]['name']]
+            track_data['notes'].extend(notes)
+            track_data['events'].extend(events)
+        end = segment_info['end']
+
+    # 所有轨道都在最后一首乐谱结束时结束，串烧结果可以再次首尾相接
+    for track_data in result['tracks'].values():
+        track_data['end_time'] = end
+    return result
+
+def write_medley(sources: Sequence[ScoreSource], output_file: str, merge_by: str = 'name',
+                 gap: float = 0.0) -> List[MedleySegment]:
+    """把多首乐谱首尾相接写入一个 MIDI 文件，返回每首乐谱的位置
+
+    第一遍只读取轨道头来确定输出轨道；第二遍逐首解析、平移并加入写入器，
+    加入后立即丢弃，所以任何时候只有一首乐谱的音符对象在内存中。
+    """
+    layout = _plan_layout(sources, merge_by)
+    if not layout:
+        raise ValueError("Medley has no tracks")
+
+    midi = MIDIFile(len(layout), deinterleave=False)
+    track_index = {key: idx for idx, key in enumerate(layout)}
+    for key, config in layout.items():
+        midi.addTrackName(track_index[key], 0, config['name'])
+        if config['channel'] != DRUM_CHANNEL:
+            midi.addProgramChange(track_index[key], config['channel'], 0, config['instrument'])
+
+    segments = []
+    for index, (segment_info, segment) in enumerate(_iter_segments(sources, layout, merge_by, gap)):
+        if index == 0:
+            metadata = segment_info['metadata']
+            time_sig = metadata.get('time_sig', (4, 4))
+            midi.addTimeSignature(0, 0, time_sig[0], time_signature_exponent(time_sig[1]), 24)
+            midi.addTempo(0, 0, metadata.get('tempo', 120))
+        for key, (notes, events) in segment.items():
+            _add_track_contents(midi, track_index[key], notes, events)
+        segments.append(MedleySegment(segment_info['name'], segment_info['start'], segment_info['end']))
+
+    with open(output_file, 'wb') as f:
+        midi.writeFile(f)
+
+    logger.info(f"✅ 串烧已生成: {output_file}（{len(segments)} 首）")
+    return segments
+
+def _plan_layout(sources: Sequence[ScoreSource], merge_by: str) -> Dict:
+    """第一遍：确定输出轨道（按首次出现的顺序）
+
+    按名称合并时键是轨道名，按通道合并时键是通道。输出轨道使用首次出现时的通道；
+    乐器取第一首乐谱中该通道的乐器，保证时间 0 的音色变化互不冲突，
+    后面乐谱需要的音色在各自的开始位置再切换。
+    """
+    if merge_by not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode {merge_by!r}, expected one of {', '.join(MERGE_MODES)}")
+
+    layout = {}
+    initial_programs = {}
+    for index, source in enumerate(sources):
+        for name, config in _track_layout(source).items():
+            channel = config['channel']
+            if index == 0:
+                initial_programs.setdefault(channel, config['instrument'])
+            key = name if merge_by == 'name' else channel
+            if key not in layout:
+                layout[key] = {'name': name, 'channel': channel,
+                               'instrument': initial_programs.get(channel, config['instrument'])}
+    return layout
+
+def _iter_segments(sources: Sequence[ScoreSource], layout: Dict, merge_by: str,
+                   gap: float) -> Iterator[Tuple[Dict, Dict]]:
+    """第二遍：逐首解析并按累计结束时间平移，产出 (位置信息, {输出轨道键: (音符, 事件)})
+
+    在每首乐谱开始的位置插入需要的速度、拍号和音色变化。
+    """
+    first_key = next(iter(layout), None)
+    programs = {config['channel']: config['instrument'] for config in layout.values()}
+    tempo = None
+    time_sig = None
+    offset = 0.0
+
+    for index, source in enumerate(sources):
+        parsed = _load(source)
+        metadata = parsed.get('metadata', {})
+        segment = {}
+        end = 0.0
+
+        # 速度或拍号与上一首结束时不同时插入变化
+        score_tempo = metadata.get('tempo', 120)
+        if tempo is not None and score_tempo != tempo:
+            segment.setdefault(first_key, ([], []))[1].append(Event('Tempo', offset, 0, {'tempo': score_tempo}))
+        tempo = score_tempo
+        score_time_sig = tuple(metadata.get('time_sig', (4, 4)))
+        if time_sig is not None and score_time_sig != time_sig:
+            segment.setdefault(first_key, ([], []))[1].append(Event(
+                'TimeSig', offset, 0, {'numerator': score_time_sig[0], 'denominator': score_time_sig[1]}))
+        time_sig = score_time_sig
+
+        changed_channels = set()
+        for name, track_data in parsed.get('tracks', {}).items():
+            config = track_data.get('config', {})
+            channel = config.get('channel', 0)
+            key = name if merge_by == 'name' else channel
+            notes, events = segment.setdefault(key, ([], []))
+            # 解析结果带有轨道的结束时间（含末尾休止符），取所有轨道的最大值
+            end = max(end, track_data.get('end_time', 0.0))
+
+            if channel != DRUM_CHANNEL and programs.get(channel) != config.get('instrument', 0):
+                events.append(Event('PC', offset, channel, {'program': config.get('instrument', 0)}))
+                programs[channel] = config.get('instrument', 0)
+
+            for note in track_data.get('notes', []):
+                notes.append(replace(note, start_time=note.start_time + offset))
+                end = max(end, note.start_time + note.duration)
+                if note.instrument is not None:
+                    changed_channels.add(note.channel)
+            for event in track_data.get('events', []):
+                events.append(Event(event.type, event.time + offset, event.channel, dict(event.data)))
+                end = max(end, event.time)
+                if event.type == 'PC':
+                    changed_channels.add(event.channel)
+
+        # 优化过的乐谱把速度事件放在指挥轨
+        tempo_events = [event for track_data in parsed.get('tracks', {}).values()
+                        for event in track_data.get('events', []) if event.type == 'Tempo']
+        for event in parsed.get('conductor', {}).get('events', []):
+            segment.setdefault(first_key, ([], []))[1].append(
+                Event('Tempo', event.time + offset, event.channel, dict(event.data)))
+            tempo_events.append(event)
+            end = max(end, event.time)
+        if tempo_events:
+            tempo = max(tempo_events, key=lambda event: event.time).data['tempo']
+        # 乐谱本身（例如串烧结果）可能带有拍号变化
+        time_sig_events = [event for track_data in parsed.get('tracks', {}).values()
+                           for event in track_data.get('events', []) if event.type == 'TimeSig']
+        if time_sig_events:
+            last = max(time_sig_events, key=lambda event: event.time).data
+            time_sig = (last['numerator'], last['denominator'])
+
+        # 乐谱内部切换过音色的通道状态未知，下一首开始时重新设置
+        for channel in changed_channels:
+            programs[channel] = None
+
+        info = {'name': _source_name(source, index), 'start': offset, 'end': offset + end,
+                'metadata': metadata}
+        logger.debug(f"串烧片段 {info['name']}: {info['start']} - {info['end']}")
+        yield info, segment
+        offset += end + gap
+
+def _track_layout(source: ScoreSource) -> Dict[str, Dict]:
+    if isinstance(source, dict):
+        return {name: dict(track_data.get('config', {}))
+                for name, track_data in source.get('tracks', {}).items()}
+    text, base_dir = _read_source(source)
+    return DSLParser(text, base_dir=base_dir).track_layout()
+
+def _load(source: ScoreSource) -> Dict:
+    if isinstance(source, dict):
+        return source
+    text, base_dir = _read_source(source)
+    return DSLParser(text, base_dir=base_dir).parse()
+
+def _read_source(source: str) -> Tuple[str, str]:
+    """DSL 文件路径返回文件内容和所在目录，其他字符串当作 DSL 文本"""
+    if os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            return f.read(), os.path.dirname(os.path.abspath(source))
+    return source, None
+
+def _source_name(source: ScoreSource, index: int) -> str:
+    if isinstance(source, str) and os.path.isfile(source):
+        return os.path.splitext(os.path.basename(source))[0]
+    return f"score{index + 1}"
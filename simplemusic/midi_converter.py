@@ -1,20 +1,120 @@
 """
 MIDI file creation and conversion functions.
+
+Conversions keep all state in local objects, so `convert` can be called from
+any number of threads at once. Progress and warnings go to the
+``simplemusic`` logger instead of stdout.
+
+`convert` does not read other files unless asked to: ``Include`` directives
+are rejected unless `ConvertOptions.base_dir` is set (or `allow_includes`
+opts in to the current directory), and included paths must be relative and
+stay inside that directory.
 """
 
-from typing import Dict
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
 from midiutil import MIDIFile
 
+from .constants import DRUM_CHANNEL
 from .parser import DSLParser
+from .data_structures import Note, Event
+from .transforms import transform_score
+from .optimizer import optimize_score
+from .smf import smf_bytes, time_signature_exponent
+
+logger = logging.getLogger(__name__)
+
+MIDI_FORMATS = [0, 1]  # 0：所有轨道合并为一个事件流；1：每个轨道一个 MTrk
+
+@dataclass(frozen=True)
+class ConvertOptions:
+    """转换选项（不可变，可以在线程之间共享）"""
+    transpose: int = 0
+    stretch: float = 1.0
+    quantize: Optional[Union[str, float]] = None
+    optimize: bool = False
+    base_dir: Optional[str] = None  # Include 的基准目录，设置后才展开 Include
+    midi_format: int = 1
+    allow_includes: bool = False  # 没有 base_dir 时也展开 Include（相对于当前目录）
+    confine_includes: bool = True  # Include 只能是 base_dir 内的相对路径
 
-def create_midi_file(parsed_data: Dict, output_file: str = 'output.mid'):
+def create_midi_file(parsed_data: Dict, output_file: str = 'output.mid', midi_format: int = 1):
     """从解析的数据创建 MIDI 文件"""
+    data = _midi_bytes(parsed_data, midi_format)
+    if data is None:
+        return
+    
+    # 写入文件
+    with open(output_file, 'wb') as f:
+        f.write(data)
+    
+    logger.info(f"✅ MIDI 文件已生成: {output_file}")
+
+def convert(dsl_text: str, options: Optional[ConvertOptions] = None) -> bytes:
+    """将 DSL 文本转换为 MIDI 文件内容（线程安全，可重入）"""
+    options = options or ConvertOptions()
+    data = _midi_bytes(prepare_score(dsl_text, options), options.midi_format)
+    if data is None:
+        raise ValueError("Score has no tracks")
+    return data
+
+async def convert_async(dsl_text: str, options: Optional[ConvertOptions] = None,
+                        executor: Optional[Executor] = None) -> bytes:
+    """convert 的异步版本：在线程池中转换，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, convert, dsl_text, options)
+
+def prepare_score(dsl_text: str, options: ConvertOptions) -> Dict:
+    """解析 DSL 并应用可选的变换和优化，返回 create_midi_file 使用的解析结构"""
+    parsed_data = DSLParser(dsl_text, base_dir=options.base_dir,
+                            allow_includes=options.base_dir is not None or options.allow_includes,
+                            confine_includes=options.confine_includes).parse()
+    
+    # 可选的整曲变换（移调、时间缩放、量化）
+    if options.transpose or options.stretch != 1.0 or options.quantize is not None:
+        parsed_data = transform_score(parsed_data, transpose_by=options.transpose,
+                                      stretch=options.stretch, quantize_to=options.quantize)
+    
+    # 可选的冗余事件消除（必须在所有变换之后）
+    if options.optimize:
+        parsed_data, report = optimize_score(parsed_data)
+        logger.info(f"🧹 事件优化: {report.summary()}")
+    
+    return parsed_data
+
+def _midi_bytes(parsed_data: Dict, midi_format: int = 1) -> Optional[bytes]:
+    """生成 MIDI 文件内容，没有轨道时返回 None
+
+    格式 1 使用 MIDIUtil；格式 0 使用 smf 模块把所有轨道归并成一个事件流。
+    """
+    if midi_format not in MIDI_FORMATS:
+        raise ValueError(f"Unsupported MIDI format {midi_format}, expected 0 or 1")
+    
+    if midi_format == 0:
+        if not parsed_data.get('tracks'):
+            logger.warning("警告：没有找到任何轨道数据")
+            return None
+        return smf_bytes(parsed_data, midi_format=0)
+    
+    midi = _build_midi(parsed_data)
+    if midi is None:
+        return None
+    buffer = io.BytesIO()
+    midi.writeFile(buffer)
+    return buffer.getvalue()
+
+def _build_midi(parsed_data: Dict) -> Optional[MIDIFile]:
+    """从解析的数据构建 MIDIFile，没有轨道时返回 None"""
     metadata = parsed_data.get('metadata', {})
     tracks_data = parsed_data.get('tracks', {})
     
     if not tracks_data:
-        print("警告：没有找到任何轨道数据")
-        return
+        logger.warning("警告：没有找到任何轨道数据")
+        return None
     
     # 创建 MIDI 文件，至少需要一个轨道
     num_tracks = max(1, len(tracks_data))
@@ -24,17 +124,21 @@ def create_midi_file(parsed_data: Dict, output_file: str = 'output.mid'):
     tempo = metadata.get('tempo', 120)
     time_sig = metadata.get('time_sig', (4, 4))
     
+    # 优化过的数据带有指挥轨，全局元事件只写一次
+    conductor = parsed_data.get('conductor')
+    
     # 为每个轨道设置元数据和音符
     for track_idx, (track_name, track_data) in enumerate(tracks_data.items()):
         # 设置轨道名称
         midi.addTrackName(track_idx, 0, track_name)
         
-        # 设置拍号
-        midi.addTimeSignature(track_idx, 0, time_sig[0], 
-                            int(2 ** (2 - time_sig[1] / 4)), 24)
-        
-        # 设置初始速度
-        midi.addTempo(track_idx, 0, tempo)
+        if conductor is None or track_idx == 0:
+            # 设置拍号
+            midi.addTimeSignature(track_idx, 0, time_sig[0], 
+                                time_signature_exponent(time_sig[1]), 24)
+            
+            # 设置初始速度
+            midi.addTempo(track_idx, 0, tempo)
         
         # 获取轨道配置
         config = track_data.get('config', {})
@@ -42,73 +146,82 @@ def create_midi_file(parsed_data: Dict, output_file: str = 'output.mid'):
         default_instrument = config.get('instrument', 0)
         
         # 设置默认乐器（除非是鼓轨道）
-        if default_channel != 9:  # Channel 10 (index 9) 是鼓
+        if default_channel != DRUM_CHANNEL:
             midi.addProgramChange(track_idx, default_channel, 0, default_instrument)
         
-        # 添加音符
-        notes = track_data.get('notes', [])
-        for note in notes:
-            # 如果音符指定了特殊乐器，先切换乐器
-            if note.instrument is not None and note.channel != 9:
-                midi.addProgramChange(track_idx, note.channel, note.start_time, note.instrument)
-            
-            # 计算实际持续时间
-            actual_duration = note.actual_length if note.actual_length else note.duration
-            
-            # 添加音符
-            try:
-                midi.addNote(track_idx, note.channel, note.pitch, 
-                           note.start_time, actual_duration, note.velocity)
-            except Exception as e:
-                print(f"警告：无法添加音符 (pitch={note.pitch}, time={note.start_time}): {e}")
-        
-        # 添加事件
-        events = track_data.get('events', [])
-        for event in events:
-            try:
-                if event.type == 'PC':
-                    midi.addProgramChange(track_idx, event.channel, event.time, 
-                                        event.data['program'])
-                elif event.type == 'CC':
-                    midi.addControllerEvent(track_idx, event.channel, event.time,
-                                          event.data['controller'], event.data['value'])
-                elif event.type == 'PB':
-                    # MIDIFile 的 pitchWheelEvent 需要将值转换到 0-16383 范围
-                    pb_value = event.data['value'] + 8192  # 转换从 -8192~8191 到 0~16383
-                    midi.addPitchWheelEvent(track_idx, event.channel, event.time, pb_value)
-                elif event.type == 'Tempo':
-                    midi.addTempo(track_idx, event.time, event.data['tempo'])
-            except Exception as e:
-                print(f"警告：无法添加事件 {event.type}: {e}")
+        _add_track_contents(midi, track_idx, track_data.get('notes', []), track_data.get('events', []))
     
-    # 写入文件
-    with open(output_file, 'wb') as f:
-        midi.writeFile(f)
+    # 添加指挥轨的速度变化
+    if conductor is not None:
+        for event in conductor.get('events', []):
+            midi.addTempo(0, event.time, event.data['tempo'])
+    
+    return midi
+
+def _add_track_contents(midi: MIDIFile, track_idx: int, notes: List[Note], events: List[Event]):
+    """把音符（含乐器覆盖）和事件添加到 MIDIFile 的一个轨道"""
+    # 添加音符
+    for note in notes:
+        # 如果音符指定了特殊乐器，先切换乐器
+        if note.instrument is not None and note.channel != DRUM_CHANNEL:
+            midi.addProgramChange(track_idx, note.channel, note.start_time, note.instrument)
+        
+        # 计算实际持续时间
+        actual_duration = note.actual_length if note.actual_length else note.duration
+        
+        # 添加音符
+        try:
+            midi.addNote(track_idx, note.channel, note.pitch, 
+                       note.start_time, actual_duration, note.velocity)
+        except Exception as e:
+            logger.warning(f"警告：无法添加音符 (pitch={note.pitch}, time={note.start_time}): {e}")
     
-    print(f"✅ MIDI 文件已生成: {output_file}")
+    # 添加事件
+    for event in events:
+        try:
+            if event.type == 'PC':
+                midi.addProgramChange(track_idx, event.channel, event.time, 
+                                    event.data['program'])
+            elif event.type == 'CC':
+                midi.addControllerEvent(track_idx, event.channel, event.time,
+                                      event.data['controller'], event.data['value'])
+            elif event.type == 'PB':
+                # MIDIFile 写入时自己加 8192，这里直接传 -8192~8191 的值
+                midi.addPitchWheelEvent(track_idx, event.channel, event.time, event.data['value'])
+            elif event.type == 'Tempo':
+                midi.addTempo(track_idx, event.time, event.data['tempo'])
+            elif event.type == 'TimeSig':
+                midi.addTimeSignature(track_idx, event.time, event.data['numerator'],
+                                      time_signature_exponent(event.data['denominator']), 24)
+        except Exception as e:
+            logger.warning(f"警告：无法添加事件 {event.type}: {e}")
 
-def dsl_to_midi(dsl_text: str, output_file: str = 'output.mid', verbose: bool = False):
+def dsl_to_midi(dsl_text: str, output_file: str = 'output.mid', verbose: bool = False,
+                transpose: int = 0, stretch: float = 1.0,
+                quantize: Optional[Union[str, float]] = None, optimize: bool = False,
+                base_dir: Optional[str] = None, midi_format: int = 1):
     """主函数：将 DSL 文本转换为 MIDI 文件"""
     try:
-        parser = DSLParser(dsl_text)
-        parsed_data = parser.parse()
+        # 命令行转换本地文件：和以前一样允许任意 Include
+        options = ConvertOptions(transpose=transpose, stretch=stretch, quantize=quantize,
+                                 optimize=optimize, base_dir=base_dir, midi_format=midi_format,
+                                 allow_includes=True, confine_includes=False)
+        parsed_data = prepare_score(dsl_text, options)
         
         if verbose:
-            print("\n📊 解析结果:")
-            print(f"  元数据: {parsed_data['metadata']}")
-            print(f"  轨道数: {len(parsed_data['tracks'])}")
+            logger.info("\n📊 解析结果:")
+            logger.info(f"  元数据: {parsed_data['metadata']}")
+            logger.info(f"  轨道数: {len(parsed_data['tracks'])}")
             
             for track_name, track_data in parsed_data['tracks'].items():
-                print(f"\n  轨道 '{track_name}':")
-                print(f"    配置: {track_data['config']}")
-                print(f"    音符数: {len(track_data.get('notes', []))}")
-                print(f"    事件数: {len(track_data.get('events', []))}")
+                logger.info(f"\n  轨道 '{track_name}':")
+                logger.info(f"    配置: {track_data['config']}")
+                logger.info(f"    音符数: {len(track_data.get('notes', []))}")
+                logger.info(f"    事件数: {len(track_data.get('events', []))}")
         
-        create_midi_file(parsed_data, output_file)
+        create_midi_file(parsed_data, output_file, midi_format)
         return parsed_data
         
     except Exception as e:
-        print(f"❌ 转换失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ 转换失败: {e}")
         return None
\ No newline at end of file
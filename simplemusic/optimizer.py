@@ -0,0 +1,125 @@
+"""
+Redundant MIDI event elimination for parsed SimpleMusic data.
+"""
+
+import heapq
+from dataclasses import dataclass, replace
+from typing import Dict, List, Tuple
+
+from .data_structures import Event
+from .smf import META_TEMPO, score_items, unique_key
+
+@dataclass
+class OptimizationReport:
+    """优化结果统计"""
+    removed_program_changes: int = 0
+    removed_control_changes: int = 0
+    removed_pitch_bends: int = 0
+    removed_tempo_changes: int = 0
+
+    @property
+    def total_removed(self) -> int:
+        return (self.removed_program_changes + self.removed_control_changes +
+                self.removed_pitch_bends + self.removed_tempo_changes)
+
+    def summary(self) -> str:
+        """单行摘要"""
+        return (f"removed {self.total_removed} events "
+                f"(PC={self.removed_program_changes}, CC={self.removed_control_changes}, "
+                f"PB={self.removed_pitch_bends}, Tempo={self.removed_tempo_changes})")
+
+def optimize_score(parsed_data: Dict) -> Tuple[Dict, OptimizationReport]:
+    """删除冗余的 PC/CC/PB 和速度事件，并把全局元事件合并到一个指挥轨
+
+    状态按写入器实际写出的事件流跟踪（smf.score_items：同一 tick 内的顺序、
+    音符乐器覆盖排在轨道事件之前、MIDIUtil 的去重规则），所以优化前后的
+    文件在每个音符开始时的通道状态相同。输入不会被修改；返回新的解析结构和统计报告。
+    """
+    metadata = parsed_data.get('metadata', {})
+    tracks_data = parsed_data.get('tracks', {})
+    report = OptimizationReport()
+
+    conductor_items, track_items = score_items(parsed_data)
+    streams = [conductor_items] + [items for _, items in track_items]
+    # 与格式 0 归并相同的顺序：(tick, 同 tick 内顺序, 轨道索引, 插入序号)
+    merged = heapq.merge(*[[(tick, order, idx, seq, message, source)
+                            for tick, order, seq, message, source in stream]
+                           for idx, stream in enumerate(streams)])
+
+    # 逐通道跟踪状态，值未改变的项即为冗余
+    programs = {}
+    controllers = {}
+    bends = {}
+    tempo = None
+    seen = [set() for _ in streams]  # 每个轨道内写入器去重用的键
+    dropped = set()
+    conductor_events = []
+
+    for tick, order, idx, seq, message, source in merged:
+        key = unique_key((tick, order, seq, message))
+        if key is not None:
+            if key in seen[idx]:
+                # 写入器本来就会删掉的重复项：一并删除，不计入统计，
+                # 这样删掉它前面的同一事件后它也不会重新出现
+                if source is not None:
+                    dropped.add(source)
+                continue
+            seen[idx].add(key)
+
+        status = message[0] & 0xF0
+        channel = message[0] & 0x0F
+        if message[:2] == bytes([0xFF, META_TEMPO]):
+            if source is None:
+                tempo = message  # 初始速度
+                continue
+            # 速度事件全部移到指挥轨
+            dropped.add(source)
+            if message == tempo:
+                report.removed_tempo_changes += 1
+            else:
+                tempo = message
+                event = _source_item(parsed_data, source)
+                conductor_events.append(Event('Tempo', event.time, event.channel, dict(event.data)))
+        elif status == 0xC0:
+            if programs.get(channel) == message[1] and source is not None:
+                dropped.add(source)
+                report.removed_program_changes += 1
+            programs[channel] = message[1]
+        elif status == 0xB0:
+            if controllers.get((channel, message[1])) == message[2]:
+                dropped.add(source)
+                report.removed_control_changes += 1
+            controllers[(channel, message[1])] = message[2]
+        elif status == 0xE0:
+            if bends.get(channel) == message[1:]:
+                dropped.add(source)
+                report.removed_pitch_bends += 1
+            bends[channel] = message[1:]
+
+    result = {'metadata': dict(metadata), 'tracks': {}, 'conductor': {'events': conductor_events}}
+    for track_name, track_data in tracks_data.items():
+        notes = []
+        for idx, note in enumerate(track_data.get('notes', [])):
+            if (track_name, 'note', idx) in dropped:
+                note = replace(note, instrument=None)
+            notes.append(note)
+
+        events: List[Event] = [event for idx, event in enumerate(track_data.get('events', []))
+                               if (track_name, 'event', idx) not in dropped]
+
+        result['tracks'][track_name] = {
+            'config': dict(track_data.get('config', {})),
+            'notes': notes,
+            'events': events
+        }
+        if 'end_time' in track_data:
+            result['tracks'][track_name]['end_time'] = track_data['end_time']
+
+    return result, report
+
+def _source_item(parsed_data: Dict, source: Tuple) -> Event:
+    """按 score_items 的来源找回原来的事件"""
+    track_name, kind, idx = source
+    if kind == 'conductor':
+        return parsed_data['conductor']['events'][idx]
+    return parsed_data['tracks'][track_name]['events'][idx]
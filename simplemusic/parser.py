@@ -2,14 +2,56 @@
 DSL Parser for SimpleMusic notation.
 """
 
+import math
+import os
 import re
-from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 
 from .constants import NOTE_MAP, DURATION_MAP, INSTRUMENT_NAMES
 from .data_structures import Note, Event, Track
 
+# 匹配和弦、事件、音符、休止符和小节线
+# 事件必须排在音符之前，否则 CC:... 会被当作音符 C 匹配
+TOKEN_PATTERN = re.compile(r'\[[^\]]+\]|PC:[^:\s]+|CC:[^:\s]+:[^:\s]+|PB:[^:\s]+|Tempo=\d+|[A-GR][#b]?\d*[whqest]?\.?(?:/\d+)?(?::[^:\s]+)*|\|+')
+
+# 默认并行阈值（单个轨道的 token 数）和每个工作进程分到的块数
+PARALLEL_THRESHOLD = 50000
+CHUNKS_PER_WORKER = 4
+
+# 自动化渐变：起始值->结束值/时长，时长可带倍数（如 2h、1.5q、e.）
+RAMP_PATTERN = re.compile(r'(-?\d+)->(-?\d+)/(\d+(?:\.\d+)?)?([whqest]\.?(?:/\d+)?)$')
+RAMP_RESOLUTION = 1 / 32  # 默认采样间隔（拍）
+PB_TOLERANCE_SCALE = 128  # 弯音范围是 CC 的 128 倍
+
+# token 解码缓存的默认容量（不同 token 的个数），0 表示不缓存
+TOKEN_CACHE_SIZE = 4096
+
+# 包含指令：Include "file.dsl"（相对路径以包含它的文件所在目录为准）
+INCLUDE_PATTERN = re.compile(r'^Include\s+"([^"]+)"$')
+
+@dataclass
+class TokenCacheInfo:
+    """token 解码缓存统计"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
 class DSLParser:
-    def __init__(self, dsl_text: str):
+    def __init__(self, dsl_text: str, parallel: bool = False,
+                 parallel_threshold: int = PARALLEL_THRESHOLD, workers: Optional[int] = None,
+                 ramp_resolution: float = RAMP_RESOLUTION, ramp_tolerance: int = 0,
+                 base_dir: Optional[str] = None, cache_size: int = TOKEN_CACHE_SIZE,
+                 allow_includes: bool = True, confine_includes: bool = False):
         self.lines = []
         self.tempo = 120
         self.key = 'C Major'
@@ -18,12 +60,42 @@ class DSLParser:
         self.tracks = {}
         self.current_track_name = None
         
+        # 轨道内并行解析（可选）
+        self.parallel = parallel
+        self.parallel_threshold = parallel_threshold
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        
+        # CC/PB 渐变的采样间隔（拍）和允许误差（CC 数值单位）
+        if not ramp_resolution > 0:  # 同时拒绝 NaN
+            raise ValueError(f"Ramp resolution must be positive, got {ramp_resolution}")
+        self.ramp_resolution = ramp_resolution
+        self.ramp_tolerance = ramp_tolerance
+        
+        # token 解码缓存（LRU）：(token, 通道) -> 与时间无关的解码结果
+        self.cache_size = cache_size
+        self._token_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # 包含文件的基准目录，以及按顺序展开过的文件
+        # confine_includes 时只允许 base_dir 内的相对路径（处理不受信任的 DSL 文本）
+        self.base_dir = base_dir or os.getcwd()
+        self.allow_includes = allow_includes
+        self.confine_includes = confine_includes
+        self.includes: List[str] = []
+        
         # 预处理：合并多行轨道内容
         self._preprocess_lines(dsl_text)
         
     def _preprocess_lines(self, dsl_text: str):
         """预处理输入文本，合并轨道内容"""
         raw_lines = dsl_text.strip().split('\n')
+        if self.allow_includes:
+            root = os.path.realpath(self.base_dir) if self.confine_includes else None
+            raw_lines = _expand_includes(raw_lines, self.base_dir, [], self.includes, root)
+        elif any(INCLUDE_PATTERN.match(line.strip()) for line in raw_lines):
+            raise ValueError("Include directives are disabled; set base_dir to enable them")
         processed_lines = []
         current_track = None
         track_content = []
@@ -81,28 +153,22 @@ class DSLParser:
         
     def parse(self) -> Dict:
         """解析 DSL 文本"""
-        # 第一遍：解析元数据和轨道定义
-        for line in self.lines:
-            if line.startswith('Tempo='):
-                self.tempo = int(line.split('=')[1])
-            elif line.startswith('Key='):
-                self.key = line.split('=', 1)[1]
-            elif line.startswith('TimeSig='):
-                parts = line.split('=')[1].split('/')
-                self.time_sig = (int(parts[0]), int(parts[1]))
-            elif line.startswith('TicksPerBeat='):
-                self.ticks_per_beat = int(line.split('=')[1])
-            elif line.startswith('Track '):
-                self._parse_track_line(line)
+        try:
+            # 第一遍：解析元数据和轨道定义
+            for line in self.lines:
+                if self._parse_metadata_line(line):
+                    continue
+                elif line.startswith('Track '):
+                    self._parse_track_line(line)
+        finally:
+            # 关闭并行解析的工作进程池
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
         
         # 返回结果
         result = {
-            'metadata': {
-                'tempo': self.tempo,
-                'key': self.key,
-                'time_sig': self.time_sig,
-                'ticks_per_beat': self.ticks_per_beat
-            },
+            'metadata': self._metadata(),
             'tracks': {}
         }
         
@@ -113,98 +179,326 @@ class DSLParser:
                     'instrument': track.instrument
                 },
                 'notes': track.notes,
-                'events': track.events
+                'events': track.events,
+                'end_time': track.current_time  # 含末尾休止符的结束时间
             }
         
         return result
     
+    def iter_parse(self) -> Iterator[Tuple[str, Union[Note, Event]]]:
+        """流式解析：逐个产出 (轨道名, Note 或 Event)，不在内存中保留整个乐谱
+        
+        元数据在产出第一个元素之前就已解析完毕，可通过 metadata() 获取。
+        产出后的音符和事件不会保留在 self.tracks 中。
+        """
+        for line in self.lines:
+            self._parse_metadata_line(line)
+        
+        for line in self.lines:
+            if not line.startswith('Track '):
+                continue
+            track, content = self._parse_track_header(line)
+            if track is None:
+                continue
+            
+            for match in TOKEN_PATTERN.finditer(content):
+                self._parse_token(match.group(), track)
+                for note in track.notes:
+                    yield track.name, note
+                for event in track.events:
+                    yield track.name, event
+                track.notes.clear()
+                track.events.clear()
+    
+    def metadata(self) -> Dict:
+        """全局元数据（速度、调号、拍号、分辨率）"""
+        for line in self.lines:
+            self._parse_metadata_line(line)
+        return self._metadata()
+    
+    def track_layout(self) -> Dict[str, Dict]:
+        """轨道名称和配置（通道、乐器），只解析轨道头，不解析音符"""
+        layout = {}
+        for line in self.lines:
+            if line.startswith('Track '):
+                track, _ = self._parse_track_header(line)
+                if track is not None:
+                    layout[track.name] = {'channel': track.channel, 'instrument': track.instrument}
+        return layout
+    
+    def _metadata(self) -> Dict:
+        return {
+            'tempo': self.tempo,
+            'key': self.key,
+            'time_sig': self.time_sig,
+            'ticks_per_beat': self.ticks_per_beat
+        }
+    
+    def _parse_metadata_line(self, line: str) -> bool:
+        """解析元数据行，不是元数据时返回 False"""
+        if line.startswith('Tempo='):
+            self.tempo = int(line.split('=')[1])
+        elif line.startswith('Key='):
+            self.key = line.split('=', 1)[1]
+        elif line.startswith('TimeSig='):
+            parts = line.split('=')[1].split('/')
+            self.time_sig = (int(parts[0]), int(parts[1]))
+        elif line.startswith('TicksPerBeat='):
+            self.ticks_per_beat = int(line.split('=')[1])
+        else:
+            return False
+        return True
+    
     def _parse_track_line(self, line: str):
         """解析轨道行（包括定义和内容）"""
+        track, content = self._parse_track_header(line)
+        
+        # 解析音符序列
+        if track is not None and content:
+            self._parse_sequence(content, track)
+    
+    def _parse_track_header(self, line: str) -> Tuple[Optional[Track], str]:
+        """解析轨道名称和配置，返回轨道和剩余的音符序列"""
         # 分离轨道名称和内容
-        if ':' in line:
-            header, content = line.split(':', 1)
-            track_name = header.replace('Track ', '').strip()
-            
-            # 如果轨道不存在，创建它
-            if track_name not in self.tracks:
-                self.tracks[track_name] = Track(name=track_name)
-            
-            track = self.tracks[track_name]
-            content = content.strip()
-            
-            # 检查是否包含配置
-            if 'Instrument=' in content or 'Channel=' in content:
-                # 解析配置
-                config_parts = content.split()
-                for part in config_parts:
-                    if '=' in part:
-                        key, value = part.split('=', 1)
-                        if key == 'Instrument':
-                            if value.isdigit():
-                                track.instrument = int(value)
-                            else:
-                                track.instrument = INSTRUMENT_NAMES.get(value.lower(), 0)
-                        elif key == 'Channel':
-                            track.channel = int(value) - 1
-                
-                # 移除配置部分，保留音符序列
-                for cfg in ['Instrument=', 'Channel=']:
-                    content = re.sub(rf'{cfg}\S+\s*', '', content)
+        if ':' not in line:
+            return None, ''
+        
+        header, content = line.split(':', 1)
+        track_name = header.replace('Track ', '').strip()
+        
+        # 如果轨道不存在，创建它
+        if track_name not in self.tracks:
+            self.tracks[track_name] = Track(name=track_name)
+        
+        track = self.tracks[track_name]
+        content = content.strip()
+        
+        # 检查是否包含配置
+        if 'Instrument=' in content or 'Channel=' in content:
+            # 解析配置
+            config_parts = content.split()
+            for part in config_parts:
+                if '=' in part:
+                    key, value = part.split('=', 1)
+                    if key == 'Instrument':
+                        if value.isdigit():
+                            track.instrument = int(value)
+                        else:
+                            track.instrument = INSTRUMENT_NAMES.get(value.lower(), 0)
+                    elif key == 'Channel':
+                        track.channel = int(value) - 1
             
-            # 解析音符序列
-            if content:
-                self._parse_sequence(content, track)
+            # 移除配置部分，保留音符序列
+            for cfg in ['Instrument=', 'Channel=']:
+                content = re.sub(rf'{cfg}\S+\s*', '', content)
+        
+        return track, content
     
     def _parse_sequence(self, sequence: str, track: Track):
         """解析音符序列"""
-        # 使用更复杂的正则表达式来分割token
-        # 匹配和弦、音符、休止符、事件等
-        pattern = r'\[[^\]]+\]|[A-GR][#b]?\d*[whqest]?\.?(?:/\d+)?(?::[^:\s]+)*|PC:[^:\s]+|CC:[^:\s]+:[^:\s]+|PB:[^:\s]+|Tempo=\d+|\|+'
+        tokens = TOKEN_PATTERN.findall(sequence)
         
-        tokens = re.findall(pattern, sequence)
+        # 大轨道可以按小节线切分后并行解析
+        if self.parallel and len(tokens) >= self.parallel_threshold:
+            chunks = self._split_at_barlines(tokens)
+            if len(chunks) > 1:
+                self._parse_chunks_parallel(chunks, track)
+                return
         
         for token in tokens:
-            token = token.strip()
-            if not token or token in ['|', '||']:
-                continue
-            elif token.startswith('R'):
-                # 休止符
-                rest_match = re.match(r'R([whqest]\.?(?:/\d+)?)', token)
-                if rest_match:
-                    duration = self._parse_duration(rest_match.group(1))
-                    track.current_time += duration
-            elif token.startswith('['):
-                # 和弦
-                self._parse_chord(token, track)
-            elif token.startswith('PC:'):
-                # Program Change
-                program = int(token.split(':')[1])
-                track.events.append(Event('PC', track.current_time, track.channel, 
-                                        {'program': program}))
-            elif token.startswith('CC:'):
-                # Control Change
-                parts = token.split(':')
-                if len(parts) >= 3:
-                    controller = int(parts[1])
+            self._parse_token(token, track)
+    
+    def cache_info(self) -> TokenCacheInfo:
+        """token 解码缓存的命中统计"""
+        return TokenCacheInfo(self.cache_hits, self.cache_misses, self.cache_size, len(self._token_cache))
+    
+    def _parse_token(self, token: str, track: Track):
+        """解析单个 token，并推进轨道时间
+        
+        重复出现的 token 从缓存中取出零时间原点的解码结果，只需加上当前时间。
+        """
+        if not self.cache_size:
+            self._decode_token(token, track)
+            return
+        if token.startswith('|'):
+            return
+        
+        key = (token, track.channel)
+        decoded = self._token_cache.get(key)
+        if decoded is None:
+            self.cache_misses += 1
+            decoded = self._decode_cached(token, track.channel)
+            self._token_cache[key] = decoded
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+            self._token_cache.move_to_end(key)
+        
+        notes, events, advance = decoded
+        current_time = track.current_time
+        for pitch, duration, offset, velocity, channel, instrument, actual_length in notes:
+            track.notes.append(Note(pitch, duration, current_time + offset, velocity,
+                                    channel, instrument, actual_length))
+        for event_type, offset, channel, data in events:
+            track.events.append(Event(event_type, current_time + offset, channel, dict(data)))
+        if advance:
+            track.current_time = current_time + advance
+    
+    def _decode_cached(self, token: str, channel: int) -> Tuple:
+        """以零时间原点解码 token，返回 (音符元组, 事件元组, 时间增量)"""
+        scratch = Track(name='', channel=channel)
+        self._decode_token(token, scratch)
+        notes = tuple((n.pitch, n.duration, n.start_time, n.velocity, n.channel, n.instrument,
+                       n.actual_length) for n in scratch.notes)
+        events = tuple((e.type, e.time, e.channel, e.data) for e in scratch.events)
+        return notes, events, scratch.current_time
+    
+    def _decode_token(self, token: str, track: Track):
+        """解析单个 token（不使用缓存），并推进轨道时间"""
+        token = token.strip()
+        if not token or token in ['|', '||']:
+            return
+        elif token.startswith('R'):
+            # 休止符
+            rest_match = re.match(r'R([whqest]\.?(?:/\d+)?)', token)
+            if rest_match:
+                duration = parse_duration(rest_match.group(1))
+                track.current_time += duration
+        elif token.startswith('['):
+            # 和弦
+            self._parse_chord(token, track)
+        elif token.startswith('PC:'):
+            # Program Change
+            program = int(token.split(':')[1])
+            track.events.append(Event('PC', track.current_time, track.channel, 
+                                    {'program': program}))
+        elif token.startswith('CC:'):
+            # Control Change
+            parts = token.split(':')
+            if len(parts) >= 3:
+                controller = int(parts[1])
+                if '->' in parts[2]:
+                    self._parse_ramp(parts[2], track, 'CC', controller)
+                else:
                     value = int(parts[2])
                     track.events.append(Event('CC', track.current_time, track.channel,
                                             {'controller': controller, 'value': value}))
-            elif token.startswith('PB:'):
-                # Pitch Bend
-                value = int(token.split(':')[1])
+        elif token.startswith('PB:'):
+            # Pitch Bend
+            value_str = token.split(':')[1]
+            if '->' in value_str:
+                self._parse_ramp(value_str, track, 'PB')
+            else:
+                value = int(value_str)
                 track.events.append(Event('PB', track.current_time, track.channel,
                                         {'value': value}))
-            elif token.startswith('Tempo='):
-                # Tempo Change
-                new_tempo = int(token.split('=')[1])
-                track.events.append(Event('Tempo', track.current_time, track.channel,
-                                        {'tempo': new_tempo}))
+        elif token.startswith('Tempo='):
+            # Tempo Change
+            new_tempo = int(token.split('=')[1])
+            track.events.append(Event('Tempo', track.current_time, track.channel,
+                                    {'tempo': new_tempo}))
+        else:
+            # 单个音符
+            note = self._parse_note(token, track)
+            if note:
+                track.notes.append(note)
+                track.current_time += note.duration
+    
+    def _parse_ramp(self, ramp_str: str, track: Track, event_type: str,
+                    controller: Optional[int] = None):
+        """展开 CC/PB 渐变为事件序列（不推进轨道时间）
+        
+        按 ramp_resolution 采样直线，只有当数值相对上一个已发出的值变化超过
+        ramp_tolerance 时才发出事件，所以事件数取决于数值变化而不是时长。
+        """
+        match = RAMP_PATTERN.match(ramp_str)
+        if not match:
+            return
+        
+        start_value = int(match.group(1))
+        end_value = int(match.group(2))
+        multiplier = float(match.group(3)) if match.group(3) else 1.0
+        duration = multiplier * parse_duration(match.group(4))
+        
+        if event_type == 'CC':
+            low, high = 0, 127
+            tolerance = self.ramp_tolerance
+        else:
+            low, high = -8192, 8191
+            tolerance = self.ramp_tolerance * PB_TOLERANCE_SCALE
+        
+        steps = max(1, round(duration / self.ramp_resolution))
+        start = track.current_time
+        last_value = None
+        
+        for i in range(steps + 1):
+            value = math.floor(start_value + (end_value - start_value) * i / steps + 0.5)
+            value = max(low, min(high, value))
+            if last_value is not None:
+                if value == last_value:
+                    continue
+                if i < steps and abs(value - last_value) <= tolerance:
+                    continue
+            
+            offset = duration * i / steps
+            if event_type == 'CC':
+                data = {'controller': controller, 'value': value}
             else:
-                # 单个音符
-                note = self._parse_note(token, track)
-                if note:
-                    track.notes.append(note)
-                    track.current_time += note.duration
+                data = {'value': value}
+            track.events.append(Event(event_type, start + offset, track.channel, data))
+            last_value = value
+    
+    def _split_at_barlines(self, tokens: List[str]) -> List[List[str]]:
+        """在小节线处把 token 切分为大小相近的块"""
+        target = max(1, len(tokens) // (self.workers * CHUNKS_PER_WORKER))
+        chunks = []
+        current = []
+        
+        for token in tokens:
+            current.append(token)
+            if token.startswith('|') and len(current) >= target:
+                chunks.append(current)
+                current = []
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _parse_chunks_parallel(self, chunks: List[List[str]], track: Track):
+        """在工作进程中解析各块，再用前缀和把局部时间平移到轨道时间
+        
+        每个 token 都以零时间原点解析，这里按原顺序重放时间增量，
+        浮点加法顺序与顺序解析完全一致，因此结果逐位相同。
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        
+        options = self._worker_options()
+        jobs = [(options, track.channel, track.instrument, chunk) for chunk in chunks]
+        
+        offset = track.current_time
+        for notes, note_steps, events, event_steps, increments, (hits, misses) in self._executor.map(_parse_chunk, jobs):
+            self.cache_hits += hits
+            self.cache_misses += misses
+            times = list(accumulate(increments, initial=offset))
+            for note, step in zip(notes, note_steps):
+                note.start_time = times[step] + note.start_time
+            for event, step in zip(events, event_steps):
+                event.time = times[step] + event.time
+            track.notes.extend(notes)
+            track.events.extend(events)
+            offset = times[-1]
+        
+        track.current_time = offset
+    
+    def _worker_options(self) -> Dict:
+        """影响 token 解码的选项，用于在工作进程中重建解析器"""
+        return {
+            'ramp_resolution': self.ramp_resolution,
+            'ramp_tolerance': self.ramp_tolerance,
+            'cache_size': self.cache_size
+        }
     
     def _parse_chord(self, chord_str: str, track: Track):
         """解析和弦"""
@@ -251,10 +545,10 @@ class DSLParser:
         tuplet = match.group(6)
         
         # 计算 MIDI 音高
-        pitch = self._note_to_midi(note_name, octave)
+        pitch = note_to_midi(note_name, octave)
         
         # 计算时值
-        duration = self._parse_duration(duration_char)
+        duration = parse_duration(duration_char)
         
         # 应用修饰符
         if dotted or params.get('dotted'):
@@ -303,49 +597,107 @@ class DSLParser:
                 params['position'] = float(param[1:])
             elif param.startswith('len'):
                 duration_str = param[3:]
-                params['actual_length'] = self._parse_duration(duration_str)
+                params['actual_length'] = parse_duration(duration_str) or 1.0  # 无法识别时按四分音符
             elif param == 'd':
                 params['dotted'] = True
             elif '/' in param and param.replace('/', '').isdigit():
                 params['tuplet'] = int(param.split('/')[1])
         
         return params
+
+def note_to_midi(note_name: str, octave: int) -> int:
+    """转换音符名称（如 'C'、'F#'、'Bb'）和八度到 MIDI 音高，限制在 0-127"""
+    midi_note = NOTE_MAP[note_name[0]] + (octave + 1) * 12
     
-    def _note_to_midi(self, note_name: str, octave: int) -> int:
-        """转换音符名称到 MIDI 音高"""
-        base_note = note_name[0]
-        midi_note = NOTE_MAP[base_note] + (octave + 1) * 12
-        
-        # 处理升降号
-        if len(note_name) > 1:
-            if note_name[1] == '#':
-                midi_note += 1
-            elif note_name[1] == 'b':
-                midi_note -= 1
-        
-        return max(0, min(127, midi_note))  # 确保在 MIDI 范围内
+    # 处理升降号
+    if len(note_name) > 1:
+        if note_name[1] == '#':
+            midi_note += 1
+        elif note_name[1] == 'b':
+            midi_note -= 1
     
-    def _parse_duration(self, duration_str: str) -> float:
-        """解析时值字符串"""
-        if not duration_str:
-            return 1.0
-        
-        # 提取基础时值字符
-        base_char = duration_str[0] if duration_str else 'q'
-        
-        if base_char in DURATION_MAP:
-            duration = DURATION_MAP[base_char]
-            
-            # 检查附点
-            if '.' in duration_str:
-                duration *= 1.5
-            
-            # 检查连音符
-            if '/' in duration_str:
-                tuplet_match = re.search(r'/(\d+)', duration_str)
-                if tuplet_match:
-                    duration /= int(tuplet_match.group(1))
-            
-            return duration
-        
-        return 1.0  # 默认四分音符
\ No newline at end of file
+    return max(0, min(127, midi_note))  # 确保在 MIDI 范围内
+
+def parse_duration(duration_str: str) -> Optional[float]:
+    """解析时值字符串（如 'q'、'e.'、'e/3'）为拍数，不是时值时返回 None"""
+    if not duration_str or duration_str[0] not in DURATION_MAP:
+        return None
+    
+    duration = DURATION_MAP[duration_str[0]]
+    
+    # 检查附点
+    if '.' in duration_str:
+        duration *= 1.5
+    
+    # 检查连音符
+    if '/' in duration_str:
+        tuplet_match = re.search(r'/(\d+)', duration_str)
+        if tuplet_match:
+            duration /= int(tuplet_match.group(1))
+    
+    return duration
+
+def expand_includes(dsl_text: str, base_dir: Optional[str] = None) -> str:
+    """展开所有 Include 指令，返回不再依赖其他文件的 DSL 文本"""
+    return '\n'.join(_expand_includes(dsl_text.split('\n'), base_dir or os.getcwd(), [], []))
+
+def _expand_includes(raw_lines: List[str], base_dir: str, stack: List[str], includes: List[str],
+                     root: Optional[str] = None) -> List[str]:
+    """递归展开 Include 指令，检测循环包含；展开过的文件按顺序记录在 includes 中
+
+    给定 root 时拒绝绝对路径和（解析符号链接后）位于 root 之外的文件。
+    """
+    expanded = []
+    
+    for line in raw_lines:
+        match = INCLUDE_PATTERN.match(line.strip())
+        if not match:
+            expanded.append(line)
+            continue
+        
+        path = os.path.abspath(os.path.join(base_dir, match.group(1)))
+        if root is not None:
+            if os.path.isabs(match.group(1)):
+                raise ValueError(f"Absolute include path not allowed: {match.group(1)}")
+            if os.path.commonpath([root, os.path.realpath(path)]) != root:
+                raise ValueError(f"Include path leaves the base directory: {match.group(1)}")
+        if path in stack:
+            cycle = ' -> '.join(stack[stack.index(path):] + [path])
+            raise ValueError(f"Include cycle: {cycle}")
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            included = f.read().split('\n')
+        
+        if path not in includes:
+            includes.append(path)
+        expanded.extend(_expand_includes(included, os.path.dirname(path), stack + [path], includes, root))
+    
+    return expanded
+
+def _parse_chunk(job: Tuple) -> Tuple:
+    """工作进程：以零时间原点逐个解析 token
+    
+    返回局部音符和事件、它们各自所在的时间步、每一步的时间增量，
+    以及工作进程内的缓存命中和未命中次数。
+    """
+    options, channel, instrument, tokens = job
+    parser = DSLParser('', **options)
+    track = Track(name='', channel=channel, instrument=instrument)
+    note_steps = []
+    event_steps = []
+    increments = []
+    
+    for token in tokens:
+        note_count = len(track.notes)
+        event_count = len(track.events)
+        track.current_time = 0.0
+        parser._parse_token(token, track)
+        
+        step = len(increments)
+        note_steps.extend([step] * (len(track.notes) - note_count))
+        event_steps.extend([step] * (len(track.events) - event_count))
+        if track.current_time:
+            increments.append(track.current_time)
+    
+    return (track.notes, note_steps, track.events, event_steps, increments,
+            (parser.cache_hits, parser.cache_misses))
@@ -0,0 +1,329 @@
+"""
+Standard MIDI File encoder (format 0 and 1) and reader.
+
+The encoder uses the same resolution, tick rounding and same-tick event order
+as the MIDIUtil writer, so both produce the same timing. Format 0 merges all
+tracks into one time-ordered stream with a k-way merge.
+"""
+
+import heapq
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .constants import DRUM_CHANNEL
+
+TICKS_PER_BEAT = 960  # 与 MIDIUtil 写入器相同的分辨率
+
+# 同一 tick 内的顺序（与 MIDIUtil 一致）：轨道名/拍号，PC/CC/PB，音符关，音符开/速度
+ORDER_META = 0
+ORDER_CONTROL = 1
+ORDER_NOTE_OFF = 2
+ORDER_NOTE_ON = 3
+
+META_TRACK_NAME = 0x03
+META_END_OF_TRACK = 0x2F
+META_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+
+# 编码前的事件：(tick, 同 tick 内顺序, 插入序号, 消息字节)
+# 通道消息的字节以状态字节开头；元事件为 FF 类型 长度 数据
+SMFEvent = Tuple[int, int, int, bytes]
+# 附加来源的事件：(tick, 同 tick 内顺序, 插入序号, 消息字节, 来源)
+SourcedEvent = Tuple[int, int, int, bytes, Optional[Tuple[Optional[str], str, int]]]
+
+@dataclass
+class SMFData:
+    """读取到的 MIDI 文件：每个轨道是 (绝对 tick, 消息字节) 列表"""
+    format: int
+    ticks_per_beat: int
+    tracks: List[List[Tuple[int, bytes]]]
+
+def score_events(parsed_data: Dict) -> Tuple[List[SMFEvent], List[Tuple[str, List[SMFEvent]]]]:
+    """把解析结构转换为指挥轨事件和各轨道事件（均已排序并按写入器的规则去重）
+
+    与 create_midi_file 相同：拍号和速度在指挥轨，音符的乐器覆盖在音符开始时切换音色。
+    """
+    conductor, tracks = score_items(parsed_data)
+    return (_unique([item[:4] for item in conductor]),
+            [(track_name, _unique([item[:4] for item in items])) for track_name, items in tracks])
+
+def score_items(parsed_data: Dict) -> Tuple[List[SourcedEvent], List[Tuple[str, List[SourcedEvent]]]]:
+    """与 score_events 相同，但每个事件后附加来源，并且不去重（只排序）
+
+    来源是 (轨道名, 'note' 或 'event', 索引)，指挥轨输入的速度事件是 (None, 'conductor', 索引)；
+    轨道头、全局元事件、音符开和音符关的来源是 None。
+    """
+    metadata = parsed_data.get('metadata', {})
+    time_sig = metadata.get('time_sig', (4, 4))
+    conductor_seq = 1
+
+    conductor = [
+        (0, ORDER_META, 0, _time_signature(*time_sig), None),
+        (0, ORDER_NOTE_ON, 1, _tempo(metadata.get('tempo', 120)), None)
+    ]
+    for idx, event in enumerate(parsed_data.get('conductor', {}).get('events', [])):
+        conductor_seq += 1
+        conductor.append((_ticks(event.time), ORDER_NOTE_ON, conductor_seq, _tempo(event.data['tempo']),
+                          (None, 'conductor', idx)))
+
+    tracks = []
+    for track_name, track_data in parsed_data.get('tracks', {}).items():
+        config = track_data.get('config', {})
+        channel = config.get('channel', 0)
+        events = [(0, ORDER_META, 0, _meta(META_TRACK_NAME, track_name.encode('utf-8')), None)]
+        if channel != DRUM_CHANNEL:
+            events.append((0, ORDER_CONTROL, 1, bytes([0xC0 | channel, config.get('instrument', 0)]), None))
+        seq = 1
+
+        for idx, note in enumerate(track_data.get('notes', [])):
+            # 偏移量可能把音符移到 0 之前：开始和结束分别截断到 0
+            raw_start = int(note.start_time * TICKS_PER_BEAT)
+            start = max(raw_start, 0)
+            if note.instrument is not None and note.channel != DRUM_CHANNEL:
+                seq += 1
+                events.append((start, ORDER_CONTROL, seq, bytes([0xC0 | note.channel, note.instrument]),
+                               (track_name, 'note', idx)))
+            length = note.actual_length if note.actual_length else note.duration
+            seq += 1
+            events.append((start, ORDER_NOTE_ON, seq, bytes([0x90 | note.channel, note.pitch, note.velocity]), None))
+            # 音符关写成力度为 0 的音符开，便于使用运行状态
+            events.append((max(raw_start + _ticks(length), 0), ORDER_NOTE_OFF, seq,
+                           bytes([0x90 | note.channel, note.pitch, 0]), None))
+
+        for idx, event in enumerate(track_data.get('events', [])):
+            seq += 1
+            tick = _ticks(event.time)
+            source = (track_name, 'event', idx)
+            if event.type == 'PC':
+                events.append((tick, ORDER_CONTROL, seq, bytes([0xC0 | event.channel, event.data['program']]),
+                               source))
+            elif event.type == 'CC':
+                events.append((tick, ORDER_CONTROL, seq, bytes([0xB0 | event.channel,
+                                                                event.data['controller'], event.data['value']]),
+                               source))
+            elif event.type == 'PB':
+                value = event.data['value'] + 8192
+                events.append((tick, ORDER_CONTROL, seq, bytes([0xE0 | event.channel, value & 0x7F, value >> 7]),
+                               source))
+            elif event.type == 'Tempo':
+                # 与 MIDIUtil 相同，速度和拍号事件写入指挥轨
+                conductor_seq += 1
+                conductor.append((tick, ORDER_NOTE_ON, conductor_seq, _tempo(event.data['tempo']), source))
+            elif event.type == 'TimeSig':
+                conductor_seq += 1
+                conductor.append((tick, ORDER_META, conductor_seq, _time_signature(
+                    event.data['numerator'], event.data['denominator']), source))
+
+        events.sort(key=_sort_key)
+        tracks.append((track_name, events))
+
+    conductor.sort(key=_sort_key)
+    return conductor, tracks
+
+def unique_key(event: SMFEvent) -> Optional[Tuple[int, int, bytes]]:
+    """MIDIUtil 的去重键，CC 和弯音从不视为重复时返回 None
+
+    同一 tick、同一通道、同一音高的音符开（或音符关）视为重复，与力度无关；
+    其他事件完全相同时重复。
+    """
+    tick, order, _, message = event[:4]
+    status = message[0] & 0xF0
+    if status in (0xB0, 0xE0):
+        return None
+    return tick, order, message[:2] if status == 0x90 else message
+
+def merge_tracks(conductor: List[SMFEvent], tracks: List[Tuple[str, List[SMFEvent]]]) -> Iterator[SMFEvent]:
+    """k 路归并所有轨道为一个按时间排序的事件流，并去掉冗余元事件
+
+    同一 tick 内保持与多轨文件相同的顺序；只保留第一个轨道名作为序列名，
+    删除重复的元事件和不改变速度的速度事件。
+    """
+    streams = [conductor] + [events for _, events in tracks]
+    # 排序键中加入轨道索引，同一时刻同一顺序的事件按轨道顺序排列
+    merged = heapq.merge(*[_keyed(idx, stream) for idx, stream in enumerate(streams)])
+
+    seen_meta = set()
+    has_name = False
+    tempo = None
+    for tick, order, idx, seq, message in merged:
+        if message[0] == 0xFF:
+            meta_type = message[1]
+            if meta_type == META_TRACK_NAME:
+                if has_name:
+                    continue
+                has_name = True
+            elif meta_type == META_TEMPO:
+                if message == tempo:
+                    continue
+                tempo = message
+            elif (tick, message) in seen_meta:
+                continue
+            seen_meta.add((tick, message))
+        yield tick, order, seq, message
+
+def _keyed(idx: int, stream: List[SMFEvent]) -> Iterator[Tuple[int, int, int, int, bytes]]:
+    for tick, order, seq, message in stream:
+        yield tick, order, idx, seq, message
+
+def encode_track(events, running_status: bool = True) -> bytes:
+    """把排序好的事件编码为 MTrk 块（增量时间，可选运行状态，结尾加轨道结束）"""
+    out = bytearray()
+    last_tick = 0
+    status = None
+    for tick, _, _, message in events:
+        out += _var_length(tick - last_tick)
+        last_tick = tick
+        if message[0] < 0xF0:
+            if running_status and message[0] == status:
+                out += message[1:]
+            else:
+                out += message
+                status = message[0]
+        else:
+            out += message
+            status = None  # 元事件和系统码取消运行状态
+    out += b'\x00' + _meta(META_END_OF_TRACK, b'')
+    return b'MTrk' + struct.pack('>I', len(out)) + bytes(out)
+
+def smf_bytes(parsed_data: Dict, midi_format: int = 0, running_status: bool = True) -> bytes:
+    """生成 MIDI 文件内容；格式 0 为单轨合并流，格式 1 为指挥轨加各轨道"""
+    if midi_format not in (0, 1):
+        raise ValueError(f"Unsupported MIDI format {midi_format}, expected 0 or 1")
+    conductor, tracks = score_events(parsed_data)
+
+    if midi_format == 0:
+        chunks = [encode_track(merge_tracks(conductor, tracks), running_status)]
+    else:
+        chunks = [encode_track(conductor, running_status)]
+        chunks.extend(encode_track(events, running_status) for _, events in tracks)
+
+    header = b'MThd' + struct.pack('>IHHH', 6, midi_format, len(chunks), TICKS_PER_BEAT)
+    return header + b''.join(chunks)
+
+def write_smf(parsed_data: Dict, stream: BinaryIO, midi_format: int = 0):
+    """把解析结构写入二进制流"""
+    stream.write(smf_bytes(parsed_data, midi_format))
+
+def read_smf(data: bytes) -> SMFData:
+    """读取 MIDI 文件，事件时间转换为绝对 tick，运行状态展开为完整消息"""
+    if data[:4] != b'MThd':
+        raise ValueError("Not a MIDI file (missing MThd header)")
+    header_length, midi_format, track_count, division = struct.unpack('>IHHH', data[4:14])
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported")
+
+    pos = 8 + header_length
+    tracks = []
+    while pos < len(data) and len(tracks) < track_count:
+        chunk_type = data[pos:pos + 4]
+        length = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        if chunk_type == b'MTrk':
+            tracks.append(_read_track(data, pos + 8, pos + 8 + length))
+        pos += 8 + length
+
+    return SMFData(midi_format, division, tracks)
+
+def ordered_events(smf: SMFData) -> Iterator[Tuple[int, bytes]]:
+    """按时间顺序产出所有轨道的事件；多轨文件需要先归并"""
+    if len(smf.tracks) == 1:
+        return iter(smf.tracks[0])
+    return heapq.merge(*smf.tracks, key=lambda event: event[0])
+
+def _read_track(data: bytes, pos: int, end: int) -> List[Tuple[int, bytes]]:
+    events = []
+    append = events.append
+    tick = 0
+    status = None
+    status_byte = b''
+    size = 2
+    while pos < end:
+        byte = data[pos]
+        if byte < 0x80:  # 单字节增量时间最常见，不调用 read_var_length
+            tick += byte
+            pos += 1
+        else:
+            delta, pos = read_var_length(data, pos)
+            tick += delta
+        byte = data[pos]
+        if byte < 0x80:
+            # 运行状态：补上前一个状态字节
+            if status is None:
+                raise ValueError(f"Running status without a previous status byte at offset {pos}")
+            message = status_byte + data[pos:pos + size]
+            pos += size
+        elif byte < 0xF0:
+            status = byte
+            status_byte = data[pos:pos + 1]
+            size = 1 if status & 0xE0 == 0xC0 else 2  # 0xC0/0xD0 只有一个数据字节
+            message = data[pos:pos + 1 + size]
+            pos += 1 + size
+        elif byte == 0xFF:
+            length, data_start = read_var_length(data, pos + 2)
+            message = data[pos:data_start + length]
+            pos = data_start + length
+            if message[1] == META_END_OF_TRACK:
+                break
+        elif byte in (0xF0, 0xF7):
+            length, data_start = read_var_length(data, pos + 1)
+            message = data[pos:data_start + length]
+            pos = data_start + length
+        else:
+            raise ValueError(f"Unexpected status byte 0x{byte:02X} at offset {pos}")
+        append((tick, message))
+    return events
+
+def _unique(events: List[SMFEvent]) -> List[SMFEvent]:
+    """按 MIDIUtil 的规则去重（见 unique_key），保留先加入的事件；输入已排序"""
+    seen = set()
+    result = []
+    for event in events:
+        key = unique_key(event)
+        if key is None:
+            result.append(event)
+        elif key not in seen:
+            seen.add(key)
+            result.append(event)
+    return result
+
+def _sort_key(event) -> Tuple[int, int, int]:
+    # (tick, 同 tick 内顺序, 插入序号) 在一个轨道内唯一，不需要比较消息和来源
+    return event[0], event[1], event[2]
+
+def time_signature_exponent(denominator: int) -> int:
+    """拍号分母按 2 的幂次写入（4 分音符为 2，8 分音符为 3）"""
+    return denominator.bit_length() - 1
+
+def _ticks(beats: float) -> int:
+    """拍数转换为 tick，0 之前的时间截断到 0"""
+    return max(int(beats * TICKS_PER_BEAT), 0)
+
+def _meta(meta_type: int, payload: bytes) -> bytes:
+    return bytes([0xFF, meta_type]) + _var_length(len(payload)) + payload
+
+def _time_signature(numerator: int, denominator: int) -> bytes:
+    return _meta(META_TIME_SIGNATURE, bytes([numerator, time_signature_exponent(denominator), 24, 8]))
+
+def _tempo(bpm: float) -> bytes:
+    return _meta(META_TEMPO, int(60000000 / bpm).to_bytes(3, 'big'))
+
+def _var_length(value: int) -> bytes:
+    """可变长度数量：每字节 7 位，除最后一个字节外最高位为 1"""
+    if value < 0:
+        raise ValueError(f"Variable-length quantity must be non-negative, got {value}")
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+def read_var_length(data: bytes, pos: int) -> Tuple[int, int]:
+    """读取 pos 处的可变长度数量，返回 (值, 下一个字节的位置)"""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
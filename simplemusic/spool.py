@@ -0,0 +1,257 @@
+"""
+Broker-free distributed render queue on a shared spool directory.
+
+Layout of a spool directory (which may live on a shared file system)::
+
+    queue/<id>.json     pending jobs
+    active/<id>.json    claimed jobs; the file's mtime is the worker's lease
+    done/<id>.json      finished jobs, with the rendered done/<id>.mid
+    failed/<id>.json    jobs that raised an error or kept losing their lease
+    status/<id>.json    latest status of every job
+    tmp/                staging area for atomic writes
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from glob import glob
+from typing import Dict, List, Optional, Union
+
+from .midi_converter import ConvertOptions, convert
+from .parser import expand_includes
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIRS = ['queue', 'active', 'done', 'failed', 'status', 'tmp']
+JOB_STATES = ['queued', 'running', 'done', 'failed']
+
+LEASE_TIMEOUT = 300.0  # 租约超时（秒）：活动任务超过这个时间没有心跳就重新排队
+POLL_INTERVAL = 1.0
+MAX_ATTEMPTS = 3  # 租约过期这么多次后任务直接标记为失败
+
+@dataclass
+class Job:
+    """渲染任务（提交后不再修改）"""
+    id: str
+    name: str
+    source: str  # DSL 文本，Include 已在提交时展开，任务文件不依赖提交者的目录
+    options: Optional[Dict] = None  # transpose / stretch / quantize / optimize
+    submitted: float = 0.0
+
+def init_spool(spool: str):
+    """创建 spool 目录结构"""
+    for name in SPOOL_DIRS:
+        os.makedirs(os.path.join(spool, name), exist_ok=True)
+
+def submit_job(spool: str, source: str, name: Optional[str] = None, base_dir: Optional[str] = None,
+               options: Optional[Dict] = None) -> str:
+    """提交一个任务并返回任务 ID
+
+    source 是 DSL 文件路径或 DSL 文本。Include 在提交时展开（DSL 文本相对于 base_dir），
+    所以任何主机上的工作进程都能渲染。任务 ID 以提交时间开头，所以按文件名排序就是先进先出。
+    """
+    init_spool(spool)
+    if os.path.isfile(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            dsl_text = f.read()
+        name = name or os.path.splitext(os.path.basename(source))[0]
+        base_dir = base_dir or os.path.dirname(os.path.abspath(source))
+    else:
+        dsl_text = source
+        name = name or 'score'
+    dsl_text = expand_includes(dsl_text, base_dir)
+
+    submitted = time.time_ns()
+    job_id = f"{submitted:020d}-{uuid.uuid4().hex[:8]}"
+    submitted /= 1e9
+    job = Job(job_id, name, dsl_text, dict(options or {}), submitted)
+
+    _write_status(spool, job_id, {'id': job_id, 'name': name, 'state': 'queued',
+                                  'attempts': 0, 'submitted': submitted})
+    # 先写到 tmp 再改名进队列，工作进程不会看到写了一半的任务
+    _write_json(spool, os.path.join('queue', job_id + '.json'), job.__dict__)
+    return job_id
+
+def claim_job(spool: str, worker_id: str) -> Optional[Job]:
+    """原子地领取最早的排队任务，没有任务时返回 None
+
+    领取就是把任务文件从 queue/ 改名到 active/：同一文件系统内的改名是原子的，
+    多个工作进程同时改名时只有一个会成功。改名前先更新 mtime，
+    这样任务一进入 active/ 就带着新的租约。
+    """
+    for path in sorted(glob(os.path.join(spool, 'queue', '*.json'))):
+        job_id = os.path.splitext(os.path.basename(path))[0]
+        active_path = os.path.join(spool, 'active', job_id + '.json')
+        try:
+            os.utime(path)
+            os.rename(path, active_path)
+        except FileNotFoundError:
+            continue  # 被其他工作进程抢先领取
+
+        with open(active_path, 'r', encoding='utf-8') as f:
+            job = Job(**json.load(f))
+
+        status = read_status(spool, job_id) or {}
+        status.update({'state': 'running', 'worker': worker_id, 'started': time.time(),
+                       'attempts': status.get('attempts', 0) + 1})
+        _write_status(spool, job_id, status)
+        return job
+    return None
+
+def complete_job(spool: str, job: Job, error: Optional[str] = None, result: Optional[str] = None) -> bool:
+    """把活动任务移到 done/ 或 failed/，租约已经丢失时返回 False
+
+    result 是 render_job 写出的临时文件，只有任务成功移走后才改名为 done/<id>.mid，
+    租约丢失时删除，不会覆盖接手的工作进程的结果。
+    """
+    state = 'failed' if error else 'done'
+    try:
+        os.rename(os.path.join(spool, 'active', job.id + '.json'),
+                  os.path.join(spool, state, job.id + '.json'))
+    except FileNotFoundError:
+        # 租约过期，任务已被重新排队
+        if result is not None:
+            os.remove(result)
+        return False
+
+    if result is not None:
+        os.replace(result, result_path(spool, job.id))
+
+    status = read_status(spool, job.id) or {}
+    status.update({'state': state, 'finished': time.time(), 'error': error})
+    if not error:
+        status['output'] = os.path.abspath(result_path(spool, job.id))
+    _write_status(spool, job.id, status)
+    return True
+
+def requeue_expired(spool: str, lease_timeout: float = LEASE_TIMEOUT,
+                    max_attempts: int = MAX_ATTEMPTS) -> List[str]:
+    """把租约过期（工作进程崩溃）的活动任务放回队列，返回这些任务的 ID"""
+    requeued = []
+    now = time.time()
+    for path in glob(os.path.join(spool, 'active', '*.json')):
+        job_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            if now - os.path.getmtime(path) < lease_timeout:
+                continue
+        except FileNotFoundError:
+            continue
+
+        status = read_status(spool, job_id) or {}
+        if status.get('attempts', 0) >= max_attempts:
+            target, state = 'failed', 'failed'
+        else:
+            target, state = 'queue', 'queued'
+        try:
+            os.rename(path, os.path.join(spool, target, job_id + '.json'))
+        except FileNotFoundError:
+            continue  # 已被完成或被其他工作进程处理
+
+        status.update({'state': state, 'worker': None})
+        logger.warning(f"{job_id}: lease expired, {'failed' if state == 'failed' else 'requeued'}")
+        if state == 'failed':
+            status['error'] = f"lease expired after {status.get('attempts', 0)} attempts"
+        _write_status(spool, job_id, status)
+        requeued.append(job_id)
+    return requeued
+
+def run_worker(spool: str, worker_id: Optional[str] = None, lease_timeout: float = LEASE_TIMEOUT,
+               poll_interval: float = POLL_INTERVAL, max_attempts: int = MAX_ATTEMPTS,
+               exit_when_idle: bool = False, max_jobs: Optional[int] = None) -> int:
+    """工作进程主循环：回收过期租约、领取任务、渲染，返回处理的任务数"""
+    init_spool(spool)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    processed = 0
+
+    while max_jobs is None or processed < max_jobs:
+        requeue_expired(spool, lease_timeout, max_attempts)
+        job = claim_job(spool, worker_id)
+        if job is None:
+            if exit_when_idle and not glob(os.path.join(spool, 'active', '*.json')):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        with _Heartbeat(os.path.join(spool, 'active', job.id + '.json'), lease_timeout / 3):
+            result = None
+            try:
+                result = render_job(job, os.path.join(spool, 'tmp'))
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if not complete_job(spool, job, error, result):
+            logger.warning(f"{job.id}: lease lost, job was requeued and this result discarded")
+        elif error:
+            logger.warning(f"{job.id} ({job.name}) failed: {error}")
+        else:
+            logger.info(f"{job.id} ({job.name}) done")
+        processed += 1
+
+    return processed
+
+def render_job(job: Job, tmp_dir: str) -> str:
+    """用普通转换流程把任务渲染到 tmp/ 下的临时文件，返回文件路径"""
+    data = convert(job.source, ConvertOptions(**(job.options or {})))
+    temp_path = os.path.join(tmp_dir, f"{job.id}.{uuid.uuid4().hex[:8]}.mid")
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    return temp_path
+
+def result_path(spool: str, job_id: str) -> str:
+    return os.path.join(spool, 'done', job_id + '.mid')
+
+def read_status(spool: str, job_id: str) -> Optional[Dict]:
+    """读取任务状态，不存在时返回 None"""
+    try:
+        with open(os.path.join(spool, 'status', job_id + '.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def spool_status(spool: str) -> List[Dict]:
+    """所有任务的状态，按提交顺序排列"""
+    statuses = []
+    for path in sorted(glob(os.path.join(spool, 'status', '*.json'))):
+        status = read_status(spool, os.path.splitext(os.path.basename(path))[0])
+        if status is not None:
+            statuses.append(status)
+    return statuses
+
+def _write_json(spool: str, relative_path: str, data: Union[Dict, List]):
+    """原子写入：先写 tmp/ 下的临时文件，再改名到目标位置"""
+    temp_path = os.path.join(spool, 'tmp', f"{uuid.uuid4().hex}.json")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(spool, relative_path))
+
+def _write_status(spool: str, job_id: str, status: Dict):
+    _write_json(spool, os.path.join('status', job_id + '.json'), status)
+
+class _Heartbeat:
+    """渲染期间定期更新活动任务文件的 mtime，续租"""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return  # 租约已丢失
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,207 @@
+"""
+Vectorized whole-score transforms for parsed SimpleMusic data.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .constants import DRUM_CHANNEL
+from .data_structures import Note, Event
+from .parser import parse_duration
+
+VelocityCurve = Union[Callable[[np.ndarray], np.ndarray], Sequence[int], np.ndarray]
+
+@dataclass
+class ScoreColumns:
+    """列式乐谱数据：所有轨道的音符属性各存为一个 NumPy 数组"""
+    metadata: Dict
+    track_names: List[str]
+    track_configs: List[Dict]
+    track: np.ndarray  # 音符所属轨道索引
+    pitch: np.ndarray
+    start: np.ndarray
+    duration: np.ndarray
+    velocity: np.ndarray
+    channel: np.ndarray
+    instrument: np.ndarray  # -1 表示没有乐器覆盖
+    actual_length: np.ndarray  # NaN 表示没有指定实际长度
+    event_track: np.ndarray  # 事件所属轨道索引
+    event_time: np.ndarray
+    events: List[Event]
+    track_end: np.ndarray  # 每个轨道的结束时间（含末尾休止符），NaN 表示未知
+    conductor_time: np.ndarray
+    conductor: Optional[List[Event]]  # 优化过的乐谱的指挥轨事件，None 表示没有指挥轨
+
+    @classmethod
+    def from_parsed(cls, parsed_data: Dict) -> 'ScoreColumns':
+        """从 DSLParser.parse() 的结果构建列式数据"""
+        tracks_data = parsed_data.get('tracks', {})
+        track_names = list(tracks_data)
+        track_configs = []
+        track_idx, pitch, start, duration = [], [], [], []
+        velocity, channel, instrument, actual_length = [], [], [], []
+        event_track, event_time, events = [], [], []
+        track_end = []
+
+        for idx, track_name in enumerate(track_names):
+            track_data = tracks_data[track_name]
+            track_configs.append(dict(track_data.get('config', {})))
+            track_end.append(track_data.get('end_time', np.nan))
+
+            for note in track_data.get('notes', []):
+                track_idx.append(idx)
+                pitch.append(note.pitch)
+                start.append(note.start_time)
+                duration.append(note.duration)
+                velocity.append(note.velocity)
+                channel.append(note.channel)
+                instrument.append(-1 if note.instrument is None else note.instrument)
+                actual_length.append(np.nan if note.actual_length is None else note.actual_length)
+
+            for event in track_data.get('events', []):
+                event_track.append(idx)
+                event_time.append(event.time)
+                events.append(event)
+
+        conductor = parsed_data.get('conductor')
+        conductor_events = None if conductor is None else list(conductor.get('events', []))
+
+        return cls(
+            metadata=dict(parsed_data.get('metadata', {})),
+            track_names=track_names,
+            track_configs=track_configs,
+            track=np.array(track_idx, dtype=np.int32),
+            pitch=np.array(pitch, dtype=np.int16),
+            start=np.array(start, dtype=np.float64),
+            duration=np.array(duration, dtype=np.float64),
+            velocity=np.array(velocity, dtype=np.int16),
+            channel=np.array(channel, dtype=np.int8),
+            instrument=np.array(instrument, dtype=np.int16),
+            actual_length=np.array(actual_length, dtype=np.float64),
+            event_track=np.array(event_track, dtype=np.int32),
+            event_time=np.array(event_time, dtype=np.float64),
+            events=events,
+            track_end=np.array(track_end, dtype=np.float64),
+            conductor_time=np.array([event.time for event in conductor_events or []], dtype=np.float64),
+            conductor=conductor_events
+        )
+
+    def to_parsed(self) -> Dict:
+        """转换回 create_midi_file 使用的解析结构"""
+        result = {'metadata': dict(self.metadata), 'tracks': {}}
+        notes_by_track = [[] for _ in self.track_names]
+        events_by_track = [[] for _ in self.track_names]
+
+        rows = zip(self.track.tolist(), self.pitch.tolist(), self.start.tolist(),
+                   self.duration.tolist(), self.velocity.tolist(), self.channel.tolist(),
+                   self.instrument.tolist(), self.actual_length.tolist())
+        for idx, pitch, start, duration, velocity, channel, instrument, length in rows:
+            notes_by_track[idx].append(Note(
+                pitch=pitch,
+                duration=duration,
+                start_time=start,
+                velocity=velocity,
+                channel=channel,
+                instrument=None if instrument < 0 else instrument,
+                actual_length=None if length != length else length  # NaN != NaN
+            ))
+
+        for idx, time, event in zip(self.event_track.tolist(), self.event_time.tolist(), self.events):
+            events_by_track[idx].append(Event(event.type, time, event.channel, dict(event.data)))
+
+        for idx, (track_name, end) in enumerate(zip(self.track_names, self.track_end.tolist())):
+            result['tracks'][track_name] = {
+                'config': dict(self.track_configs[idx]),
+                'notes': notes_by_track[idx],
+                'events': events_by_track[idx]
+            }
+            if end == end:  # NaN 表示未知，不写入
+                result['tracks'][track_name]['end_time'] = end
+
+        if self.conductor is not None:
+            result['conductor'] = {'events': [
+                Event(event.type, time, event.channel, dict(event.data))
+                for time, event in zip(self.conductor_time.tolist(), self.conductor)
+            ]}
+
+        return result
+
+    def __len__(self) -> int:
+        return len(self.pitch)
+
+def transpose(columns: ScoreColumns, semitones: int, include_drums: bool = False) -> ScoreColumns:
+    """移调，结果限制在 MIDI 范围 0-127 内（与 note_to_midi 一致）"""
+    mask = slice(None) if include_drums else columns.channel != DRUM_CHANNEL
+    # 超过 ±127 的移调结果都一样，先限制范围，避免 int16 的音高数组溢出
+    semitones = max(-127, min(127, int(semitones)))
+    columns.pitch[mask] = np.clip(columns.pitch[mask] + semitones, 0, 127)
+    return columns
+
+def time_scale(columns: ScoreColumns, factor: float) -> ScoreColumns:
+    """按比例缩放所有时间（开始时间、时值、实际长度、事件和指挥轨事件时间、轨道结束时间）"""
+    if factor <= 0:
+        raise ValueError(f"Time scale factor must be positive, got {factor}")
+    columns.start *= factor
+    columns.duration *= factor
+    columns.actual_length *= factor  # NaN 保持不变
+    columns.event_time *= factor
+    columns.track_end *= factor
+    columns.conductor_time *= factor
+    return columns
+
+def quantize(columns: ScoreColumns, grid: Union[str, float]) -> ScoreColumns:
+    """将音符和事件的开始时间对齐到网格"""
+    grid = resolve_grid(grid)
+    columns.start = np.round(columns.start / grid) * grid
+    columns.event_time = np.round(columns.event_time / grid) * grid
+    columns.track_end = np.round(columns.track_end / grid) * grid
+    columns.conductor_time = np.round(columns.conductor_time / grid) * grid
+    return columns
+
+def map_velocity(columns: ScoreColumns, curve: VelocityCurve) -> ScoreColumns:
+    """用力度曲线映射力度：可以是作用于数组的函数，也可以是 128 项查找表"""
+    if callable(curve):
+        mapped = np.asarray(curve(columns.velocity.astype(np.float64)))
+    else:
+        table = np.asarray(curve)
+        if table.shape != (128,):
+            raise ValueError(f"Velocity lookup table must have 128 entries, got {table.shape}")
+        mapped = table[np.clip(columns.velocity, 0, 127)]
+    columns.velocity = np.clip(np.rint(mapped), 1, 127).astype(np.int16)
+    return columns
+
+def velocity_curve(gamma: float = 1.0, scale: float = 1.0, offset: float = 0.0,
+                   floor: int = 1, ceiling: int = 127) -> np.ndarray:
+    """生成力度查找表：gamma 曲线后再缩放、偏移，并限制在 [floor, ceiling]"""
+    source = np.arange(128, dtype=np.float64) / 127.0
+    table = 127.0 * source ** gamma * scale + offset
+    return np.clip(np.rint(table), floor, ceiling).astype(np.int16)
+
+def resolve_grid(grid: Union[str, float]) -> float:
+    """解析网格大小：时值字符（如 's'、'e.'、'q/3'）或拍数"""
+    value = parse_duration(grid) if isinstance(grid, str) else None
+    if value is None:
+        value = float(grid)
+
+    if value <= 0:
+        raise ValueError(f"Quantize grid must be positive, got {grid}")
+    return value
+
+def transform_score(parsed_data: Dict, transpose_by: int = 0, stretch: float = 1.0,
+                    quantize_to: Optional[Union[str, float]] = None,
+                    velocity: Optional[VelocityCurve] = None) -> Dict:
+    """对整个乐谱应用移调、时间缩放、量化和力度映射，返回新的解析结构"""
+    columns = ScoreColumns.from_parsed(parsed_data)
+
+    if transpose_by:
+        transpose(columns, transpose_by)
+    if stretch != 1.0:
+        time_scale(columns, stretch)
+    if quantize_to is not None:
+        quantize(columns, quantize_to)
+    if velocity is not None:
+        map_velocity(columns, velocity)
+
+    return columns.to_parsed()
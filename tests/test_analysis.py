@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized score analytics.
+"""
+
+import numpy as np
+
+from simplemusic import DSLParser, analyze, optimize_score
+
+DSL = """
+Tempo=120
+Track Lead: Channel=1
+C4q:v90 [E4q, G4q, B4q] D4h:lenq CC:7:90 E4q Tempo=60 F4q G4q
+Track Bass: Channel=2
+C2w C2w
+"""
+
+def test_polyphony_and_range():
+    """Test per-channel polyphony, actual_length handling and pitch ranges"""
+    dsl = """
+Track Pad: Channel=1
+[C4h, E4h, G4h] C5q:p-0.5 D4q:lenw E4q F4q
+Track Bass: Channel=2
+C2q D2q
+"""
+    stats = analyze(DSLParser(dsl).parse())
+
+    # C5q:p-0.5 在和弦中间开始；D4q:lenw 延音覆盖后面两个音符，首尾相接不算重叠
+    assert stats.max_polyphony == {0: 4, 1: 1}, f"Unexpected polyphony {stats.max_polyphony}"
+    assert stats.max_polyphony_time[0] == 1.5, f"Unexpected peak time {stats.max_polyphony_time}"
+    assert stats.peak_polyphony == 4, f"Expected peak polyphony 4, got {stats.peak_polyphony}"
+    assert stats.pitch_range == (36, 72), f"Unexpected pitch range {stats.pitch_range}"
+    assert stats.channel_pitch_range == {0: (60, 72), 1: (36, 38)}, \
+        f"Unexpected channel ranges {stats.channel_pitch_range}"
+
+    print("✅ Polyphony and range test passed")
+
+def test_density_follows_tempo_map():
+    """Test that densities and histograms use the tempo map for seconds"""
+    stats = analyze(DSLParser(DSL).parse())
+
+    assert stats.length_beats == 8.0, f"Expected 8 beats, got {stats.length_beats}"
+    assert stats.length_seconds == 5.5, f"Expected 5.5 seconds, got {stats.length_seconds}"
+    assert stats.peak_notes_per_second == 5.0, f"Unexpected peak {stats.peak_notes_per_second}"
+    assert stats.note_density.tolist() == [5, 1, 3, 1, 0, 0], \
+        f"Unexpected note histogram {stats.note_density.tolist()}"
+    assert stats.event_density['CC'].tolist() == [0, 0, 1, 0, 0, 0], \
+        f"Unexpected CC histogram {stats.event_density['CC'].tolist()}"
+
+    # 优化后速度事件在指挥轨中，统计结果应该一致
+    optimized, _ = optimize_score(DSLParser(DSL).parse())
+    assert analyze(optimized).length_seconds == 5.5, "Conductor tempo events not applied"
+
+    print("✅ Density and tempo map test passed")
+
+def test_sweep_matches_brute_force():
+    """Test the sorted sweep against a brute-force count on random notes"""
+    rng = np.random.default_rng(7)
+    lines = ['Track Random: Channel=1']
+    for _ in range(200):
+        pitch = rng.choice(['C', 'E', 'G'])
+        lines.append(f"{pitch}4s:p{rng.integers(0, 40) / 4}:len{rng.choice(['e', 'q', 'h'])}")
+    parsed = DSLParser(' '.join(lines)).parse()
+    notes = parsed['tracks']['Random']['notes']
+
+    spans = [(n.start_time, n.start_time + n.actual_length) for n in notes]
+    expected = max(sum(1 for s, e in spans if s <= t < e) for t, _ in spans)
+
+    stats = analyze(parsed)
+    assert stats.max_polyphony[0] == expected, f"Expected {expected}, got {stats.max_polyphony[0]}"
+
+    print("✅ Sweep brute force test passed")
+
+def run_analysis_tests():
+    """Run all analysis tests"""
+    print("Running analysis tests...")
+
+    try:
+        test_polyphony_and_range()
+        test_density_follows_tempo_map()
+        test_sweep_matches_brute_force()
+
+        print("\n🎉 All analysis tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Analysis test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_analysis_tests()
+    exit(0 if success else 1)
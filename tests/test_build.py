@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for Include directives and incremental project builds.
+"""
+
+import os
+import tempfile
+
+from simplemusic import DSLParser, build_project
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def test_include_directive():
+    """Test that Include splices files relative to the including file"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write(os.path.join(temp_dir, 'common', 'header.dsl'), 'Tempo=90\nInclude "riffs.dsl"\n')
+        write(os.path.join(temp_dir, 'common', 'riffs.dsl'), 'Track Riff: Channel=2\nC3q G3q\n')
+
+        dsl = 'Include "common/header.dsl"\nTrack Lead: C4q D4q'
+        parser = DSLParser(dsl, base_dir=temp_dir)
+        result = parser.parse()
+
+        assert result['metadata']['tempo'] == 90, "Included metadata not applied"
+        assert len(result['tracks']['Riff']['notes']) == 2, "Nested include not expanded"
+        assert len(result['tracks']['Lead']['notes']) == 2, "Content after include lost"
+        assert [os.path.basename(p) for p in parser.includes] == ['header.dsl', 'riffs.dsl'], \
+            f"Unexpected includes {parser.includes}"
+
+    print("✅ Include directive test passed")
+
+def test_include_cycle():
+    """Test that include cycles are reported"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write(os.path.join(temp_dir, 'a.dsl'), 'Include "b.dsl"\n')
+        write(os.path.join(temp_dir, 'b.dsl'), 'Include "a.dsl"\n')
+
+        try:
+            DSLParser('Include "a.dsl"', base_dir=temp_dir)
+        except ValueError as e:
+            assert 'cycle' in str(e), f"Unexpected error {e}"
+        else:
+            assert False, "Include cycle was not detected"
+
+    print("✅ Include cycle test passed")
+
+def test_incremental_build():
+    """Test that only targets with changed transitive inputs are rebuilt"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write(os.path.join(temp_dir, 'shared', 'tempo.dsl'), 'Tempo=100\n')
+        write(os.path.join(temp_dir, 'one.dsl'), 'Include "shared/tempo.dsl"\nTrack A: C4q\n')
+        write(os.path.join(temp_dir, 'two.dsl'), 'Include "shared/tempo.dsl"\nTrack B: D4q\n')
+        write(os.path.join(temp_dir, 'three.dsl'), 'Track C: E4q\n')
+
+        result = build_project(temp_dir, jobs=2)
+        assert sorted(result.built) == ['build/one.mid', 'build/three.mid', 'build/two.mid'], \
+            f"Unexpected first build {result}"
+        assert os.path.exists(os.path.join(temp_dir, 'build', 'one.mid')), "Output not written"
+
+        result = build_project(temp_dir, jobs=2)
+        assert result.built == [] and len(result.skipped) == 3, f"Expected no rebuilds, got {result}"
+
+        write(os.path.join(temp_dir, 'shared', 'tempo.dsl'), 'Tempo=110\n')
+        result = build_project(temp_dir, jobs=2)
+        assert sorted(result.built) == ['build/one.mid', 'build/two.mid'], f"Unexpected rebuild {result}"
+        assert result.skipped == ['build/three.mid'], f"Unexpected skip list {result}"
+
+        write(os.path.join(temp_dir, 'three.dsl'), 'Track C: E4q\nInclude "nope.dsl"\n')
+        result = build_project(temp_dir, jobs=2)
+        assert list(result.failed) == ['build/three.mid'], f"Expected three.mid to fail, got {result}"
+        assert not result.ok, "Build with failures should not be ok"
+
+    print("✅ Incremental build test passed")
+
+def run_build_tests():
+    """Run all build tests"""
+    print("Running build tests...")
+
+    try:
+        test_include_directive()
+        test_include_cycle()
+        test_incremental_build()
+
+        print("\n🎉 All build tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Build test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_build_tests()
+    exit(0 if success else 1)
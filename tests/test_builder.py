@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the programmatic ScoreBuilder API.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from simplemusic import DSLParser, ScoreBuilder, create_midi_file
+
+def test_builder_matches_parser():
+    """Test that the builder produces the same structure as the parser"""
+    dsl = """
+Tempo=96
+Track Lead: Instrument=violin Channel=2
+C4q:v90 D#4e. Rq [C4h, E4h, G4h] CC:64:127 Bb3e/3:ch3:i5 PB:-512 G4q:p0.25:lens Tempo=100
+"""
+    builder = (ScoreBuilder()
+               .tempo(96)
+               .track('Lead', instrument='violin', channel=2)
+               .note('C4', 'q', velocity=90)
+               .note('D#4', 'e.')
+               .rest('q')
+               .chord(['C4', 'E4', 'G4'], 'h')
+               .cc(64, 127)
+               .note('Bb3', 'e/3', channel=3, instrument=5)
+               .pitch_bend(-512)
+               .note(67, 1.0, position=0.25, length='s')
+               .tempo(100))
+
+    assert builder.build() == DSLParser(dsl).parse(), "Builder output differs from parser output"
+
+    print("✅ Builder matches parser test passed")
+
+def test_bulk_notes():
+    """Test that bulk appends match note-by-note appends"""
+    pitches = np.array([60, 62, 64, 65, 67])
+    durations = np.array([0.5, 0.5, 1.0 / 3, 1.0 / 3, 1.0 / 3])
+    velocities = np.array([70, 80, 90, 100, 110])
+
+    bulk = ScoreBuilder().track('Test', channel=3).notes(pitches, durations, velocities).note('C5')
+    single = ScoreBuilder().track('Test', channel=3)
+    for pitch, duration, velocity in zip(pitches, durations, velocities):
+        single.note(int(pitch), float(duration), velocity=int(velocity))
+    single.note('C5')
+
+    assert bulk.build() == single.build(), "Bulk notes differ from single notes"
+    assert bulk.build()['tracks']['Test']['notes'][0].channel == 2, "Bulk notes should use track channel"
+
+    names = ScoreBuilder().notes(['C4', 'E4', 'G4'], 'e').build()
+    assert [n.pitch for n in names['tracks']['Default']['notes']] == [60, 64, 67], "Pitch names not resolved"
+
+    print("✅ Bulk notes test passed")
+
+def test_builder_to_midi():
+    """Test writing a built score to a MIDI file"""
+    score = ScoreBuilder(tempo=140).track('Piano', instrument='piano').chord([60, 64, 67], 'w').build()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'built.mid')
+        create_midi_file(score, output_file)
+        assert os.path.exists(output_file), "Output MIDI file was not created"
+
+    print("✅ Builder to MIDI test passed")
+
+def run_builder_tests():
+    """Run all builder tests"""
+    print("Running ScoreBuilder tests...")
+
+    try:
+        test_builder_matches_parser()
+        test_bulk_notes()
+        test_builder_to_midi()
+
+        print("\n🎉 All builder tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Builder test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_builder_tests()
+    exit(0 if success else 1)
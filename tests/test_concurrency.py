@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress tests for the thread-safe conversion API.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from simplemusic import ConvertOptions, convert, convert_async, create_midi_file, DSLParser
+from simplemusic import EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED
+
+def score(i):
+    """每个任务使用不同的乐谱，结果互相串扰时可以发现"""
+    bars = ' | '.join(f"C4e:v{40 + (i + b) % 80} [E4q, G4q:i{i % 8}] CC:7:{(i * b) % 128} "
+                      f"PB:0->{i * 10}/q R{'eqh'[b % 3]}" for b in range(20))
+    return f"Tempo={60 + i}\nTrack Part{i}: Instrument={i % 128} Channel={i % 16 + 1}\n{bars}"
+
+JOBS = [(score(i), ConvertOptions(transpose=i % 5, optimize=i % 2 == 0)) for i in range(40)]
+JOBS += [(text, ConvertOptions(stretch=1.5)) for text in (EXAMPLE_BASIC, EXAMPLE_COMPLEX, EXAMPLE_ADVANCED)]
+
+def test_convert_matches_file_writer():
+    """Test that convert() returns the same bytes create_midi_file() writes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'out.mid')
+        create_midi_file(DSLParser(EXAMPLE_COMPLEX).parse(), path)
+        with open(path, 'rb') as f:
+            assert convert(EXAMPLE_COMPLEX) == f.read(), "convert() differs from create_midi_file()"
+
+    try:
+        convert("Tempo=90")
+    except ValueError:
+        pass
+    else:
+        assert False, "Empty score should raise ValueError"
+
+    print("✅ Convert bytes test passed")
+
+def test_threaded_stress():
+    """Test many concurrent conversions against sequential results"""
+    expected = [convert(text, options) for text, options in JOBS]
+    barrier = threading.Barrier(8)
+
+    def run(job_index):
+        # 前 8 个任务同时开始，尽量让解析和写入交错
+        if job_index < 8:
+            barrier.wait()
+        text, options = JOBS[job_index % len(JOBS)]
+        return job_index % len(JOBS), convert(text, options)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, range(len(JOBS) * 5)))
+
+    for index, data in results:
+        assert data == expected[index], f"Threaded conversion {index} differs from sequential result"
+
+    print("✅ Threaded stress test passed")
+
+def test_async_wrapper():
+    """Test that convert_async runs conversions concurrently off the event loop"""
+    expected = [convert(text, options) for text, options in JOBS]
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            return await asyncio.gather(*(convert_async(text, options, executor=executor)
+                                          for text, options in JOBS))
+
+    assert asyncio.run(main()) == expected, "Async results differ from sequential results"
+
+    print("✅ Async wrapper test passed")
+
+def test_includes_need_base_dir():
+    """Test that convert only reads included files inside an explicit base_dir"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project = os.path.join(temp_dir, 'project')
+        os.makedirs(project)
+        with open(os.path.join(project, 'header.dsl'), 'w', encoding='utf-8') as f:
+            f.write("Tempo=90")
+        secret = os.path.join(temp_dir, 'secret.dsl')
+        with open(secret, 'w', encoding='utf-8') as f:
+            f.write("Tempo=60")
+
+        dsl = 'Include "header.dsl"\nTrack A: C4q'
+        assert convert(dsl, ConvertOptions(base_dir=project)).startswith(b'MThd'), "Include in base_dir failed"
+
+        rejected = [
+            (dsl, ConvertOptions()),                                   # 没有 base_dir：不读取任何文件
+            (f'Include "{secret}"\nTrack A: C4q', ConvertOptions(base_dir=project)),
+            ('Include "../secret.dsl"\nTrack A: C4q', ConvertOptions(base_dir=project)),
+            (f'Include "{secret}"\nTrack A: C4q', ConvertOptions(allow_includes=True)),
+        ]
+        for text, options in rejected:
+            try:
+                convert(text, options)
+                assert False, f"Include should be rejected: {text!r} with {options}"
+            except ValueError:
+                pass
+
+    print("✅ Include restriction test passed")
+
+def run_concurrency_tests():
+    """Run all concurrency tests"""
+    print("Running concurrency tests...")
+
+    try:
+        test_convert_matches_file_writer()
+        test_threaded_stress()
+        test_async_wrapper()
+        test_includes_need_base_dir()
+
+        print("\n🎉 All concurrency tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Concurrency test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_concurrency_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic score diff.
+"""
+
+import os
+import tempfile
+
+from simplemusic import EXAMPLE_ADVANCED, EXAMPLE_COMPLEX, ConvertOptions, convert, diff_scores
+from simplemusic.diff import align, diff_indexes, load_index
+
+ORIGINAL = """
+Tempo=100
+TimeSig=3/4
+Track Lead: Instrument=piano Channel=1
+C4q D4q E4q | F4h G4q | A4q:v100 B4q C5q
+Track Bass: Instrument=bass Channel=2
+C2h. | CC:7:100 G2h. | C2h.
+"""
+
+EDITED = """
+Tempo=100
+TimeSig=3/4
+Track Lead: Instrument=piano Channel=1
+C4q D4q E4q | F4q G4q G4q | A4q:v90 B4q Tempo=120 C5q
+Track Bass: Instrument=bass Channel=2
+C2h. | CC:7:90 G2h. | C2h.
+"""
+
+def test_equivalent_across_formats():
+    """Test a DSL score, its format-1 file and its format-0 file compare equal"""
+    format1 = convert(EXAMPLE_COMPLEX)
+    format0 = convert(EXAMPLE_COMPLEX, ConvertOptions(midi_format=0))
+
+    result = diff_scores(EXAMPLE_COMPLEX, format1)
+    assert result.identical, f"DSL and its MIDI should be equivalent: {result.summary()}"
+    assert result.notes[0] == result.notes[1] > 0, f"Unexpected note counts {result.notes}"
+
+    result = diff_scores(format1, format0, by='channel')
+    assert result.identical, f"Format 0 and 1 should be equivalent by channel: {result.summary()}"
+    assert not diff_scores(format1, format0).identical, "Track names are lost in format 0"
+
+    # 6/8 拍号的分母按 2 的幂次写入
+    result = diff_scores(EXAMPLE_ADVANCED, convert(EXAMPLE_ADVANCED))
+    assert result.identical, f"6/8 score should match its MIDI: {result.summary()}"
+
+    # DSL 中的重复音符和写入器一样只保留一个
+    duplicates = 'Track A: [C4q, C4q]'
+    for midi_format in (0, 1):
+        result = diff_scores(duplicates, convert(duplicates, ConvertOptions(midi_format=midi_format)))
+        assert result.identical, f"Duplicate notes should match format {midi_format}: {result.summary()}"
+
+    # 不同分辨率换算到公共分辨率后再比较
+    index = load_index(format1)
+    assert diff_indexes(index, index.rescaled(2)).identical, "Rescaled index should be equivalent"
+
+    print("✅ Equivalent formats test passed")
+
+def test_changes_with_bar_positions():
+    """Test added, removed and changed notes and events are reported with bar:beat"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_path = os.path.join(temp_dir, 'old.mid')
+        with open(old_path, 'wb') as f:
+            f.write(convert(ORIGINAL))
+        result = diff_scores(old_path, EDITED)
+
+    found = {(d.change, d.track, d.kind, d.bar, d.beat) for d in result.differences}
+    expected = {
+        ('changed', 'Lead', 'note', 2, 1.0),    # F4 时值 h -> q
+        ('added', 'Lead', 'note', 2, 2.0),      # 新增 G4（原来第 3 拍的 G4 仍然对齐）
+        ('changed', 'Lead', 'note', 3, 1.0),    # A4 力度 100 -> 90
+        ('added', '(conductor)', 'Tempo', 3, 3.0),
+        ('changed', 'Bass', 'CC', 2, 1.0),
+    }
+    assert found == expected, f"Unexpected differences {sorted(found)}"
+
+    f4 = next(d for d in result.differences if d.number == 65)
+    assert f4.before == {'duration': 2.0, 'velocity': 80} and f4.after['duration'] == 1.0, \
+        f"Unexpected F4 change {f4}"
+    counts = result.counts()
+    assert counts['notes_changed'] == 2 and counts['notes_added'] == 1 and counts['events_added'] == 1
+    assert '120 bpm' in next(d for d in result.differences if d.kind == 'Tempo').describe()
+
+    print("✅ Changes with bar positions test passed")
+
+def test_align_large_scores():
+    """Test the merge alignment finds scattered edits in a large score"""
+    tokens = ['C4e', 'D4e', 'E4e', 'F4e', 'G4e', 'A4e', 'B4e', 'C5e'] * 2500
+    edited = list(tokens)
+    edited[8 * 500 + 3] = 'F#4e'   # 第 501 小节第 4 个八分音符修改音高
+    edited[8 * 1000] = 'C4e:v50'   # 第 1001 小节第 1 个音符修改力度
+    result = diff_scores("Track Piano: Channel=1\n" + ' '.join(tokens),
+                         "Track Piano: Channel=1\n" + ' '.join(edited))
+
+    assert result.notes == (20000, 20000), f"Unexpected note counts {result.notes}"
+    found = [(d.change, d.bar, d.beat, d.number) for d in result.differences]
+    assert found == [('removed', 501, 2.5, 65), ('added', 501, 2.5, 66), ('changed', 1001, 1.0, 60)], \
+        f"Unexpected differences {found}"
+
+    # 同一键的重复项按顺序配对，多出来的算作增加
+    pairs = list(align([(0, 60, 0, 1, 80)], [(0, 60, 0, 1, 80), (0, 60, 0, 1, 90)], 3))
+    assert pairs == [(None, (0, 60, 0, 1, 90))], f"Unexpected alignment {pairs}"
+
+    print("✅ Large score alignment test passed")
+
+def run_diff_tests():
+    """Run all diff tests"""
+    print("Running diff tests...")
+
+    try:
+        test_equivalent_across_formats()
+        test_changes_with_bar_positions()
+        test_align_large_scores()
+
+        print("\n🎉 All diff tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Diff test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_diff_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming NDJSON/CSV/Arrow export.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+
+from simplemusic import DSLParser, export_score, iter_rows, optimize_score
+from simplemusic.export import pa
+
+DSL = """
+Tempo=100
+Track Lead: Instrument=violin Channel=1
+C4q:v90 D4e:i5 [E4q, G4q] CC:64:127 PB:-512 R Tempo=110 PC:3 F4q:lene
+Track Bass: Channel=2
+C2h G2h
+"""
+
+def row_key(row):
+    return (row['track'], row['time'], row['kind'], row['pitch'] or 0, row['event_type'] or '')
+
+def test_streaming_rows_match_parse():
+    """Test that streamed rows match rows from the full parse result"""
+    parser = DSLParser(DSL)
+    streamed = list(iter_rows(parser))
+    full = list(iter_rows(DSLParser(DSL).parse()))
+
+    assert sorted(streamed, key=row_key) == sorted(full, key=row_key), "Streamed rows differ"
+    assert len(streamed) == 11, f"Expected 11 rows, got {len(streamed)}"
+    assert all(not t.notes and not t.events for t in parser.tracks.values()), \
+        "Streaming should not keep parsed notes and events"
+
+    cc = next(r for r in streamed if r['event_type'] == 'CC')
+    assert (cc['controller'], cc['value'], cc['time']) == (64, 127, 2.5), f"Unexpected CC row {cc}"
+    tempo = next(r for r in streamed if r['event_type'] == 'Tempo')
+    assert tempo['value'] == 110, f"Unexpected tempo row {tempo}"
+
+    print("✅ Streaming rows test passed")
+
+def test_ndjson_and_csv_export():
+    """Test the pure-stdlib NDJSON and CSV writers"""
+    buffer = io.StringIO()
+    count = export_score(DSLParser(DSL), buffer, 'ndjson')
+    lines = [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+    assert count == 11, f"Expected 11 rows, got {count}"
+    assert lines[0] == {'kind': 'metadata', 'tempo': 100, 'key': 'C Major',
+                        'time_sig': [4, 4], 'ticks_per_beat': 480}, f"Unexpected metadata {lines[0]}"
+    assert lines[1]['pitch'] == 60 and lines[1]['velocity'] == 90, f"Unexpected first row {lines[1]}"
+
+    buffer = io.StringIO()
+    export_score(DSLParser(DSL), buffer, 'csv')
+    rows = list(csv.DictReader(io.StringIO(buffer.getvalue())))
+    assert len(rows) == 11, f"Expected 11 CSV rows, got {len(rows)}"
+    assert rows[1]['instrument'] == '5' and rows[0]['instrument'] == '', f"Unexpected CSV rows {rows[:2]}"
+
+    print("✅ NDJSON and CSV export test passed")
+
+def test_conductor_rows():
+    """Test that tempo changes moved to the conductor track of an optimized score are exported"""
+    optimized, _ = optimize_score(DSLParser(DSL).parse())
+    rows = list(iter_rows(optimized))
+
+    assert len(rows) == 11, f"Expected 11 rows, got {len(rows)}"
+    tempo = next(r for r in rows if r['event_type'] == 'Tempo')
+    assert (tempo['track'], tempo['time'], tempo['value']) == ('(conductor)', 2.5, 110), \
+        f"Unexpected conductor row {tempo}"
+
+    print("✅ Conductor rows test passed")
+
+def test_arrow_and_parquet_export():
+    """Test columnar export when pyarrow is installed"""
+    if pa is None:
+        print("⏭️  pyarrow not installed, skipping Arrow/Parquet export test")
+        return
+
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        arrow_path = os.path.join(temp_dir, 'score.arrow')
+        parquet_path = os.path.join(temp_dir, 'score.parquet')
+        assert export_score(DSLParser(DSL), arrow_path, 'arrow', batch_size=4) == 11
+        assert export_score(DSLParser(DSL), parquet_path, 'parquet', batch_size=4) == 11
+
+        with pa.memory_map(arrow_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        assert table.num_rows == 11, f"Expected 11 Arrow rows, got {table.num_rows}"
+        assert table.schema.metadata[b'tempo'] == b'100', "Score metadata missing from schema"
+
+        parquet = pq.read_table(parquet_path)
+        assert parquet.column('pitch').to_pylist() == table.column('pitch').to_pylist(), \
+            "Parquet and Arrow exports differ"
+
+    print("✅ Arrow and Parquet export test passed")
+
+def run_export_tests():
+    """Run all export tests"""
+    print("Running export tests...")
+
+    try:
+        test_streaming_rows_match_parse()
+        test_ndjson_and_csv_export()
+        test_conductor_rows()
+        test_arrow_and_parquet_export()
+
+        print("\n🎉 All export tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Export test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_export_tests()
+    exit(0 if success else 1)
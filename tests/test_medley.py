@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-score concatenation and medley rendering.
+"""
+
+import os
+import tempfile
+
+from simplemusic import DSLParser, concat_scores, create_midi_file, optimize_score, transform_score, write_medley
+from simplemusic.diff import load_index
+
+FIRST = """
+Tempo=100
+Track Lead: Instrument=piano Channel=1
+C4q D4q E4q F4q
+Track Drums: Channel=10
+C2q C2q C2q C2q
+"""
+
+SECOND = """
+Tempo=140
+Track Lead: Instrument=violin Channel=1
+G4h A4h Tempo=150 B4q
+Track Bass: Channel=2
+C2w
+"""
+
+def events_of(track_data, kind):
+    return [(e.time, e.data) for e in track_data['events'] if e.type == kind]
+
+def test_concat_offsets_and_boundaries():
+    """Test time offsets, track merging by name and boundary tempo/program changes"""
+    result = concat_scores([DSLParser(FIRST).parse(), SECOND, DSLParser(FIRST).parse()])
+
+    assert list(result['tracks']) == ['Lead', 'Drums', 'Bass'], f"Unexpected tracks {list(result['tracks'])}"
+    assert result['metadata']['tempo'] == 100, "Metadata should come from the first score"
+
+    lead = result['tracks']['Lead']
+    starts = [n.start_time for n in lead['notes']]
+    assert starts == [0.0, 1.0, 2.0, 3.0, 4.0, 6.0, 8.0, 9.0, 10.0, 11.0, 12.0], f"Unexpected starts {starts}"
+    assert events_of(lead, 'Tempo') == [(4.0, {'tempo': 140}), (8.0, {'tempo': 150}), (9.0, {'tempo': 100})], \
+        f"Unexpected tempo changes {events_of(lead, 'Tempo')}"
+    assert events_of(lead, 'PC') == [(4.0, {'program': 40}), (9.0, {'program': 0})], \
+        f"Unexpected program changes {events_of(lead, 'PC')}"
+    assert result['tracks']['Bass']['config'] == {'channel': 1, 'instrument': 0}, "Unexpected Bass config"
+    assert [n.start_time for n in result['tracks']['Drums']['notes']][4:] == [9.0, 10.0, 11.0, 12.0], \
+        "Drums of the third score not offset"
+
+    print("✅ Concat offsets test passed")
+
+def test_merge_by_channel():
+    """Test channel merging and program resets after in-score program changes"""
+    first = "Track Piano: Instrument=piano Channel=1\nC4q PC:5 D4q"
+    second = "Track Keys: Instrument=piano Channel=1\nE4q"
+    result = concat_scores([first, second], merge_by='channel', gap=1.0)
+
+    assert list(result['tracks']) == ['Piano'], f"Tracks should merge by channel, got {list(result['tracks'])}"
+    piano = result['tracks']['Piano']
+    assert [n.start_time for n in piano['notes']] == [0.0, 1.0, 3.0], "Gap not applied"
+    assert events_of(piano, 'PC') == [(1.0, {'program': 5}), (3.0, {'program': 0})], \
+        f"Program should be restored at the boundary, got {events_of(piano, 'PC')}"
+
+    try:
+        concat_scores([first], merge_by='instrument')
+    except ValueError:
+        pass
+    else:
+        assert False, "Unknown merge mode should raise ValueError"
+
+    print("✅ Merge by channel test passed")
+
+def test_write_medley_from_files():
+    """Test streaming a medley of DSL files and optimized scores to a MIDI file"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for name, text in [('intro', FIRST), ('verse', SECOND)]:
+            paths.append(os.path.join(temp_dir, name + '.dsl'))
+            with open(paths[-1], 'w', encoding='utf-8') as f:
+                f.write(text)
+
+        optimized, _ = optimize_score(DSLParser(SECOND).parse())
+        output = os.path.join(temp_dir, 'medley.mid')
+        segments = write_medley(paths + [optimized], output)
+
+        assert [(s.name, s.start, s.end) for s in segments] == \
+            [('intro', 0.0, 4.0), ('verse', 4.0, 9.0), ('score3', 9.0, 14.0)], f"Unexpected segments {segments}"
+        with open(output, 'rb') as f:
+            data = f.read()
+        assert data.startswith(b'MThd') and data.count(b'MTrk') == 4, "Expected a tempo track and 3 merged tracks"
+
+    print("✅ Write medley test passed")
+
+def test_trailing_rests_kept():
+    """Test a trailing rest delays the next score, also after optimizing and stretching"""
+    result = concat_scores(['Track A: C4q Rh', 'Track A: D4q'])
+    assert [n.start_time for n in result['tracks']['A']['notes']] == [0.0, 3.0], \
+        f"Trailing rest dropped: {[n.start_time for n in result['tracks']['A']['notes']]}"
+    assert result['tracks']['A']['end_time'] == 4.0, "Medley should end after its last score"
+
+    # 串烧结果和变换、优化后的乐谱保留结束时间
+    stretched = transform_score(optimize_score(DSLParser('Track A: C4q Rh').parse())[0], stretch=2.0)
+    result = concat_scores([stretched, result])
+    assert [n.start_time for n in result['tracks']['A']['notes']] == [0.0, 6.0, 9.0], \
+        f"Unexpected starts {[n.start_time for n in result['tracks']['A']['notes']]}"
+
+    print("✅ Trailing rests test passed")
+
+def test_time_signature_changes():
+    """Test a later score in another meter gets a time signature at its start"""
+    sources = ['Track A: C4w', 'TimeSig=3/4\nTrack A: D4h.', 'TimeSig=3/4\nTrack A: E4h.', 'Track A: F4w']
+    result = concat_scores(sources)
+    assert events_of(result['tracks']['A'], 'TimeSig') == [(4.0, {'numerator': 3, 'denominator': 4}),
+                                                          (10.0, {'numerator': 4, 'denominator': 4})], \
+        f"Unexpected time signatures {events_of(result['tracks']['A'], 'TimeSig')}"
+
+    expected = [(0, 4, 4), (4 * 960, 3, 4), (10 * 960, 4, 4)]
+    assert load_index(convert_parsed(result)).time_sigs == expected, "Concatenated score lost its meters"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output = os.path.join(temp_dir, 'medley.mid')
+        write_medley(sources, output)
+        with open(output, 'rb') as f:
+            assert load_index(f.read()).time_sigs == expected, "Medley file lost its meters"
+
+    print("✅ Time signature changes test passed")
+
+def convert_parsed(parsed):
+    """用 MIDIUtil 写入器把解析结构转换为 MIDI 数据"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'score.mid')
+        create_midi_file(parsed, path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+def run_medley_tests():
+    """Run all medley tests"""
+    print("Running medley tests...")
+
+    try:
+        test_concat_offsets_and_boundaries()
+        test_merge_by_channel()
+        test_write_medley_from_files()
+        test_trailing_rests_kept()
+        test_time_signature_changes()
+
+        print("\n🎉 All medley tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Medley test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_medley_tests()
+    exit(0 if success else 1)
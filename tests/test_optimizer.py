@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the redundant MIDI event elimination pass.
+"""
+
+import os
+import tempfile
+
+from simplemusic import ConvertOptions, DSLParser, convert, create_midi_file, optimize_score
+from simplemusic.smf import ordered_events, read_smf
+
+def test_redundant_program_changes():
+    """Test that repeated instrument overrides only keep real changes"""
+    dsl = "Track Lead: Instrument=5 Channel=1\nC4q:i5 D4q:i7 E4q:i7 F4q:i5 PC:5"
+    parsed = DSLParser(dsl).parse()
+    optimized, report = optimize_score(parsed)
+
+    instruments = [note.instrument for note in optimized['tracks']['Lead']['notes']]
+    assert instruments == [None, 7, None, 5], f"Unexpected instruments {instruments}"
+    assert optimized['tracks']['Lead']['events'] == [], "Redundant PC event should be removed"
+    # C4q:i5 与轨道头的 PC 在同一 tick 完全相同，写入器本来就会删掉，不计入统计
+    assert report.removed_program_changes == 2, f"Expected 2 removed PCs, got {report.removed_program_changes}"
+    assert parsed['tracks']['Lead']['notes'][0].instrument == 5, "Input must not be modified"
+
+    print("✅ Redundant program change test passed")
+
+def test_redundant_controls_across_tracks():
+    """Test per-channel CC and pitch bend state shared between tracks"""
+    dsl = """
+Track A: Channel=1
+CC:7:100 C4q CC:7:100 CC:64:127 PB:0 D4q PB:0 PB:512
+Track B: Channel=1
+Rh CC:7:100 CC:7:90
+"""
+    optimized, report = optimize_score(DSLParser(dsl).parse())
+
+    a_events = [(e.type, e.data) for e in optimized['tracks']['A']['events']]
+    b_events = [(e.type, e.data) for e in optimized['tracks']['B']['events']]
+    assert a_events == [('CC', {'controller': 7, 'value': 100}),
+                        ('CC', {'controller': 64, 'value': 127}),
+                        ('PB', {'value': 0}),
+                        ('PB', {'value': 512})], f"Unexpected events in A: {a_events}"
+    assert b_events == [('CC', {'controller': 7, 'value': 90})], f"Unexpected events in B: {b_events}"
+    assert report.removed_control_changes == 2, f"Expected 2 removed CCs, got {report.removed_control_changes}"
+    assert report.removed_pitch_bends == 1, f"Expected 1 removed PB, got {report.removed_pitch_bends}"
+
+    print("✅ Redundant controls test passed")
+
+def test_conductor_track():
+    """Test that tempo events are collapsed into the conductor track"""
+    dsl = """
+Tempo=120
+Track A: C4q Tempo=120 D4q Tempo=90
+Track B: C4q Tempo=90
+Track C: C4q
+"""
+    optimized, report = optimize_score(DSLParser(dsl).parse())
+
+    tempos = [(e.time, e.data['tempo']) for e in optimized['conductor']['events']]
+    assert tempos == [(1.0, 90)], f"Unexpected conductor tempos {tempos}"
+    assert all(not t['events'] for t in optimized['tracks'].values()), "Tempo events should leave tracks"
+    assert report.removed_tempo_changes == 2, f"Expected 2 removed tempos, got {report.removed_tempo_changes}"
+    assert report.total_removed == 2, f"Only events present in the score count, got {report.total_removed}"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'optimized.mid')
+        create_midi_file(optimized, output_file)
+        assert os.path.exists(output_file), "Optimized MIDI file was not created"
+
+    print("✅ Conductor track test passed")
+
+def note_programs(data):
+    """每个音符开始时所在通道的音色：(tick, 通道, 音高, 音色)"""
+    programs = {}
+    result = []
+    for tick, message in ordered_events(read_smf(data)):
+        status, channel = message[0] & 0xF0, message[0] & 0x0F
+        if status == 0xC0:
+            programs[channel] = message[1]
+        elif status == 0x90 and message[2] > 0:
+            result.append((tick, channel, message[1], programs.get(channel)))
+    return result
+
+def test_optimized_output_sounds_the_same():
+    """Test that every note plays on the same program with and without optimization"""
+    scores = [
+        "Track A: Channel=1\nPC:1 PC:2 PC:1 C4q D4q:i1",
+        "Track A: Instrument=1 Channel=1\nPC:1 PC:2 PC:1 C4q D4q:i1 E4q:i2 PC:2 F4q",
+        "Track A: Channel=1\nC4q:i3 PC:3 PC:4 D4q\nTrack B: Channel=1\nPC:4 Rq E4q:i4",
+    ]
+    for dsl in scores:
+        for midi_format in (0, 1):
+            plain = note_programs(convert(dsl, ConvertOptions(midi_format=midi_format)))
+            optimized = note_programs(convert(dsl, ConvertOptions(midi_format=midi_format, optimize=True)))
+            assert optimized == plain, f"Optimization changed programs of {dsl!r}: {plain} -> {optimized}"
+
+    assert note_programs(convert(scores[0], ConvertOptions(optimize=True)))[1] == (960, 0, 62, 1), \
+        "D4 should keep program 1"
+
+    print("✅ Optimized output test passed")
+
+def run_optimizer_tests():
+    """Run all optimizer tests"""
+    print("Running optimizer tests...")
+
+    try:
+        test_redundant_program_changes()
+        test_redundant_controls_across_tracks()
+        test_conductor_track()
+        test_optimized_output_sounds_the_same()
+
+        print("\n🎉 All optimizer tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Optimizer test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_optimizer_tests()
+    exit(0 if success else 1)
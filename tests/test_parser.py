@@ -3,7 +3,7 @@
 Unit tests for DSL parser functionality.
 """
 
-from simplemusic import DSLParser
+from simplemusic import DSLParser, Track
 
 def test_basic_note_parsing():
     """Test basic note parsing"""
@@ -93,6 +93,117 @@ def test_instrument_and_channel():
     
     print("✅ Instrument and channel test passed")
 
+def test_control_events_between_notes():
+    """Test that control events are not mistaken for notes"""
+    dsl = "Track Test: C4q CC:64:127 D4q PC:5 PB:-512 E4q"
+    parser = DSLParser(dsl)
+    result = parser.parse()
+    
+    notes = result['tracks']['Test']['notes']
+    events = result['tracks']['Test']['events']
+    
+    assert len(notes) == 3, f"Expected 3 notes, got {len(notes)}"
+    assert [e.type for e in events] == ['CC', 'PC', 'PB'], f"Unexpected events {events}"
+    assert events[0].time == 1.0, f"Expected CC at 1.0, got {events[0].time}"
+    assert events[0].data == {'controller': 64, 'value': 127}, f"Unexpected CC data {events[0].data}"
+    
+    print("✅ Control events test passed")
+
+def test_parallel_parsing_matches_sequential():
+    """Test that barline-split parallel parsing gives identical output"""
+    bars = []
+    for i in range(60):
+        bars.append(f"C4e/3 D4e/3:v{60 + i} E4e/3 [F4q., A4e] CC:7:{i} G4s:p0.1 Rt PB:{i * 10} B3q:len3")
+    dsl = "Track Solo: Instrument=piano Channel=1\n" + " | ".join(bars) + "\nTrack Other: C4q D4q"
+    
+    sequential = DSLParser(dsl).parse()
+    parallel = DSLParser(dsl, parallel=True, parallel_threshold=100, workers=2).parse()
+    
+    assert parallel == sequential, "Parallel parse differs from sequential parse"
+    assert len(parallel['tracks']['Solo']['notes']) == 60 * 7, "Unexpected note count"
+    
+    print("✅ Parallel parsing test passed")
+
+def test_automation_ramps():
+    """Test CC and pitch bend ramp expansion"""
+    dsl = "Track Test: CC:11:0->127/2h C4q PB:0->4096/q D4q"
+    parser = DSLParser(dsl)
+    result = parser.parse()
+    
+    notes = result['tracks']['Test']['notes']
+    events = result['tracks']['Test']['events']
+    cc = [e for e in events if e.type == 'CC']
+    pb = [e for e in events if e.type == 'PB']
+    
+    assert [n.start_time for n in notes] == [0.0, 1.0], "Ramps should not advance time"
+    assert (cc[0].time, cc[0].data['value']) == (0.0, 0), f"Unexpected first CC {cc[0]}"
+    assert (cc[-1].time, cc[-1].data['value']) == (4.0, 127), f"Unexpected last CC {cc[-1]}"
+    assert all(e.data['controller'] == 11 for e in cc), "Ramp events should keep the controller"
+    assert (pb[0].time, pb[0].data['value']) == (1.0, 0), f"Unexpected first PB {pb[0]}"
+    assert (pb[-1].time, pb[-1].data['value']) == (2.0, 4096), f"Unexpected last PB {pb[-1]}"
+    assert [e.time for e in cc] == sorted(e.time for e in cc), "Ramp events out of order"
+    
+    print("✅ Automation ramps test passed")
+
+def test_ramp_event_thinning():
+    """Test that ramp event counts follow value changes, not duration"""
+    short = DSLParser("Track Test: CC:7:100->104/q").parse()['tracks']['Test']['events']
+    long = DSLParser("Track Test: CC:7:100->104/16w").parse()['tracks']['Test']['events']
+    
+    assert len(short) == 5, f"Expected 5 events for a 4-step ramp, got {len(short)}"
+    assert len(long) == 5, f"Long ramp should not add events, got {len(long)}"
+    assert [e.data['value'] for e in long] == [100, 101, 102, 103, 104], "Unexpected ramp values"
+    
+    exact = DSLParser("Track Test: CC:11:0->127/4w").parse()['tracks']['Test']['events']
+    thinned = DSLParser("Track Test: CC:11:0->127/4w", ramp_tolerance=3).parse()['tracks']['Test']['events']
+    assert len(exact) == 128, f"Expected one event per value, got {len(exact)}"
+    assert len(thinned) <= 33, f"Tolerance should thin the ramp, got {len(thinned)} events"
+    assert thinned[-1].data['value'] == 127, "Thinned ramp must end on the target value"
+    assert max(b.data['value'] - a.data['value'] for a, b in zip(thinned, thinned[1:])) <= 4, \
+        "Thinned ramp steps exceed the tolerance"
+    
+    # 采样间隔必须为正，在构造时就报错而不是解析到渐变时才除零
+    for resolution in (0, -0.5):
+        try:
+            DSLParser("Track A: CC:7:0->127/q", ramp_resolution=resolution)
+            assert False, f"Ramp resolution {resolution} should be rejected"
+        except ValueError:
+            pass
+    
+    print("✅ Ramp event thinning test passed")
+
+def test_token_cache():
+    """Test that cached token decoding matches uncached decoding"""
+    bar = "C4q:v90 [C4e, E4e, G4e:i5] CC:11:0->127/q Rs D4e:p0.5:lens PB:100 Tempo=90 E4t"
+    dsl = f"Track A: Channel=1\n{' | '.join([bar] * 20)}\nTrack B: Channel=2\n{bar}"
+
+    uncached = DSLParser(dsl, cache_size=0).parse()
+    parser = DSLParser(dsl)
+    cached = parser.parse()
+    assert cached == uncached, "Cached parse differs from uncached parse"
+    assert cached['tracks']['B']['notes'][0].channel == 1, "Cache should be keyed by track channel"
+
+    info = parser.cache_info()
+    assert info.misses == 16 and info.hits == 21 * 8 - 16, f"Unexpected cache counts {info}"
+    assert 0.9 < info.hit_rate < 1.0, f"Unexpected hit rate {info.hit_rate}"
+
+    # 修改取出的结果不能影响缓存：在同一个解析器上再次解析同一个 token
+    token = 'CC:11:0->127/q'
+    template = [dict(data) for _, _, _, data in parser._token_cache[(token, 0)][1]]
+    cached['tracks']['A']['events'][0].data['value'] = 99
+    track = Track(name='A', channel=0)
+    parser._parse_token(token, track)
+    assert [e.data for e in track.events] == template, "Cached event data was shared"
+    assert [data for _, _, _, data in parser._token_cache[(token, 0)][1]] == template, \
+        "Mutating a parse result changed the cached template"
+    assert template[0]['value'] == 0, f"Unexpected ramp start {template[0]}"
+
+    small = DSLParser(dsl, cache_size=2)
+    assert small.parse() == uncached, "Evicting cache changed the result"
+    assert small.cache_info().currsize == 2, "Cache grew past its size"
+
+    print("✅ Token cache test passed")
+
 def run_parser_tests():
     """Run all parser tests"""
     print("Running DSL parser tests...")
@@ -103,6 +214,11 @@ def run_parser_tests():
         test_chord_parsing()
         test_rest_parsing()
         test_instrument_and_channel()
+        test_control_events_between_notes()
+        test_parallel_parsing_matches_sequential()
+        test_automation_ramps()
+        test_ramp_event_thinning()
+        test_token_cache()
         
         print("\n🎉 All parser tests passed!")
         return True
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the format-0 Standard MIDI File writer and the SMF reader.
+"""
+
+from simplemusic import EXAMPLE_COMPLEX, ConvertOptions, DSLParser, Note, convert
+from simplemusic.smf import _var_length, ordered_events, read_smf, smf_bytes
+
+TWO_TRACKS = """
+Tempo=100
+Track Lead: Instrument=piano Channel=1
+C4q D4q Tempo=100 E4q Tempo=120 F4w
+Track Bass: Instrument=bass Channel=2
+C2h CC:7:100 G2h PB:4096 C2w
+"""
+
+def normalized(data):
+    """所有轨道的事件（不含轨道名），音符关统一为力度 0 的音符开"""
+    events = []
+    for tick, message in ordered_events(read_smf(data)):
+        if message[:2] == b'\xff\x03':
+            continue
+        if message[0] & 0xF0 == 0x80:
+            message = bytes([0x90 | message[0] & 0x0F, message[1], 0])
+        events.append((tick, bytes(message)))
+    return sorted(events)
+
+def test_format0_matches_format1():
+    """Test format 0 holds the same events as the MIDIUtil format-1 file"""
+    format1 = convert(EXAMPLE_COMPLEX)
+    format0 = convert(EXAMPLE_COMPLEX, ConvertOptions(midi_format=0))
+
+    smf = read_smf(format0)
+    assert smf.format == 0 and len(smf.tracks) == 1, "Format 0 should have a single track"
+    assert smf.ticks_per_beat == 960, f"Expected 960 ticks per beat, got {smf.ticks_per_beat}"
+    assert normalized(format0) == normalized(format1), "Format 0 events differ from format 1"
+    assert len(format0) < len(format1), f"Format 0 should be smaller: {len(format0)} >= {len(format1)}"
+
+    ticks = [tick for tick, _ in smf.tracks[0]]
+    assert ticks == sorted(ticks), "Merged stream should be time-ordered"
+
+    try:
+        convert(EXAMPLE_COMPLEX, ConvertOptions(midi_format=2))
+        assert False, "Format 2 should be rejected"
+    except ValueError:
+        pass
+
+    print("✅ Format 0 vs format 1 test passed")
+
+def test_meta_dedup_and_running_status():
+    """Test merged meta events are deduplicated and running status is decoded"""
+    parsed = DSLParser(TWO_TRACKS).parse()
+    data = smf_bytes(parsed, midi_format=0)
+    events = read_smf(data).tracks[0]
+    metas = [message for _, message in events if message[0] == 0xFF]
+
+    names = [m for m in metas if m[1] == 0x03]
+    assert names == [b'\xff\x03\x04Lead'], f"Only the first track name should remain, got {names}"
+    tempos = [(tick, m) for tick, m in events if m[:2] == b'\xff\x51']
+    assert [tick for tick, _ in tempos] == [0, 3 * 960], f"Unchanged tempo should be dropped, got {tempos}"
+    assert sum(1 for m in metas if m[1] == 0x58) == 1, "Expected a single time signature"
+
+    plain = smf_bytes(parsed, midi_format=0, running_status=False)
+    assert len(data) < len(plain), "Running status should shrink the file"
+    assert read_smf(plain).tracks == read_smf(data).tracks, "Running status changed the decoded events"
+
+    # 多轨文件由读取器归并成同样的时间顺序
+    format1 = smf_bytes(parsed, midi_format=1)
+    assert read_smf(format1).format == 1 and len(read_smf(format1).tracks) == 3
+    # 弯音 4096 + 8192 = 12288：LSB 0，MSB 96
+    assert (4 * 960, b'\xe1\x00\x60') in normalized(convert(TWO_TRACKS)), "MIDIUtil pitch bend offset is wrong"
+    assert (4 * 960, b'\xe1\x00\x60') in normalized(data), "Format 0 pitch bend offset is wrong"
+
+    redundant_tempo = (2 * 960, tempos[0][1])
+    assert [e for e in normalized(format1) if e != redundant_tempo] == normalized(data), \
+        "Own format 1 and format 0 differ beyond the dropped tempo"
+
+    print("✅ Meta dedup and running status test passed")
+
+def test_read_smf_long_deltas():
+    """Test variable-length deltas and header validation"""
+    parsed = {'metadata': {}, 'tracks': {'A': {'config': {'channel': 0, 'instrument': 0},
+                                                'notes': [Note(60, 1.0, 0.0), Note(62, 1.0, 50000.0)],
+                                                'events': []}}}
+    events = read_smf(smf_bytes(parsed)).tracks[0]
+    note_ons = [tick for tick, m in events if m[0] == 0x90 and m[2] > 0]
+    assert note_ons == [0, 50000 * 960], f"Unexpected note-on ticks {note_ons}"
+
+    try:
+        read_smf(b'RIFF0000')
+        assert False, "Non-MIDI data should be rejected"
+    except ValueError:
+        pass
+
+    print("✅ Read SMF test passed")
+
+def test_negative_offset_clamped():
+    """Test a note moved before time 0 is clamped instead of hanging the writer"""
+    data = convert("Track A: C4q:p-0.5 D4q", ConvertOptions(midi_format=0))
+    notes = [(tick, m[1], m[2]) for tick, m in read_smf(data).tracks[0] if m[0] & 0xF0 == 0x90]
+    assert notes[:2] == [(0, 60, 80), (480, 60, 0)], f"Unexpected clamped note {notes}"
+
+    try:
+        _var_length(-1)
+        assert False, "Negative delta should be rejected"
+    except ValueError:
+        pass
+
+    print("✅ Negative offset test passed")
+
+def run_smf_tests():
+    """Run all SMF tests"""
+    print("Running SMF tests...")
+
+    try:
+        test_format0_matches_format1()
+        test_meta_dedup_and_running_status()
+        test_read_smf_long_deltas()
+        test_negative_offset_clamped()
+
+        print("\n🎉 All SMF tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ SMF test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_smf_tests()
+    exit(0 if success else 1)
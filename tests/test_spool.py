@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the spool-directory render queue.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from simplemusic.spool import (claim_job, complete_job, read_status, render_job, requeue_expired, result_path,
+                               run_worker, spool_status, submit_job)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def test_local_workers_share_queue():
+    """Test that several worker processes render every job exactly once"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = os.path.join(temp_dir, 'spool')
+        job_ids = [submit_job(spool, f"Track T{i}: C4q D4q E{i % 7 + 1}q", name=f"song{i}")
+                   for i in range(12)]
+
+        env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        workers = [subprocess.Popen([sys.executable, '-m', 'simplemusic.cli', 'worker', '--spool', spool,
+                                     '--worker-id', f'w{i}', '--poll-interval', '0.05', '--exit-when-idle'],
+                                    stdout=subprocess.DEVNULL, env=env)
+                   for i in range(3)]
+        for worker in workers:
+            assert worker.wait(timeout=120) == 0, "Worker process failed"
+
+        statuses = spool_status(spool)
+        assert [s['id'] for s in statuses] == job_ids, "Status should list jobs in submit order"
+        assert all(s['state'] == 'done' and s['attempts'] == 1 for s in statuses), \
+            f"Every job should be rendered once: {statuses}"
+        assert all(os.path.getsize(s['output']) > 0 for s in statuses), "Missing MIDI output"
+        assert not os.listdir(os.path.join(spool, 'queue')) and not os.listdir(os.path.join(spool, 'active')), \
+            "Queue should be empty"
+
+    print("✅ Local workers test passed")
+
+def test_expired_lease_is_requeued():
+    """Test that a job claimed by a crashed worker is requeued and finished"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = os.path.join(temp_dir, 'spool')
+        job_id = submit_job(spool, "Track A: C4q", options={'transpose': 2})
+
+        # 模拟崩溃：领取后不再续租
+        assert claim_job(spool, 'crashed').id == job_id
+        assert requeue_expired(spool, lease_timeout=60) == [], "Live lease should not be requeued"
+        assert read_status(spool, job_id)['state'] == 'running', "Live lease should not be requeued"
+
+        stale = time.time() - 120
+        os.utime(os.path.join(spool, 'active', job_id + '.json'), (stale, stale))
+        assert run_worker(spool, worker_id='rescuer', lease_timeout=60, exit_when_idle=True) == 1
+
+        status = read_status(spool, job_id)
+        assert (status['state'], status['worker'], status['attempts']) == ('done', 'rescuer', 2), \
+            f"Unexpected status {status}"
+
+        # 丢失租约的工作进程晚完成时，结果不能覆盖接手的工作进程写出的文件
+        late = submit_job(spool, "Track A: C4q")
+        job = claim_job(spool, 'slow')
+        os.utime(os.path.join(spool, 'active', late + '.json'), (stale, stale))
+        assert requeue_expired(spool, lease_timeout=60) == [late]
+        temp_path = render_job(job, os.path.join(spool, 'tmp'))
+        assert not complete_job(spool, job, result=temp_path), "Lost lease should not complete the job"
+        assert not os.path.exists(temp_path) and not os.path.exists(result_path(spool, late)), \
+            "Result of a lost lease should be discarded"
+        assert read_status(spool, late)['state'] == 'queued', "Job should stay queued for another worker"
+
+    print("✅ Expired lease test passed")
+
+def test_failed_jobs():
+    """Test conversion errors and repeatedly crashing jobs end up in failed/"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = os.path.join(temp_dir, 'spool')
+        broken = submit_job(spool, "Track A: C4q", options={'quantize': 0})
+        run_worker(spool, exit_when_idle=True)
+
+        status = read_status(spool, broken)
+        assert status['state'] == 'failed' and 'positive' in status['error'], f"Unexpected status {status}"
+        assert os.path.exists(os.path.join(spool, 'failed', broken + '.json')), "Job not moved to failed/"
+
+        poison = submit_job(spool, "Track A: C4q")
+        stale = time.time() - 120
+        for _ in range(2):
+            claim_job(spool, 'crashed')
+            os.utime(os.path.join(spool, 'active', poison + '.json'), (stale, stale))
+            assert requeue_expired(spool, lease_timeout=60, max_attempts=2) == [poison]
+
+        status = read_status(spool, poison)
+        assert status['state'] == 'failed' and 'lease expired' in status['error'], f"Unexpected status {status}"
+
+    print("✅ Failed jobs test passed")
+
+def test_includes_expanded_at_submit():
+    """Test that job files do not depend on the submitter's directory"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = os.path.join(temp_dir, 'spool')
+        include_path = os.path.join(temp_dir, 'header.dsl')
+        with open(include_path, 'w', encoding='utf-8') as f:
+            f.write("Tempo=90")
+        job_id = submit_job(spool, 'Include "header.dsl"\nTrack A: C4q', base_dir=temp_dir)
+
+        # 工作进程在另一台主机上看不到提交者的文件
+        os.remove(include_path)
+        assert run_worker(spool, exit_when_idle=True) == 1
+        assert read_status(spool, job_id)['state'] == 'done', f"Unexpected status {read_status(spool, job_id)}"
+
+        try:
+            submit_job(spool, 'Include "missing.dsl"\nTrack A: C4q', base_dir=temp_dir)
+            assert False, "Missing include should fail at submit time"
+        except FileNotFoundError:
+            pass
+
+    print("✅ Includes expanded at submit test passed")
+
+def run_spool_tests():
+    """Run all spool tests"""
+    print("Running spool tests...")
+
+    try:
+        test_local_workers_share_queue()
+        test_expired_lease_is_requeued()
+        test_failed_jobs()
+        test_includes_expanded_at_submit()
+
+        print("\n🎉 All spool tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Spool test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_spool_tests()
+    exit(0 if success else 1)
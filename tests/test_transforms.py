@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized whole-score transforms.
+"""
+
+from simplemusic import DSLParser, ScoreColumns, optimize_score, transform_score, velocity_curve
+
+def test_columns_round_trip():
+    """Test that converting to columns and back preserves the score"""
+    dsl = """
+Track Lead: Instrument=piano Channel=1
+C4q:v90 D4e:len16 [E4q, G4q:i5] CC:64:127 R
+Track Drums: Channel=10
+C4e D4e
+"""
+    parsed = DSLParser(dsl).parse()
+    restored = ScoreColumns.from_parsed(parsed).to_parsed()
+
+    assert restored['metadata'] == parsed['metadata'], "Metadata changed in round trip"
+    for name, track_data in parsed['tracks'].items():
+        assert restored['tracks'][name]['config'] == track_data['config'], f"Config of {name} changed"
+        assert restored['tracks'][name]['notes'] == track_data['notes'], f"Notes of {name} changed"
+        assert restored['tracks'][name]['events'] == track_data['events'], f"Events of {name} changed"
+
+    print("✅ Columns round trip test passed")
+
+def test_transpose_clamps_and_skips_drums():
+    """Test transposition clamping and drum channel handling"""
+    dsl = """
+Track Lead: Channel=1
+C4q G9q C0q
+Track Drums: Channel=10
+C4q
+"""
+    parsed = transform_score(DSLParser(dsl).parse(), transpose_by=12)
+
+    lead = [note.pitch for note in parsed['tracks']['Lead']['notes']]
+    drums = [note.pitch for note in parsed['tracks']['Drums']['notes']]
+    assert lead == [72, 127, 24], f"Expected [72, 127, 24], got {lead}"
+    assert drums == [60], f"Drum notes should not be transposed, got {drums}"
+
+    # 超出 int16 范围的移调同样限制在 0-127
+    for semitones, expected in [(40000, [127, 127, 127]), (-40000, [0, 0, 0])]:
+        parsed = transform_score(DSLParser(dsl).parse(), transpose_by=semitones)
+        lead = [note.pitch for note in parsed['tracks']['Lead']['notes']]
+        assert lead == expected, f"Expected {expected} for {semitones}, got {lead}"
+
+    print("✅ Transpose test passed")
+
+def test_stretch_and_quantize():
+    """Test time scaling and grid quantization"""
+    dsl = "Track Test: C4q:p0.1 D4q:lene PB:100 E4q"
+    parsed = transform_score(DSLParser(dsl).parse(), stretch=2.0, quantize_to='e')
+
+    notes = parsed['tracks']['Test']['notes']
+    events = parsed['tracks']['Test']['events']
+    assert [note.start_time for note in notes] == [0.0, 2.0, 4.0], \
+        f"Unexpected start times {[note.start_time for note in notes]}"
+    assert notes[0].duration == 2.0, f"Expected stretched duration 2.0, got {notes[0].duration}"
+    assert notes[1].actual_length == 1.0, f"Expected stretched length 1.0, got {notes[1].actual_length}"
+    assert notes[0].actual_length is None, "Unset actual length should stay None"
+    assert events[0].time == 4.0, f"Expected event time 4.0, got {events[0].time}"
+
+    print("✅ Stretch and quantize test passed")
+
+def test_conductor_carried_through():
+    """Test that the conductor track of an optimized score is scaled and quantized"""
+    optimized, _ = optimize_score(DSLParser("Track Test: C4q D4q:p0.1 Tempo=90 E4q").parse())
+    parsed = transform_score(optimized, stretch=2.0, quantize_to='e')
+
+    assert 'conductor' in parsed, "Conductor track was dropped"
+    tempos = [(e.time, e.data['tempo']) for e in parsed['conductor']['events']]
+    assert tempos == [(4.0, 90)], f"Unexpected conductor tempos {tempos}"
+    assert 'conductor' not in transform_score(DSLParser("Track Test: C4q").parse(), stretch=2.0), \
+        "Scores without a conductor track should not gain one"
+
+    print("✅ Conductor round trip test passed")
+
+def test_velocity_curve():
+    """Test velocity mapping with a lookup table"""
+    parsed = DSLParser("Track Test: C4q:v0 D4q:v64 E4q:v127").parse()
+    result = transform_score(parsed, velocity=velocity_curve(scale=0.5, floor=10))
+
+    velocities = [note.velocity for note in result['tracks']['Test']['notes']]
+    assert velocities == [10, 32, 64], f"Expected [10, 32, 64], got {velocities}"
+
+    print("✅ Velocity curve test passed")
+
+def run_transform_tests():
+    """Run all transform tests"""
+    print("Running transform tests...")
+
+    try:
+        test_columns_round_trip()
+        test_transpose_clamps_and_skips_drums()
+        test_stretch_and_quantize()
+        test_conductor_carried_through()
+        test_velocity_curve()
+
+        print("\n🎉 All transform tests passed!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Transform test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == '__main__':
+    success = run_transform_tests()
+    exit(0 if success else 1)